@@ -92,6 +92,7 @@ TEMPLATES = [
                 "django.template.context_processors.static",
                 "django.template.context_processors.tz",
                 "django.contrib.messages.context_processors.messages",
+                "store.context_processors.categories",
             ],
         },
     },
@@ -114,6 +115,25 @@ DATABASES = {
     }
 }
 
+# Cache
+# Общий memcached нужен, чтобы сброс кэша по сигналам был виден всем воркерам gunicorn
+
+MEMCACHED_LOCATION = os.environ.get('MEMCACHED_LOCATION')
+
+if MEMCACHED_LOCATION:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': MEMCACHED_LOCATION,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 AUTHENTICATION_BACKENDS = (
     'django.contrib.auth.backends.ModelBackend',
     'allauth.account.auth_backends.AuthenticationBackend',
@@ -183,6 +203,11 @@ DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 MESSAGE_TAGS = {message_constants.ERROR: "danger"}
 
 
+# Store-specific settings
+# Корзина в БД (по умолчанию) или в сессии до оформления заказа: 'store.cart_backends.SessionCartBackend'
+STORE_CART_BACKEND = os.environ.get('STORE_CART_BACKEND', 'store.cart_backends.DBCartBackend')
+
+
 # Todo-specific settings
 TODO_STAFF_ONLY = False
 TODO_DEFAULT_LIST_ID = None
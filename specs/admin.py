@@ -1,8 +1,49 @@
 from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path
 
+from .forms import SpecImportForm
+from .importer import SpecImporter
 from .models import *
 
 
 admin.site.register(CategoryFeature)
 admin.site.register(FeatureValidator)
-admin.site.register(ProductFeatures)
\ No newline at end of file
+
+
+@admin.register(ProductFeatures)
+class ProductFeaturesAdmin(admin.ModelAdmin):
+    change_list_template = 'admin/specs/productfeatures/change_list.html'
+
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view), name='specs_productfeatures_import'),
+        ] + super().get_urls()
+
+    def has_import_permission(self, request):
+        # Импорт и создаёт, и меняет записи - admin_view проверяет только is_staff
+        return self.has_add_permission(request) and self.has_change_permission(request)
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {'has_import_permission': self.has_import_permission(request), **(extra_context or {})}
+        return super().changelist_view(request, extra_context)
+
+    def import_view(self, request):
+        """Загрузка файла с характеристиками, результат импорта выводится на той же странице"""
+        if not self.has_import_permission(request):
+            raise PermissionDenied
+        form = SpecImportForm(request.POST or None, request.FILES or None)
+        results = None
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            file_format = 'jsonl' if upload.name.endswith(('.jsonl', '.json')) else 'csv'
+            results = SpecImporter(form.cleaned_data['kind']).upsert(upload, file_format=file_format)
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Импорт характеристик',
+            'form': form,
+            'results': results,
+        }
+        return TemplateResponse(request, 'admin/specs/import_specs.html', context)
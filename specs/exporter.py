@@ -0,0 +1,92 @@
+import csv
+import json
+
+from .models import ProductFeatures
+from store.models import Product
+
+
+EXPORT_FORMATS = ('csv', 'jsonl', 'columnar')
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/jsonl',
+    'columnar': 'application/jsonl',
+}
+CHUNK_SIZE = 1000
+
+# Плоский формат - строка на характеристику товара; колонки product, feature_name, value
+# совпадают с импортом product_features, выгрузку можно загрузить обратно
+FLAT_COLUMNS = ['product_id', 'product', 'title', 'category', 'price', 'feature_name', 'value', 'unit']
+COLUMNAR_FORMAT = 'store-catalog-columnar'
+
+
+def iter_catalog(chunk_size=CHUNK_SIZE, category_id=None):
+    """Товары с характеристиками пачками по chunk_size: два запроса на пачку, в памяти только она.
+    Пачки идут по id (keyset), поэтому запросы не замедляются к концу каталога."""
+    products = Product.objects.order_by('id').values_list('id', 'slug', 'title', 'category__slug', 'price')
+    if category_id is not None:
+        products = products.filter(category_id=category_id)
+    last_id = 0
+    while True:
+        chunk = list(products.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        last_id = chunk[-1][0]
+        features = {}
+        for product_id, name, value, unit in ProductFeatures.objects.filter(
+            product_id__in=[row[0] for row in chunk]
+        ).order_by('product_id', 'id').values_list('product_id', 'feature__feature_name', 'value', 'feature__unit'):
+            features.setdefault(product_id, []).append({'name': name, 'value': value, 'unit': unit or ''})
+        yield [
+            {
+                'id': product_id, 'slug': slug, 'title': title, 'category': category, 'price': str(price),
+                'features': features.get(product_id, []),
+            }
+            for product_id, slug, title, category, price in chunk
+        ]
+
+
+def flat_rows(products):
+    """Строки плоского формата; товар без характеристик - одна строка с пустыми полями характеристики"""
+    for product in products:
+        head = [product['id'], product['slug'], product['title'], product['category'], product['price']]
+        for feature in product['features'] or [{'name': '', 'value': '', 'unit': ''}]:
+            yield head + [feature['name'], feature['value'], feature['unit']]
+
+
+class Echo:
+    """Псевдо-файл для csv.writer: запись возвращает строку, а не копит её"""
+
+    def write(self, value):
+        return value
+
+
+def export_csv(chunks):
+    writer = csv.writer(Echo())
+    yield writer.writerow(FLAT_COLUMNS)
+    for products in chunks:
+        yield ''.join(writer.writerow(row) for row in flat_rows(products))
+
+
+def export_jsonl(chunks):
+    for products in chunks:
+        yield ''.join(json.dumps(product, ensure_ascii=False) + '\n' for product in products)
+
+
+def export_columnar(chunks):
+    """Колоночный формат по образцу Parquet: заголовок со схемой, затем группы строк -
+    по объекту JSON на пачку, значения каждой колонки подряд"""
+    yield json.dumps({'format': COLUMNAR_FORMAT, 'version': 1, 'columns': FLAT_COLUMNS}) + '\n'
+    for products in chunks:
+        columns = list(zip(*flat_rows(products)))
+        yield json.dumps({
+            'rows': len(columns[0]),
+            'columns': dict(zip(FLAT_COLUMNS, (list(column) for column in columns))),
+        }, ensure_ascii=False) + '\n'
+
+
+def export_catalog(file_format, chunk_size=CHUNK_SIZE, category_id=None):
+    """Выгрузка каталога кусками текста - для записи в файл или StreamingHttpResponse"""
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{file_format}', expected one of {EXPORT_FORMATS}")
+    writer = {'csv': export_csv, 'jsonl': export_jsonl, 'columnar': export_columnar}[file_format]
+    return writer(iter_catalog(chunk_size=chunk_size, category_id=category_id))
@@ -0,0 +1,42 @@
+from django.db import transaction
+
+from .models import FeatureValidator, ProductFeatures
+from store.invalidation import product_features_bulk_changed
+
+
+# Значение выпадающего списка "ничего не выбрано"
+EMPTY_CHOICE = '---'
+
+
+def update_product_feature_values(product, new_values):
+    """Меняет значения характеристик товара: new_values - {имя характеристики: новое значение}.
+    Все значения проверяются по валидаторам категории, загруженным одним запросом; если хоть одно
+    недопустимо, ничего не меняется. Возвращает (diff, errors): diff - {имя: {'old', 'new'}},
+    errors - {имя: текст ошибки}."""
+    with transaction.atomic():
+        # Строки блокируются до записи: параллельная правка ждёт и видит уже новые значения
+        features_values = list(product.features.select_for_update(of=('self',)).select_related('feature'))
+        valid_values = set(FeatureValidator.objects.filter(
+            category_id=product.category_id,
+            feature_key_id__in={item.feature_id for item in features_values},
+        ).values_list('feature_key_id', 'valid_feature_value'))
+        changed = []
+        diff = {}
+        errors = {}
+        for item in features_values:
+            feature_name = item.feature.feature_name
+            new_value = new_values.get(feature_name)
+            if new_value is None or new_value == EMPTY_CHOICE or new_value == item.value:
+                continue
+            if (item.feature_id, new_value) not in valid_values:
+                errors[feature_name] = f"Недопустимое значение '{new_value}'"
+                continue
+            diff[feature_name] = {'old': item.value, 'new': new_value}
+            item.value = new_value
+            changed.append(item)
+        if errors:
+            return {}, errors
+        if changed:
+            ProductFeatures.objects.bulk_update(changed, ['value'])
+            product_features_bulk_changed([product.id])
+    return diff, errors
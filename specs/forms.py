@@ -1,5 +1,6 @@
 from django import forms
 
+from .importer import FEATURES, PRODUCT_FEATURES, VALIDATORS
 from .models import FeatureValidator, CategoryFeature
 from store.models import Category
 
@@ -23,3 +24,14 @@ class FeatureValidatorForm(forms.ModelForm):
     class Meta:
         model = FeatureValidator
         fields = ['category']
+
+
+class SpecImportForm(forms.Form):
+    KIND_CHOICES = (
+        (FEATURES, 'Характеристики категорий'),
+        (VALIDATORS, 'Валидные значения'),
+        (PRODUCT_FEATURES, 'Характеристики товаров'),
+    )
+
+    kind = forms.ChoiceField(label='Что загружается', choices=KIND_CHOICES)
+    file = forms.FileField(label='Файл CSV или JSON Lines')
@@ -0,0 +1,303 @@
+import codecs
+import csv
+import json
+from itertools import islice
+
+from django.db import transaction
+
+from .models import CategoryFeature, FeatureValidator, ProductFeatures
+from .options import invalidate_category_options
+from store.facets import invalidate_facet_index
+from store.models import Category, Product
+from store.invalidation import invalidate_on_commit, product_features_bulk_changed
+
+
+FEATURES = 'features'
+VALIDATORS = 'validators'
+PRODUCT_FEATURES = 'product_features'
+
+# Колонки файла для каждого вида данных; category и product - slug
+IMPORT_COLUMNS = {
+    FEATURES: ['category', 'feature_name', 'feature_filter_name', 'unit'],
+    VALIDATORS: ['category', 'feature_name', 'value'],
+    PRODUCT_FEATURES: ['product', 'feature_name', 'value'],
+}
+OPTIONAL_COLUMNS = ('unit',)
+# Поля моделей, в которые пишутся колонки: длина значения проверяется по их max_length
+COLUMN_FIELDS = {
+    FEATURES: {
+        'feature_name': (CategoryFeature, 'feature_name'),
+        'feature_filter_name': (CategoryFeature, 'feature_filter_name'),
+        'unit': (CategoryFeature, 'unit'),
+    },
+    VALIDATORS: {'value': (FeatureValidator, 'valid_feature_value')},
+    PRODUCT_FEATURES: {'value': (ProductFeatures, 'value')},
+}
+IMPORT_FORMATS = ('csv', 'jsonl')
+CHUNK_SIZE = 1000
+
+
+class SpecImporter:
+    """Потоковый импорт характеристик категорий, валидных значений и характеристик товаров
+    для команды import_specs, загрузки в админке и тестов.
+    Файл читается пачками по chunk_size строк: категории, характеристики и валидаторы загружаются
+    заранее, товары - одним запросом на пачку; новые записи вставляются bulk_create, изменённые -
+    bulk_update, каждая пачка в своей транзакции. Ошибки копятся по номерам строк,
+    как в todo.operations.csv_importer.CSVImporter."""
+
+    def __init__(self, kind, chunk_size=CHUNK_SIZE):
+        if kind not in IMPORT_COLUMNS:
+            raise ValueError(f"Unknown import kind '{kind}', expected one of {list(IMPORT_COLUMNS)}")
+        self.kind = kind
+        self.chunk_size = chunk_size
+        self.max_lengths = {
+            column: model._meta.get_field(field).max_length for column, (model, field) in COLUMN_FIELDS[kind].items()
+        }
+        self.errors = []
+        self.summaries = []
+        self.line_count = 0
+        self.created_count = 0
+        self.updated_count = 0
+        self.unchanged_count = 0
+
+    def upsert(self, fileobj, file_format='csv', as_string_obj=False):
+        """Ожидает файловый *объект*: из команды - текстовый (as_string_obj=True), из админки - загруженный файл.
+
+        CSV - с заголовком из колонок IMPORT_COLUMNS[kind], JSON Lines - по объекту с теми же ключами на строку.
+        """
+        if file_format not in IMPORT_FORMATS:
+            raise ValueError(f"Unknown import format '{file_format}', expected one of {IMPORT_FORMATS}")
+        if not as_string_obj:
+            fileobj = codecs.iterdecode(fileobj, 'utf-8-sig')
+        rows = self.read_rows(fileobj, file_format)
+        if rows is None:
+            return {"summaries": self.summaries, "errors": self.errors}
+        self.load_maps()
+
+        try:
+            while True:
+                chunk = list(islice(rows, self.chunk_size))
+                if not chunk:
+                    break
+                self.import_chunk(chunk)
+        except (csv.Error, UnicodeDecodeError) as error:
+            self.errors.append({self.line_count + 1: [f"Could not read file, import stopped: {error}"]})
+
+        skipped = self.line_count - self.created_count - self.updated_count - self.unchanged_count
+        self.summaries.append(f"Processed {self.line_count} rows")
+        self.summaries.append(f"Created {self.created_count} rows")
+        self.summaries.append(f"Updated {self.updated_count} rows")
+        self.summaries.append(f"Unchanged {self.unchanged_count} rows")
+        self.summaries.append(f"Skipped {skipped} rows")
+        return {"summaries": self.summaries, "errors": self.errors}
+
+    def read_rows(self, fileobj, file_format):
+        expected = IMPORT_COLUMNS[self.kind]
+        if file_format == 'csv':
+            reader = csv.DictReader(fileobj)
+            if not reader.fieldnames or not set(expected) - set(OPTIONAL_COLUMNS) <= set(reader.fieldnames):
+                self.errors.append(f"Inbound data does not have expected columns.\nShould be: {expected}")
+                return None
+            return reader
+        return self.read_json_lines(fileobj)
+
+    @staticmethod
+    def read_json_lines(fileobj):
+        for line in fileobj:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Строка с ошибкой станет ошибкой строки, импорт остальных продолжится
+                yield None
+
+    def load_maps(self):
+        self.categories = dict(Category.objects.values_list('slug', 'id'))
+        self.features = {
+            (category_id, feature_name): feature_id
+            for feature_id, category_id, feature_name in CategoryFeature.objects.values_list(
+                'id', 'category_id', 'feature_name'
+            )
+        }
+        self.validators = set(FeatureValidator.objects.values_list('feature_key_id', 'valid_feature_value'))
+        self.features_with_validators = {feature_id for feature_id, _ in self.validators}
+
+    def import_chunk(self, chunk):
+        errors_before = len(self.errors)
+        rows = []
+        for row in chunk:
+            self.line_count += 1
+            row = self.clean_row(row)
+            if row is not None:
+                rows.append((self.line_count, row))
+        with transaction.atomic():
+            getattr(self, f'import_{self.kind}')(rows)
+        # Ошибки разбора и ошибки ссылок пачки - в порядке строк файла
+        self.errors[errors_before:] = sorted(self.errors[errors_before:], key=lambda error: next(iter(error)))
+
+    def clean_row(self, row):
+        if not isinstance(row, dict):
+            self.errors.append({self.line_count: ["Could not parse row as an object"]})
+            return None
+        row = {column: str(row.get(column) or '').strip() for column in IMPORT_COLUMNS[self.kind]}
+        missing = [column for column, value in row.items() if not value and column not in OPTIONAL_COLUMNS]
+        if missing:
+            self.errors.append({self.line_count: [f"Missing required {', '.join(missing)}"]})
+            return None
+        too_long = [
+            f"Value of {column} is longer than {max_length} characters"
+            for column, max_length in self.max_lengths.items() if len(row[column]) > max_length
+        ]
+        if too_long:
+            self.errors.append({self.line_count: too_long})
+            return None
+        return row
+
+    def resolve_category(self, line, row):
+        category_id = self.categories.get(row['category'])
+        if category_id is None:
+            self.errors.append({line: [f"Could not find category {row['category']}"]})
+        return category_id
+
+    def resolve_feature(self, line, category_id, row):
+        feature_id = self.features.get((category_id, row['feature_name']))
+        if feature_id is None:
+            self.errors.append({line: [f"Feature {row['feature_name']} does not exist in the category"]})
+        return feature_id
+
+    def import_features(self, rows):
+        existing = {}
+        new = {}
+        for line, row in rows:
+            category_id = self.resolve_category(line, row)
+            if category_id is None:
+                continue
+            key = (category_id, row['feature_name'])
+            fields = {'feature_filter_name': row['feature_filter_name'], 'unit': row['unit'] or None}
+            if key in new or self.features.get(key) in existing:
+                self.errors.append({line: [f"Duplicate feature {row['feature_name']} in the file"]})
+            elif key in self.features:
+                existing[self.features[key]] = fields
+            else:
+                new[key] = CategoryFeature(category_id=category_id, feature_name=row['feature_name'], **fields)
+
+        changed = []
+        for feature in CategoryFeature.objects.filter(id__in=existing):
+            fields = existing[feature.id]
+            if all(getattr(feature, name) == value for name, value in fields.items()):
+                self.unchanged_count += 1
+                continue
+            for name, value in fields.items():
+                setattr(feature, name, value)
+            changed.append(feature)
+        CategoryFeature.objects.bulk_update(changed, ['feature_filter_name', 'unit'])
+        CategoryFeature.objects.bulk_create(new.values())
+        # Не все бэкенды возвращают id из bulk_create - новые характеристики дочитываются одним запросом
+        for feature_id, category_id, feature_name in CategoryFeature.objects.filter(
+            category_id__in={category_id for category_id, _ in new}, feature_name__in={name for _, name in new}
+        ).values_list('id', 'category_id', 'feature_name'):
+            self.features[(category_id, feature_name)] = feature_id
+        self.created_count += len(new)
+        self.updated_count += len(changed)
+
+        changed_categories = {feature.category_id for feature in changed}
+        for category_id in changed_categories | {category_id for category_id, _ in new}:
+            invalidate_on_commit(invalidate_facet_index, category_id)
+        invalidate_on_commit(invalidate_category_options, changed_categories | {category_id for category_id, _ in new})
+        if changed_categories:
+            # Единица измерения входит в характеристики товаров
+            product_features_bulk_changed(
+                Product.objects.filter(category_id__in=changed_categories).values_list('id', flat=True)
+            )
+
+    def import_validators(self, rows):
+        new = []
+        for line, row in rows:
+            category_id = self.resolve_category(line, row)
+            if category_id is None:
+                continue
+            feature_id = self.resolve_feature(line, category_id, row)
+            if feature_id is None:
+                continue
+            if (feature_id, row['value']) in self.validators:
+                self.unchanged_count += 1
+                continue
+            self.validators.add((feature_id, row['value']))
+            self.features_with_validators.add(feature_id)
+            new.append(FeatureValidator(
+                category_id=category_id, feature_key_id=feature_id, valid_feature_value=row['value']
+            ))
+        FeatureValidator.objects.bulk_create(new)
+        invalidate_on_commit(invalidate_category_options, {validator.category_id for validator in new})
+        self.created_count += len(new)
+
+    def import_product_features(self, rows):
+        products = {
+            slug: (product_id, category_id)
+            for product_id, slug, category_id in Product.objects.filter(
+                slug__in={row['product'] for _, row in rows}
+            ).values_list('id', 'slug', 'category_id')
+        }
+        values = {}
+        for line, row in rows:
+            product = products.get(row['product'])
+            if product is None:
+                self.errors.append({line: [f"Could not find product {row['product']}"]})
+                continue
+            product_id, category_id = product
+            feature_id = self.resolve_feature(line, category_id, row)
+            if feature_id is None:
+                continue
+            # У характеристики со списком валидных значений допустимы только они
+            if feature_id in self.features_with_validators and (feature_id, row['value']) not in self.validators:
+                self.errors.append({line: [f"Invalid value {row['value']} for feature {row['feature_name']}"]})
+                continue
+            if (product_id, feature_id) in values:
+                self.errors.append({line: [f"Duplicate feature {row['feature_name']} for product {row['product']}"]})
+                continue
+            values[(product_id, feature_id)] = row['value']
+        if not values:
+            return
+
+        existing = {}
+        for product_feature in ProductFeatures.objects.filter(
+            product_id__in={product_id for product_id, _ in values},
+            feature_id__in={feature_id for _, feature_id in values},
+        ).order_by('id'):
+            existing.setdefault((product_feature.product_id, product_feature.feature_id), product_feature)
+        changed = []
+        new = []
+        for (product_id, feature_id), value in values.items():
+            product_feature = existing.get((product_id, feature_id))
+            if product_feature is None:
+                new.append(ProductFeatures(product_id=product_id, feature_id=feature_id, value=value))
+            elif product_feature.value != value:
+                product_feature.value = value
+                changed.append(product_feature)
+            else:
+                self.unchanged_count += 1
+        ProductFeatures.objects.bulk_update(changed, ['value'])
+        self.create_product_features(new)
+        self.created_count += len(new)
+        self.updated_count += len(changed)
+        product_features_bulk_changed({product_id for product_id, _ in values})
+
+    @staticmethod
+    def create_product_features(new):
+        """Вставляет характеристики и их связи с товарами (Product.features)"""
+        if not new:
+            return
+        created = ProductFeatures.objects.bulk_create(new)
+        if created[0].pk is None:
+            # Бэкенд без RETURNING: id дочитываются по парам (товар, характеристика) пачки
+            ids = {}
+            for product_feature_id, product_id, feature_id in ProductFeatures.objects.filter(
+                product_id__in={item.product_id for item in new}, feature_id__in={item.feature_id for item in new}
+            ).order_by('id').values_list('id', 'product_id', 'feature_id'):
+                ids[(product_id, feature_id)] = product_feature_id
+            for item in created:
+                item.pk = ids[(item.product_id, item.feature_id)]
+        Product.features.through.objects.bulk_create(
+            Product.features.through(product_id=item.product_id, productfeatures_id=item.pk) for item in created
+        )
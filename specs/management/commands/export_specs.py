@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from specs.exporter import CHUNK_SIZE, EXPORT_FORMATS, export_catalog
+from store.models import Category
+
+
+class Command(BaseCommand):
+    help = """Export products with their features as CSV (one row per product feature), JSON Lines
+    (one object per product) or a columnar snapshot (schema line plus one row group per chunk).
+    The catalog is read in chunks, so memory use does not grow with its size.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+        parser.add_argument("-o", "--output", default=None, help="Output file, stdout by default.")
+        parser.add_argument("--category", default=None, help="Export only this category (slug).")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Products per query.")
+
+    def handle(self, *args, **options):
+        category_id = None
+        if options["category"]:
+            category_id = Category.objects.filter(slug=options["category"]).values_list("id", flat=True).first()
+            if category_id is None:
+                raise CommandError(f"Category {options['category']} does not exist")
+        chunks = export_catalog(options["format"], chunk_size=options["chunk_size"], category_id=category_id)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
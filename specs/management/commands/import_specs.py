@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from specs.importer import CHUNK_SIZE, IMPORT_COLUMNS, IMPORT_FORMATS, SpecImporter
+
+
+class Command(BaseCommand):
+    help = """Bulk import category features, valid feature values or product features from CSV or JSON Lines.
+    Columns per kind: features - category, feature_name, feature_filter_name, unit;
+    validators - category, feature_name, value; product_features - product, feature_name, value.
+    Categories and products are referenced by slug.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=list(IMPORT_COLUMNS), help="What the file contains.")
+        parser.add_argument("-f", "--file", dest="file", required=True, help="Path to the inbound file.")
+        parser.add_argument(
+            "--format", choices=IMPORT_FORMATS, default=None, help="File format, by default from the file extension."
+        )
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows per transaction.")
+
+    def handle(self, *args, **options):
+        filepath = Path(options["file"])
+        if not filepath.exists():
+            self.stderr.write(f"Sorry, couldn't find file: {filepath}")
+            sys.exit(1)
+        file_format = options["format"] or ("jsonl" if filepath.suffix in (".jsonl", ".json") else "csv")
+
+        # "utf-8-sig" пропускает BOM, который Excel добавляет в CSV
+        with filepath.open(mode="r", encoding="utf-8-sig", newline="") as fileobj:
+            importer = SpecImporter(options["kind"], chunk_size=options["chunk_size"])
+            results = importer.upsert(fileobj, file_format=file_format, as_string_obj=True)
+
+        # Ошибки вида [{3: ["...", "..."]}, ...] или строка про заголовок файла
+        for error in results["errors"]:
+            if isinstance(error, dict):
+                for line, error_list in error.items():
+                    self.stdout.write(f"\nSkipped row {line}:")
+                    for msg in error_list:
+                        self.stdout.write(f"- {msg}")
+            else:
+                self.stdout.write(error)
+
+        self.stdout.write("")
+        for summary_msg in results["summaries"]:
+            self.stdout.write(summary_msg)
@@ -0,0 +1,68 @@
+import csv
+import io
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from specs.importer import CHUNK_SIZE, FEATURES, IMPORT_COLUMNS, PRODUCT_FEATURES, VALIDATORS, SpecImporter
+from store.models import Category, Product
+
+
+class Command(BaseCommand):
+    help = """Benchmark the bulk spec importer (rows/second) on a synthetic category inside a transaction
+    that is rolled back at the end, so the database is left untouched.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=2000, help="Products in the synthetic category.")
+        parser.add_argument("--features", type=int, default=20, help="Features per product.")
+        parser.add_argument("--values", type=int, default=10, help="Valid values per feature.")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        with transaction.atomic():
+            category = Category.objects.create(name="Benchmark", slug="spec-import-benchmark")
+            Product.objects.bulk_create(
+                Product(
+                    category=category, title=f"Benchmark {number}", price=1,
+                    image="images/benchmark.png", slug=f"spec-import-benchmark-{number}",
+                )
+                for number in range(options["products"])
+            )
+            features = [f"Feature {number}" for number in range(options["features"])]
+            values = [str(number) for number in range(options["values"])]
+
+            self.run(FEATURES, options, [
+                [category.slug, name, f"feature-{number}", "unit"] for number, name in enumerate(features)
+            ])
+            self.run(VALIDATORS, options, [
+                [category.slug, name, value] for name in features for value in values
+            ])
+            rows = [
+                [f"spec-import-benchmark-{number}", name, rng.choice(values)]
+                for number in range(options["products"]) for name in features
+            ]
+            self.run(PRODUCT_FEATURES, options, rows, label="product_features (insert)")
+            self.run(PRODUCT_FEATURES, options, [
+                [product, name, rng.choice(values)] for product, name, _ in rows
+            ], label="product_features (update)")
+            transaction.set_rollback(True)
+
+    def run(self, kind, options, rows, label=None):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(IMPORT_COLUMNS[kind])
+        writer.writerows(rows)
+        buffer.seek(0)
+        importer = SpecImporter(kind, chunk_size=options["chunk_size"])
+        started = time.perf_counter()
+        results = importer.upsert(buffer, as_string_obj=True)
+        seconds = time.perf_counter() - started
+        errors = len(results["errors"])
+        self.stdout.write(
+            f"{label or kind:>28}: {len(rows):>7} rows in {seconds:6.2f} s, "
+            f"{len(rows) / seconds:>9.0f} rows/s, {errors} errors"
+        )
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.9 on 2026-10-18 08:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('specs', '0002_auto_20211113_1743'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productfeatures',
+            index=models.Index(fields=['feature', 'value'], name='productfeatures_value_idx'),
+        ),
+    ]
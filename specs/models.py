@@ -42,6 +42,9 @@ class ProductFeatures(models.Model):
 
     class Meta:
         verbose_name_plural = "Характеристики товара"
+        indexes = [
+            models.Index(fields=['feature', 'value'], name='productfeatures_value_idx'),
+        ]
 
     def __str__(self):
         return f"Товар - \"{self.product.title} | " \
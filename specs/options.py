@@ -0,0 +1,36 @@
+from django.core.cache import cache
+
+from .models import CategoryFeature, FeatureValidator
+
+
+CATEGORY_OPTIONS_CACHE_KEY = 'specs:category-options:{category_id}'
+
+
+def load_category_options(category_id):
+    """Характеристики категории и валидные значения каждой из них - два запроса"""
+    features = [
+        {'id': feature_id, 'name': name, 'filter_name': filter_name, 'unit': unit or ''}
+        for feature_id, name, filter_name, unit in CategoryFeature.objects.filter(
+            category_id=category_id
+        ).order_by('id').values_list('id', 'feature_name', 'feature_filter_name', 'unit')
+    ]
+    values = {feature['id']: [] for feature in features}
+    for validator_id, feature_id, value in FeatureValidator.objects.filter(
+        category_id=category_id
+    ).order_by('id').values_list('id', 'feature_key_id', 'valid_feature_value'):
+        values.setdefault(feature_id, []).append({'id': validator_id, 'value': value})
+    return {'features': features, 'values': values}
+
+
+def get_category_options(category_id):
+    """Данные выпадающих списков редактора характеристик; сбрасываются сигналами specs.signals"""
+    key = CATEGORY_OPTIONS_CACHE_KEY.format(category_id=category_id)
+    options = cache.get(key)
+    if options is None:
+        options = load_category_options(category_id)
+        cache.set(key, options, None)
+    return options
+
+
+def invalidate_category_options(category_ids):
+    cache.delete_many([CATEGORY_OPTIONS_CACHE_KEY.format(category_id=category_id) for category_id in category_ids])
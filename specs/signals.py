@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import CategoryFeature, FeatureValidator
+from .options import invalidate_category_options
+from store.invalidation import invalidate_on_commit
+
+
+@receiver([post_save, post_delete], sender=CategoryFeature)
+@receiver([post_save, post_delete], sender=FeatureValidator)
+def category_options_changed(sender, instance, **kwargs):
+    """Сбрасывает закэшированные списки характеристик и значений категории"""
+    invalidate_on_commit(invalidate_category_options, [instance.category_id])
@@ -9,12 +9,14 @@ from .views import (
     CreateFeatureView,
     NewProductFeatureView,
     SearchProductAjaxView,
+    ProductAutocompleteAjaxView,
     AttachNewFeatureToProduct,
     ProductFeatureChoicesAjaxView,
     CreateNewProductFeatureAjaxView,
     UpdateProductFeaturesView,
     ShowProductFeaturesForUpdate,
-    UpdateProductFeaturesAjaxView
+    UpdateProductFeaturesAjaxView,
+    ExportSpecsView,
 )
 
 urlpatterns = [
@@ -26,10 +28,12 @@ urlpatterns = [
     path('feature-create/', CreateFeatureView.as_view(), name='create-feature'),
     path('new-product-feature/', NewProductFeatureView.as_view(), name='new-product-feature'),
     path('search-product/', SearchProductAjaxView.as_view(), name='search-product'),
+    path('autocomplete-product/', ProductAutocompleteAjaxView.as_view(), name='autocomplete-product'),
     path('attach-feature/', AttachNewFeatureToProduct.as_view(), name='attach-feature'),
     path('product-feature/', ProductFeatureChoicesAjaxView.as_view(), name='product-feature'),
     path('attach-new-product-feature/', CreateNewProductFeatureAjaxView.as_view(), name='attach-new-product-feature'),
     path('update-product-features/', UpdateProductFeaturesView.as_view(), name='update-product-features'),
     path('show-product-features-for-update/', ShowProductFeaturesForUpdate.as_view(), name='show-product-features-for-update'),
-    path('update-product-features-ajax/', UpdateProductFeaturesAjaxView.as_view(), name='update-product-features-ajax')
+    path('update-product-features-ajax/', UpdateProductFeaturesAjaxView.as_view(), name='update-product-features-ajax'),
+    path('export/', ExportSpecsView.as_view(), name='export-specs'),
 ]
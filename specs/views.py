@@ -1,13 +1,20 @@
 from collections import defaultdict
 
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render
 from django.views.generic import View
-from django.http import HttpResponseRedirect, JsonResponse
+from django.http import HttpResponseBadRequest, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
 
+from .exporter import EXPORT_CONTENT_TYPES, EXPORT_FORMATS, export_catalog
+from .feature_values import update_product_feature_values
 from .models import CategoryFeature, FeatureValidator, ProductFeatures
+from .options import get_category_options
 from .forms import NewCategoryFeatureKeyForm, NewCategoryForm
 from store.models import Category, Product
+from store.autocomplete import autocomplete_products
+from store.search import search_products
 
 
 class BaseSpecView(View):
@@ -58,23 +65,15 @@ class CreateNewFeatureValidator(View):
 
 
 class FeatureChoiceView(View):
+    """Характеристики категории для выпадающего списка: [{value, name}]"""
 
     def get(self, request, *args, **kwargs):
-        option = '<option value="{value}">{option_name}</option>'
-        html_select = """
-            <select class="form-select" name="feature-validators" id="feature-validators-id" aria-label="Default select example">
-                <option selected>---</option>
-                {result}
-            </select>
-                    """
-        feature_key_qs = CategoryFeature.objects.filter(
-            category_id=int(request.GET.get('category_id'))
-        )
-        res_string = ""
-        for item in feature_key_qs:
-            res_string += option.format(value=item.feature_name, option_name=item.feature_name)
-        html_select = html_select.format(result=res_string)
-        return JsonResponse({"result": html_select, "value": int(request.GET.get('category_id'))})
+        category_id = int(request.GET.get('category_id'))
+        options = [
+            {'value': feature['name'], 'name': feature['name']}
+            for feature in get_category_options(category_id)['features']
+        ]
+        return JsonResponse({"result": options, "value": category_id})
 
 
 class CreateFeatureView(View):
@@ -117,60 +116,54 @@ class SearchProductAjaxView(View):
         query = request.GET.get('query')
         category_id = request.GET.get('category_id')
         category = Category.objects.get(id=int(category_id))
-        products = list(Product.objects.filter(
-            category=category,
-            title__icontains=query
-        ).values())
+        product_ids = search_products(query, category.id)
+        found = {product['id']: product for product in Product.objects.filter(id__in=product_ids).values()}
+        products = [found[pk] for pk in product_ids if pk in found]
+        return JsonResponse({"result": products})
+
+
+class ProductAutocompleteAjaxView(View):
+    """Подсказки товаров по началу слова в названии: id, название и slug, не больше max_limit"""
+
+    limit = 10
+    max_limit = 20
+
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = min(max(int(request.GET.get('limit', self.limit)), 1), self.max_limit)
+            category_id = int(request.GET['category_id']) if request.GET.get('category_id') else None
+        except ValueError:
+            return JsonResponse({"result": []}, status=400)
+        products = autocomplete_products(request.GET.get('query', ''), limit, category_id=category_id)
         return JsonResponse({"result": products})
 
 
 class AttachNewFeatureToProduct(View):
+    """Характеристики категории товара, которых у него ещё нет: [{value: id категории, name}]"""
 
     def get(self, request, *args, **kwargs):
-        res_string = ""
-        product = Product.objects.get(id=int(request.GET.get('product_id')))
-        existing_features = list(set([item.feature.feature_name for item in product.features.all()]))
-        print(existing_features)
-        category_features = CategoryFeature.objects.filter(
-            category=product.category
-        ).exclude(feature_name__in=existing_features)
-        option = '<option value="{value}">{option_name}</option>'
-        html_select = """
-            <select class="form-select" name="product-category-features" id="product-category-features-id" aria-label="Default select example">
-                <option selected>---</option>
-                {result}
-            </select>
-                    """
-        for item in category_features:
-            res_string += option.format(value=item.category.id, option_name=item.feature_name)
-        html_select = html_select.format(result=res_string)
-        return JsonResponse({"features": html_select})
+        product = Product.objects.only('id', 'category_id').get(id=int(request.GET.get('product_id')))
+        existing_features = set(product.features.values_list('feature__feature_name', flat=True))
+        options = [
+            {'value': product.category_id, 'name': feature['name']}
+            for feature in get_category_options(product.category_id)['features']
+            if feature['name'] not in existing_features
+        ]
+        return JsonResponse({"features": options})
 
 
 class ProductFeatureChoicesAjaxView(View):
+    """Валидные значения характеристики категории: [{value: id валидатора, name}]"""
 
     def get(self, request, *args, **kwargs):
-        res_string = ""
-        category = Category.objects.get(id=int(request.GET.get('category_id')))
-        feature_key = CategoryFeature.objects.get(
-            category=category,
-            feature_name=request.GET.get('product_feature_name')
-        )
-        validators_qs = FeatureValidator.objects.filter(
-            category=category,
-            feature_key=feature_key
-        )
-        option = '<option value="{value}">{option_name}</option>'
-        html_select = """
-            <select class="form-select" name="product-category-features-choices" id="product-category-features-choices-id" aria-label="Default select example">
-                <option selected>---</option>
-                {result}
-            </select>
-                    """
-        for item in validators_qs:
-            res_string += option.format(value=item.id, option_name=item.valid_feature_value)
-        html_select = html_select.format(result=res_string)
-        return JsonResponse({"features": html_select})
+        category_options = get_category_options(int(request.GET.get('category_id')))
+        feature_name = request.GET.get('product_feature_name')
+        options = [
+            {'value': value['id'], 'name': value['value']}
+            for feature in category_options['features'] if feature['name'] == feature_name
+            for value in category_options['values'][feature['id']]
+        ]
+        return JsonResponse({"features": options})
 
 
 class CreateNewProductFeatureAjaxView(View):
@@ -200,10 +193,17 @@ class UpdateProductFeaturesView(View):
 
 
 class ShowProductFeaturesForUpdate(View):
+    """Характеристики товара с допустимыми значениями для замены: три запроса на любое кол-во характеристик"""
 
     def get(self, request, *args, **kwargs):
-        product = Product.objects.get(id=int(request.GET.get('product_id')))
-        features_values_qs = product.features.all()
+        product = Product.objects.only('id', 'category_id').get(id=int(request.GET.get('product_id')))
+        features_values = list(product.features.select_related('feature'))
+        valid_values = defaultdict(list)
+        for feature_key_id, valid_value in FeatureValidator.objects.filter(
+            category_id=product.category_id,
+            feature_key_id__in={item.feature_id for item in features_values},
+        ).order_by('id').values_list('feature_key_id', 'valid_feature_value'):
+            valid_values[feature_key_id].append(valid_value)
         head = """
         <hr>
             <div class="row">
@@ -236,67 +236,66 @@ class ShowProductFeaturesForUpdate(View):
                 {result}
             </select>
                     """
-        mid_res = ""
-        select_different_values_dict = defaultdict(list)
-        for item in features_values_qs:
-            fv_qs = FeatureValidator.objects.filter(
-                category=item.product.category,
-                feature_key=item.feature
-            ).values()
-            for fv in fv_qs:
-                if fv['valid_feature_value'] == item.value:
-                    pass
-                else:
-                    select_different_values_dict[fv['feature_key_id']].append(fv['valid_feature_value'])
-            feature_field = '<input type="text" class="form-control" id="{id}" value="{value}" disabled/>'
-            current_feature_value = """
+        feature_field = '<input type="text" class="form-control" id="{id}" value="{value}" disabled/>'
+        current_feature_value = """
             <div class='col-md-4 feature-current-value' style='margin-top:10px; margin-bottom:10px;'>{}</div>
                                     """
-            body_feature_field = """
+        body_feature_field = """
             <div class='col-md-4 feature-name' style='margin-top:10px; margin-bottom:10px;'>{}</div>
                                 """
-            body_feature_field_value = """
+        body_feature_field_value = """
             <div class='col-md-4 feature-new-value' style='margin-top:10px; margin-bottom:10px;'>{}</div>
             """
-            body_feature_field = body_feature_field.format(feature_field.format(id=item.feature.id, value=item.feature.feature_name))
-            current_feature_value_mid_res = ""
-            for item_ in select_different_values_dict[item.feature.id]:
-                current_feature_value_mid_res += option.format(value=item.feature.id, option_name=item_)
-            body_feature_field_value = body_feature_field_value.format(
-                select_values.format(item.feature.id, result=current_feature_value_mid_res)
+        rows = []
+        for item in features_values:
+            options = ''.join(
+                option.format(value=item.feature.id, option_name=value)
+                for value in valid_values[item.feature_id] if value != item.value
+            )
+            rows.append(
+                body_feature_field.format(feature_field.format(id=item.feature.id, value=item.feature.feature_name))
+                + current_feature_value.format(feature_field.format(id=item.feature.id, value=item.value))
+                + body_feature_field_value.format(select_values.format(result=options))
             )
-            current_feature_value = current_feature_value.format(feature_field.format(id=item.feature.id, value=item.value))
-            m = body_feature_field + current_feature_value + body_feature_field_value
-            mid_res += m
-        result = head.format(mid_res)
+        result = head.format(''.join(rows))
         return JsonResponse({"result": result})
 
 
 class UpdateProductFeaturesAjaxView(View):
+    """Сохраняет новые значения характеристик товара одним bulk_update, в ответе - изменения по полям"""
 
     def post(self, request, *args, **kwargs):
         features_names = request.POST.getlist('features_names')
-        features_current_values = request.POST.getlist('features_current_values')
         new_feature_values = request.POST.getlist('new_feature_values')
-        data_for_update = [{'feature_name': name, 'current_value': curr_val, 'new_value': new_val} for name, curr_val, new_val
-                           in zip(features_names, features_current_values, new_feature_values)]
         product = Product.objects.get(title=request.POST.get('product'))
-        for item in product.features.all():
-            for item_for_update in data_for_update:
-                if item.feature.feature_name == item_for_update['feature_name']:
-                    if item.value != item_for_update['new_value'] and item_for_update['new_value'] != '---':
-                        cf = CategoryFeature.objects.get(
-                            category=product.category,
-                            feature_name=item_for_update['feature_name']
-                        )
-                        item.value = FeatureValidator.objects.get(
-                            category=product.category,
-                            feature_key=cf,
-                            valid_feature_value=item_for_update['new_value']
-                        ).valid_feature_value
-                        item.save()
+        diff, errors = update_product_feature_values(product, dict(zip(features_names, new_feature_values)))
+        if errors:
+            return JsonResponse({"errors": errors}, status=400)
         messages.add_message(
             request, messages.SUCCESS,
             f'Значения характеристик для товара {product.title} успешно обновлены'
         )
-        return JsonResponse({"result": "ok"})
\ No newline at end of file
+        return JsonResponse({"result": "ok", "diff": diff})
+
+
+@method_decorator(staff_member_required, name='dispatch')
+class ExportSpecsView(View):
+    """Выгрузка каталога с характеристиками потоком: ?format=csv|jsonl|columnar, ?category=<slug>"""
+
+    extensions = {'csv': 'csv', 'jsonl': 'jsonl', 'columnar': 'columnar.jsonl'}
+
+    def get(self, request, *args, **kwargs):
+        file_format = request.GET.get('format', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            return HttpResponseBadRequest(f"Unknown format, expected one of {', '.join(EXPORT_FORMATS)}")
+        category_id = None
+        if request.GET.get('category'):
+            category = Category.objects.filter(slug=request.GET['category']).first()
+            if category is None:
+                return HttpResponseBadRequest("Unknown category")
+            category_id = category.id
+        response = StreamingHttpResponse(
+            export_catalog(file_format, category_id=category_id), content_type=EXPORT_CONTENT_TYPES[file_format]
+        )
+        response['Content-Disposition'] = f'attachment; filename="catalog.{self.extensions[file_format]}"'
+        return response
@@ -7,4 +7,12 @@ admin.site.register(CartProduct)
 admin.site.register(Cart)
 admin.site.register(Customer)
 admin.site.register(Order)
+admin.site.register(OrderLine)
 admin.site.register(Product)
+
+
+@admin.register(ImageVariantJob)
+class ImageVariantJobAdmin(admin.ModelAdmin):
+    list_display = ('product', 'status', 'attempts', 'run_after', 'last_error')
+    list_filter = ('status',)
+    raw_id_fields = ('product',)
@@ -3,11 +3,13 @@ from collections import OrderedDict
 from rest_framework.response import Response
 from rest_framework.generics import ListAPIView, RetrieveAPIView, ListCreateAPIView, RetrieveUpdateAPIView
 from rest_framework.filters import SearchFilter
-from rest_framework.pagination import PageNumberPagination
-from ..models import Category, Customer
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from ..models import Category, Customer, Product
+from ..facets import FacetIndex
 from .serializers import (
     CategorySerializer,
     CustomerSerializer,
+    ProductSerializer,
 )
 
 
@@ -26,6 +28,14 @@ class CategoryPagination(PageNumberPagination):
         ]))
 
 
+class ProductCursorPagination(CursorPagination):
+    """Пагинация по ключу (seek): глубокие страницы не деградируют как OFFSET"""
+    page_size = 12
+    page_size_query_param = 'page_size'
+    max_page_size = 48
+    ordering = 'id'
+
+
 class CategoryAPIView(ListCreateAPIView, RetrieveUpdateAPIView):
     """API категорий"""
     serializer_class = CategorySerializer
@@ -34,6 +44,34 @@ class CategoryAPIView(ListCreateAPIView, RetrieveUpdateAPIView):
     lookup_field = 'id'
 
 
+class ProductListAPIView(ListAPIView):
+    """API товаров (с фильтром по категории ?category=<id>)"""
+    serializer_class = ProductSerializer
+    pagination_class = ProductCursorPagination
+
+    def get_queryset(self):
+        queryset = Product.objects.defer('description')
+        category_id = self.request.query_params.get('category')
+        if category_id:
+            queryset = queryset.filter(category_id=category_id)
+        return queryset
+
+
+class CategoryFacetsAPIView(RetrieveAPIView):
+    """API счётчиков фасетов категории с учётом выбранных фильтров"""
+    queryset = Category.objects.all()
+    lookup_field = 'id'
+
+    def retrieve(self, request, *args, **kwargs):
+        category = self.get_object()
+        facet_index = FacetIndex.for_category(category.id)
+        filters = facet_index.filters_from_query(request.query_params)
+        return Response(OrderedDict([
+            ('filters', filters),
+            ('facets', facet_index.counts(filters)),
+        ]))
+
+
 # class SmartphoneListAPIView(ListAPIView):
 #     """API смартфонов"""
 #     serializer_class = SmartphoneSerializer
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 
-from ..models import Category, Customer, Order
+from ..models import Category, Customer, Order, Product
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -27,6 +27,16 @@ class BaseProductSerializer:
     slug = serializers.SlugField(required=True)
 
 
+class ProductSerializer(BaseProductSerializer, serializers.ModelSerializer):
+    """Сериалайзер от модели Продукта (без описания, для списков)"""
+
+    class Meta:
+        model = Product
+        fields = [
+            'id', 'category', 'title', 'price', 'image', 'slug'
+        ]
+
+
 # class SmartphoneSerializer(BaseProductSerializer, serializers.ModelSerializer):
 #     """Сериалайзер от модели Смартфонов"""
 #
@@ -2,6 +2,8 @@ from django.urls import path
 
 from .api_views import (
     CategoryAPIView,
+    CategoryFacetsAPIView,
+    ProductListAPIView,
     # SmartphoneListAPIView,
     # NotebookListAPIView,
     # SmartphoneDetailAPIView,
@@ -12,6 +14,8 @@ from .api_views import (
 
 urlpatterns = [
     path('categories/<str:id>/', CategoryAPIView.as_view(), name='categories_list'),
+    path('categories/<str:id>/facets/', CategoryFacetsAPIView.as_view(), name='category_facets'),
+    path('products/', ProductListAPIView.as_view(), name='products_list'),
     path('customers/', CustomersListAPIView.as_view(), name='customers_list'),
     # path('smartphones/', SmartphoneListAPIView.as_view(), name='smartphones_list'),
     # path('notebooks/', NotebookListAPIView.as_view(), name='notebooks_list'),
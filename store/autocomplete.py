@@ -0,0 +1,157 @@
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.core.cache import cache
+
+from .models import Product
+from .search import tokenize
+
+
+AUTOCOMPLETE_SEQUENCE_KEY = 'store:autocomplete:sequence'
+AUTOCOMPLETE_CHANGE_KEY = 'store:autocomplete:change:{sequence}'
+# Сколько последних изменений хранится в кэше; отставший сильнее процесс перестраивает индекс целиком
+AUTOCOMPLETE_CHANGES_KEPT = 1000
+AUTOCOMPLETE_CHANGE_TIMEOUT = 60 * 60
+
+
+def title_keys(title):
+    """Ключи названия: с каждого слова до конца ("galaxy s21 ultra", "s21 ultra", "ultra")"""
+    tokens = tokenize(title)
+    return [' '.join(tokens[position:]) for position in range(len(tokens))]
+
+
+class TitlePrefixIndex:
+    """Отсортированные массивы ключей нормализованных названий для поиска по началу слова:
+    общий и по массиву на категорию, чтобы поиск в категории не перебирал чужие товары.
+    Изменения товаров применяются точечно (bisect/insort), без перестройки массивов."""
+
+    def __init__(self):
+        self.keys = []
+        self.category_keys = {}
+        self.products = {}
+
+    @classmethod
+    def build(cls):
+        return cls.from_rows(Product.objects.values_list('id', 'title', 'slug', 'category_id').iterator())
+
+    @classmethod
+    def from_rows(cls, rows):
+        """rows - кортежи (id, название, slug, id категории)"""
+        index = cls()
+        entries = []
+        for product_id, title, slug, category_id in rows:
+            index.products[product_id] = (title, slug, category_id)
+            keys = [(key, product_id) for key in title_keys(title)]
+            entries.extend(keys)
+            index.category_keys.setdefault(category_id, []).extend(keys)
+        entries.sort()
+        index.keys = entries
+        for keys in index.category_keys.values():
+            keys.sort()
+        return index
+
+    def remove(self, product_id):
+        product = self.products.pop(product_id, None)
+        if product is None:
+            return
+        title, _, category_id = product
+        category_keys = self.category_keys.get(category_id, [])
+        for key in title_keys(title):
+            for keys in (self.keys, category_keys):
+                position = bisect_left(keys, (key, product_id))
+                if position < len(keys) and keys[position] == (key, product_id):
+                    del keys[position]
+        if not category_keys:
+            self.category_keys.pop(category_id, None)
+
+    def add(self, product_id, title, slug, category_id):
+        self.remove(product_id)
+        self.products[product_id] = (title, slug, category_id)
+        category_keys = self.category_keys.setdefault(category_id, [])
+        for key in title_keys(title):
+            insort(self.keys, (key, product_id))
+            insort(category_keys, (key, product_id))
+
+    def complete(self, prefix, limit, category_id=None):
+        """[{id, title, slug}] товаров, у которых слово названия начинается с prefix"""
+        prefix = ' '.join(tokenize(prefix))
+        if not prefix:
+            return []
+        keys = self.keys if category_id is None else self.category_keys.get(category_id, [])
+        results = []
+        seen = set()
+        position = bisect_left(keys, (prefix,))
+        while position < len(keys) and len(results) < limit:
+            key, product_id = keys[position]
+            if not key.startswith(prefix):
+                break
+            position += 1
+            if product_id in seen:
+                continue
+            seen.add(product_id)
+            title, slug, _ = self.products[product_id]
+            results.append({'id': product_id, 'title': title, 'slug': slug})
+        return results
+
+
+class AutocompleteIndexHolder:
+    """Индекс процесса, догоняющий изменения товаров из журнала в общем кэше"""
+
+    def __init__(self):
+        self.index = None
+        self.sequence = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        sequence = cache.get_or_set(AUTOCOMPLETE_SEQUENCE_KEY, _new_sequence_start, None)
+        with self._lock:
+            if self.index is None or sequence < self.sequence or not self._catch_up(sequence):
+                self.index = TitlePrefixIndex.build()
+            self.sequence = sequence
+            return self.index
+
+    def _catch_up(self, sequence):
+        if sequence == self.sequence:
+            return True
+        if sequence - self.sequence > AUTOCOMPLETE_CHANGES_KEPT:
+            return False
+        keys = [AUTOCOMPLETE_CHANGE_KEY.format(sequence=number) for number in range(self.sequence + 1, sequence + 1)]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys):
+            return False
+        product_ids = set(changes.values())
+        rows = Product.objects.filter(id__in=product_ids).values_list('id', 'title', 'slug', 'category_id')
+        for product_id in product_ids:
+            self.index.remove(product_id)
+        for row in rows:
+            self.index.add(*row)
+        return True
+
+    def clear(self):
+        with self._lock:
+            self.index = None
+            self.sequence = None
+
+
+def _new_sequence_start():
+    # Начало журнала от времени: после вытеснения номер прыгает вперёд, записей за пропуск нет,
+    # и все процессы перестраивают индекс целиком
+    return time.time_ns() // 1000
+
+
+autocomplete_index = AutocompleteIndexHolder()
+
+
+def product_title_changed(product_id):
+    """Записывает изменение товара в журнал; процессы применят его при следующем запросе"""
+    try:
+        sequence = cache.incr(AUTOCOMPLETE_SEQUENCE_KEY)
+    except ValueError:
+        cache.set(AUTOCOMPLETE_SEQUENCE_KEY, _new_sequence_start(), None)
+        return
+    cache.set(AUTOCOMPLETE_CHANGE_KEY.format(sequence=sequence), product_id, AUTOCOMPLETE_CHANGE_TIMEOUT)
+
+
+def autocomplete_products(prefix, limit, category_id=None):
+    return autocomplete_index.get().complete(prefix, limit, category_id=category_id)
@@ -0,0 +1,229 @@
+import copy
+from collections import namedtuple
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+from .models import Cart, CartProduct, Product
+from .utils import CART_SESSION_KEY, apply_cart_delta, get_cart, get_customer_cart, recalc_cart
+
+
+SESSION_CART_KEY = 'cart_lines'
+
+# Поддерживается PostgreSQL и SQLite >= 3.35 (ON CONFLICT ... RETURNING).
+# qty = 1 в ответе означает, что строка вставлена (кол-во меньше 1 в корзине не хранится)
+UPSERT_CART_PRODUCT_SQL = """
+    INSERT INTO {table} (user_id, cart_id, product_id, qty, final_price)
+    VALUES (%s, %s, %s, 1, %s)
+    ON CONFLICT (cart_id, product_id) DO UPDATE
+    SET qty = {table}.qty + 1, final_price = {table}.final_price + EXCLUDED.final_price
+    RETURNING id, qty, final_price
+"""
+
+
+def lock_cart(cart):
+    """Корзина из БД, заблокированная до конца транзакции"""
+    return Cart.objects.select_for_update(of=('self',)).select_related('owner').get(pk=cart.pk)
+
+
+# Изменённая строка корзины; методы изменения возвращают её (None - строка удалена).
+# remove и set_qty для товара, которого нет в корзине, бросают CartProduct.DoesNotExist
+CartLine = namedtuple('CartLine', 'product qty final_price')
+
+
+class DBCartBackend:
+    """Корзина в БД: каждое изменение сразу пишется в Cart/CartProduct.
+    Товар в методах изменения - Product или ProductRef (нужны id и price)"""
+
+    def __init__(self, request):
+        self.request = request
+        self.cart = get_cart(request)
+
+    def _ensure_saved(self):
+        # Анонимная корзина сохраняется только при первом добавлении товара
+        if self.cart.pk is None:
+            self.cart.save()
+            self.request.session[CART_SESSION_KEY] = self.cart.id
+
+    def add(self, product):
+        """Добавляет товар или увеличивает его кол-во одним INSERT ... ON CONFLICT (cart, product)"""
+        self._ensure_saved()
+        table = connection.ops.quote_name(CartProduct._meta.db_table)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                UPSERT_CART_PRODUCT_SQL.format(table=table),
+                [self.cart.owner_id, self.cart.id, product.id, product.price]
+            )
+            cart_product_id, qty, final_price = cursor.fetchone()
+            created = qty == 1
+            if created:
+                self.cart.products.add(cart_product_id)
+            apply_cart_delta(self.cart, 1 if created else 0, product.price)
+        # Сырые значения из курсора SQLite приходят без масштаба поля
+        final_price_field = CartProduct._meta.get_field('final_price')
+        final_price = final_price_field.to_python(final_price).quantize(
+            Decimal(1).scaleb(-final_price_field.decimal_places)
+        )
+        return CartLine(product, qty, final_price)
+
+    def remove(self, product):
+        with transaction.atomic():
+            cart_product = CartProduct.objects.only('id', 'final_price').get(
+                cart=self.cart, product_id=product.id
+            )
+            cart_product.delete()                            # удаляет товар корзины из базы(админки)
+            apply_cart_delta(self.cart, -1, -cart_product.final_price)
+
+    def set_qty(self, product, qty):
+        if qty < 1:
+            return self.remove(product)
+        with transaction.atomic():
+            cart_product = CartProduct.objects.select_for_update().only('id', 'final_price').get(
+                cart=self.cart, product_id=product.id
+            )
+            final_price = qty * product.price
+            CartProduct.objects.filter(pk=cart_product.pk).update(qty=qty, final_price=final_price)
+            apply_cart_delta(self.cart, 0, final_price - cart_product.final_price)
+        return CartLine(product, qty, final_price)
+
+    def atomic(self):
+        """Пакет изменений: при ошибке не применяется ни одно"""
+        return transaction.atomic()
+
+    def materialize(self):
+        """Корзина в БД для оформления заказа, заблокированная до конца транзакции"""
+        return lock_cart(self.cart)
+
+    def clear(self):
+        pass
+
+
+class SessionCartLine:
+    """Строка корзины из сессии (цена зафиксирована на момент добавления)"""
+
+    def __init__(self, product, qty, price):
+        self.product = product
+        self.product_id = product.id
+        self.qty = qty
+        self.price = price
+        self.final_price = qty * price
+
+
+class SessionCart:
+    """Корзина из сессии с тем же интерфейсом, что у Cart для шаблонов"""
+
+    owner = None
+
+    def __init__(self, lines):
+        self.lines = lines
+        self._items = None
+
+    @property
+    def products(self):
+        return self
+
+    def all(self):
+        if self._items is None:
+            products = Product.objects.defer('description').in_bulk([int(pk) for pk in self.lines])
+            self._items = [
+                SessionCartLine(products[int(pk)], qty, Decimal(price))
+                for pk, (qty, price) in self.lines.items() if int(pk) in products
+            ]
+        return self._items
+
+    def count(self):
+        return len(self.lines)
+
+    @property
+    def total_products(self):
+        return len(self.lines)
+
+    @property
+    def final_price(self):
+        return sum((qty * Decimal(price) for qty, price in self.lines.values()), Decimal('0'))
+
+
+class SessionCartBackend:
+    """Корзина в сессии: {id товара: [кол-во, цена]}.
+    Cart/CartProduct создаются только при оформлении заказа (materialize)."""
+
+    def __init__(self, request):
+        self.request = request
+        self.lines = request.session.get(SESSION_CART_KEY, {})
+        self.cart = SessionCart(self.lines)
+
+    def _save(self):
+        self.request.session[SESSION_CART_KEY] = self.lines
+        self.cart = SessionCart(self.lines)
+
+    def _line(self, product):
+        qty, price = self.lines[str(product.id)]
+        return CartLine(product, qty, qty * Decimal(price))
+
+    def _key(self, product):
+        key = str(product.id)
+        if key not in self.lines:
+            raise CartProduct.DoesNotExist(f"Product {product.id} is not in the cart")
+        return key
+
+    def add(self, product):
+        key = str(product.id)
+        if key in self.lines:
+            self.lines[key][0] += 1
+        else:
+            self.lines[key] = [1, str(product.price)]
+        self._save()
+        return self._line(product)
+
+    def remove(self, product):
+        del self.lines[self._key(product)]
+        self._save()
+
+    def set_qty(self, product, qty):
+        if qty < 1:
+            return self.remove(product)
+        self.lines[self._key(product)][0] = qty
+        self._save()
+        return self._line(product)
+
+    @contextmanager
+    def atomic(self):
+        """Пакет изменений: транзакция БД сессию не откатит, поэтому при ошибке
+        строки возвращаются к копии, снятой до пакета"""
+        snapshot = copy.deepcopy(self.lines)
+        try:
+            yield
+        except Exception:
+            self.lines = snapshot
+            self._save()
+            raise
+
+    def materialize(self):
+        """Переносит строки сессии в открытую корзину покупателя одним bulk_create.
+        Корзина блокируется до переноса: параллельная отправка ждёт и получает уже оформленную корзину,
+        а не вставляет те же строки второй раз"""
+        cart = lock_cart(get_customer_cart(self.request.user))
+        if cart.in_order:
+            return cart
+        CartProduct.objects.filter(cart=cart).delete()
+        CartProduct.objects.bulk_create([
+            CartProduct(
+                user=cart.owner, cart=cart, product_id=int(pk), qty=qty, final_price=qty * Decimal(price)
+            )
+            for pk, (qty, price) in self.lines.items()
+        ])
+        cart.products.set(CartProduct.objects.filter(cart=cart))
+        recalc_cart(cart)
+        return cart
+
+    def clear(self):
+        self.lines = {}
+        self._save()
+
+
+def get_cart_backend(request):
+    backend = getattr(settings, 'STORE_CART_BACKEND', 'store.cart_backends.DBCartBackend')
+    return import_string(backend)(request)
@@ -0,0 +1,41 @@
+import time
+
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils.functional import SimpleLazyObject
+
+from .models import Category
+
+
+CATEGORY_NAV_VERSION_KEY = 'store:category-nav:version'
+CATEGORY_NAV_CACHE_KEY = 'store:category-nav:{version}'
+CATEGORY_NAV_TIMEOUT = 60 * 60 * 24
+
+
+def _category_nav_version():
+    # Начальная версия от времени: после вытеснения ключа из кэша старые записи не всплывут
+    return cache.get_or_set(CATEGORY_NAV_VERSION_KEY, int(time.time()), None)
+
+
+def get_category_navigation():
+    """Список категорий для боковой панели: название, ссылка и кол-во товаров"""
+    key = CATEGORY_NAV_CACHE_KEY.format(version=_category_nav_version())
+    navigation = cache.get(key)
+    if navigation is None:
+        navigation = [
+            {'name': category.name, 'url': category.get_absolute_url(), 'count': category.product_count}
+            for category in Category.objects.annotate(product_count=Count('product')).order_by('id')
+        ]
+        cache.set(key, navigation, CATEGORY_NAV_TIMEOUT)
+    return navigation
+
+
+def invalidate_category_navigation():
+    try:
+        cache.incr(CATEGORY_NAV_VERSION_KEY)
+    except ValueError:
+        cache.set(CATEGORY_NAV_VERSION_KEY, int(time.time()), None)
+
+
+def categories(request):
+    return {'categories': SimpleLazyObject(get_category_navigation)}
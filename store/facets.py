@@ -0,0 +1,72 @@
+from django.core.cache import cache
+
+from specs.models import CategoryFeature, ProductFeatures
+
+
+FACET_INDEX_CACHE_KEY = 'store:facets:{category_id}'
+
+
+class FacetIndex:
+    """Фасетный индекс категории: имя фильтра -> значение -> множество id товаров"""
+
+    def __init__(self, category_id, facets):
+        self.category_id = category_id
+        self.facets = facets
+
+    @classmethod
+    def build(cls, category_id):
+        facets = {
+            name: {} for name in CategoryFeature.objects.filter(
+                category_id=category_id
+            ).values_list('feature_filter_name', flat=True)
+        }
+        rows = ProductFeatures.objects.filter(
+            feature__category_id=category_id
+        ).values_list('feature__feature_filter_name', 'value', 'product_id')
+        for filter_name, value, product_id in rows.iterator():
+            facets.setdefault(filter_name, {}).setdefault(value, set()).add(product_id)
+        return cls(category_id, facets)
+
+    @classmethod
+    def for_category(cls, category_id):
+        key = FACET_INDEX_CACHE_KEY.format(category_id=category_id)
+        facets = cache.get(key)
+        if facets is None:
+            index = cls.build(category_id)
+            cache.set(key, index.facets, None)
+            return index
+        return cls(category_id, facets)
+
+    def filters_from_query(self, query_dict):
+        """Оставляет в GET-параметрах только фильтры по характеристикам категории"""
+        return {
+            name: query_dict.getlist(name)
+            for name in query_dict if name in self.facets
+        }
+
+    def match(self, filters):
+        """И между характеристиками, ИЛИ между значениями одной характеристики"""
+        product_ids = None
+        for name, values in filters.items():
+            values_index = self.facets.get(name, {})
+            matched = set().union(*(values_index.get(value, ()) for value in values))
+            product_ids = matched if product_ids is None else product_ids & matched
+            if not product_ids:
+                return set()
+        return product_ids if product_ids is not None else set()
+
+    def counts(self, filters):
+        """Кол-во товаров для каждого значения с учётом фильтров по остальным характеристикам"""
+        facet_counts = {}
+        for name, values_index in self.facets.items():
+            other_filters = {key: values for key, values in filters.items() if key != name}
+            base_ids = self.match(other_filters) if other_filters else None
+            facet_counts[name] = {
+                value: len(product_ids if base_ids is None else product_ids & base_ids)
+                for value, product_ids in values_index.items()
+            }
+        return facet_counts
+
+
+def invalidate_facet_index(category_id):
+    cache.delete(FACET_INDEX_CACHE_KEY.format(category_id=category_id))
@@ -0,0 +1,93 @@
+from django.core.cache import cache
+
+from specs.models import ProductFeatures
+
+
+PRODUCT_SPECS_CACHE_KEY = 'store:specs:{product_id}'
+
+
+def load_product_specs(product_ids):
+    """Характеристики нескольких товаров одним запросом: {id товара: {имя: значение с единицей}}"""
+    specs = {product_id: {} for product_id in product_ids}
+    rows = ProductFeatures.objects.filter(
+        features_for_product__id__in=product_ids
+    ).select_related('feature').values_list(
+        'features_for_product', 'feature__feature_name', 'value', 'feature__unit'
+    ).order_by('id')
+    for product_id, feature_name, value, unit in rows:
+        specs[product_id][feature_name] = ' '.join([value, unit or ""])
+    return specs
+
+
+def get_product_specs(product_id):
+    key = PRODUCT_SPECS_CACHE_KEY.format(product_id=product_id)
+    specs = cache.get(key)
+    if specs is None:
+        specs = load_product_specs([product_id])[product_id]
+        cache.set(key, specs, None)
+    return specs
+
+
+def get_many_product_specs(product_ids):
+    """Характеристики страницы товаров: из кэша, недостающие - одним запросом"""
+    keys = {PRODUCT_SPECS_CACHE_KEY.format(product_id=product_id): product_id for product_id in product_ids}
+    cached = cache.get_many(keys)
+    specs = {keys[key]: value for key, value in cached.items()}
+    missing = [product_id for product_id in product_ids if product_id not in specs]
+    if missing:
+        loaded = load_product_specs(missing)
+        cache.set_many(
+            {PRODUCT_SPECS_CACHE_KEY.format(product_id=product_id): value for product_id, value in loaded.items()},
+            None
+        )
+        specs.update(loaded)
+    return specs
+
+
+class SpecTable:
+    """Характеристики набора товаров по колонкам: имя характеристики -> значения по товарам"""
+
+    def __init__(self, product_ids, specs):
+        self.product_ids = list(product_ids)
+        self.feature_names = []
+        for product_id in self.product_ids:
+            for feature_name in specs[product_id]:
+                if feature_name not in self.feature_names:
+                    self.feature_names.append(feature_name)
+        self.columns = {
+            feature_name: [specs[product_id].get(feature_name, '') for product_id in self.product_ids]
+            for feature_name in self.feature_names
+        }
+
+    @classmethod
+    def for_products(cls, product_ids):
+        product_ids = list(product_ids)
+        return cls(product_ids, get_many_product_specs(product_ids))
+
+    @classmethod
+    def attach(cls, products, key_specs=None):
+        """Таблица для списка товаров; с key_specs каждому товару проставляется
+        product.key_specs - первые N характеристик"""
+        table = cls.for_products([product.id for product in products])
+        if key_specs:
+            for product in products:
+                product.key_specs = list(table.for_product(product.id).items())[:key_specs]
+        return table
+
+    def for_product(self, product_id):
+        position = self.product_ids.index(product_id)
+        return {
+            feature_name: values[position]
+            for feature_name, values in self.columns.items() if values[position]
+        }
+
+    def rows(self):
+        """Строки для таблицы сравнения: (имя, значения, различаются ли значения)"""
+        return [
+            (feature_name, values, len(set(values)) > 1)
+            for feature_name, values in self.columns.items()
+        ]
+
+
+def invalidate_product_specs(product_ids):
+    cache.delete_many([PRODUCT_SPECS_CACHE_KEY.format(product_id=product_id) for product_id in product_ids])
@@ -1,3 +1,5 @@
+import uuid
+
 from django import forms
 
 from .models import Order
@@ -9,8 +11,12 @@ class OrderForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['order_date'].label = 'Дата получения заказа'
+        if not self.is_bound:
+            self.fields['idempotency_key'].initial = uuid.uuid4()
 
     order_date = forms.DateField(widget=forms.TextInput(attrs={'type': 'date'}))
+    # Новый ключ при каждом открытии формы, повторы отправки приходят с тем же ключом
+    idempotency_key = forms.UUIDField(widget=forms.HiddenInput, required=False)
 
     class Meta:
         model = Order
@@ -0,0 +1,113 @@
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .images import build_image_variants, save_image_variants
+from .models import ImageVariantJob, Product
+
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+# Пауза перед повтором: 30 с, 1 мин, 2 мин, ...
+RETRY_BASE_DELAY = timedelta(seconds=30)
+# Задание дольше этого в статусе running считается брошенным упавшим воркером
+STALE_AFTER = timedelta(minutes=10)
+STALE_ERROR = 'Worker stopped while processing the job'
+
+
+def enqueue_image_variants(product):
+    """Ставит товар в очередь на копии изображения. Пишется в той же транзакции, что и товар"""
+    updated = ImageVariantJob.objects.filter(
+        product=product, status=ImageVariantJob.STATUS_PENDING
+    ).update(source=product.image.name, run_after=timezone.now())
+    if not updated:
+        ImageVariantJob.objects.create(product=product, source=product.image.name)
+
+
+def claim_jobs(limit):
+    """Забирает готовые к запуску задания. Параллельные воркеры пропускают строки,
+    заблокированные друг другом (SKIP LOCKED), поэтому задание достаётся одному воркеру"""
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(ImageVariantJob.objects.select_for_update(skip_locked=True).filter(
+            status=ImageVariantJob.STATUS_PENDING, run_after__lte=now
+        ).order_by('run_after', 'id')[:limit])
+        ImageVariantJob.objects.filter(id__in=[job.id for job in jobs]).update(
+            status=ImageVariantJob.STATUS_RUNNING, locked_at=now, attempts=F('attempts') + 1
+        )
+    for job in jobs:
+        job.status = ImageVariantJob.STATUS_RUNNING
+        job.attempts += 1
+    return jobs
+
+
+def requeue_stale_jobs():
+    """Возвращает брошенные задания в очередь; исчерпавшие попытки помечаются ошибкой,
+    иначе задание, роняющее воркер, бралось бы бесконечно. Возвращает кол-во возвращённых"""
+    stale = ImageVariantJob.objects.filter(
+        status=ImageVariantJob.STATUS_RUNNING, locked_at__lt=timezone.now() - STALE_AFTER
+    )
+    stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status=ImageVariantJob.STATUS_FAILED, locked_at=None, last_error=STALE_ERROR
+    )
+    return stale.update(status=ImageVariantJob.STATUS_PENDING, locked_at=None)
+
+
+def run_job(job):
+    """Выполняет задание: выполненное удаляется, упавшее откладывается или помечается ошибкой"""
+    image = Product.objects.filter(pk=job.product_id).values_list('image', flat=True).first()
+    # Изображение успели заменить - копии сделает задание для нового изображения
+    if image == job.source:
+        try:
+            save_image_variants(job.product_id, build_image_variants(job.source))
+        except OSError as error:
+            fail_job(job, error)
+            return False
+        except Exception as error:
+            # Не ошибка чтения (например, DecompressionBombError): повтор не поможет,
+            # а воркер должен перейти к следующему заданию
+            logger.exception("image variants for product %s failed", job.product_id)
+            fail_job(job, error, retry=False)
+            return False
+    job.delete()
+    return True
+
+
+def fail_job(job, error, retry=True):
+    logger.warning("image variants for product %s failed (attempt %d): %s", job.product_id, job.attempts, error)
+    job.last_error = str(error) or type(error).__name__
+    job.locked_at = None
+    if not retry or job.attempts >= MAX_ATTEMPTS:
+        job.status = ImageVariantJob.STATUS_FAILED
+    else:
+        job.status = ImageVariantJob.STATUS_PENDING
+        job.run_after = timezone.now() + RETRY_BASE_DELAY * 2 ** (job.attempts - 1)
+    job.save(update_fields=['status', 'last_error', 'locked_at', 'run_after'])
+
+
+def run_pending_jobs(limit=10):
+    """Один проход воркера: (выполнено, с ошибкой)"""
+    requeue_stale_jobs()
+    done = failed = 0
+    for job in claim_jobs(limit):
+        if run_job(job):
+            done += 1
+        else:
+            failed += 1
+    return done, failed
+
+
+def queue_depth():
+    """Кол-во заданий по статусам, в том числе отложенных до повтора"""
+    depth = {status: 0 for status, _ in ImageVariantJob.STATUS_CHOICES}
+    depth.update(
+        ImageVariantJob.objects.values_list('status').annotate(jobs=Count('id')).order_by()
+    )
+    depth['delayed'] = ImageVariantJob.objects.filter(
+        status=ImageVariantJob.STATUS_PENDING, run_after__gt=timezone.now()
+    ).count()
+    return depth
@@ -0,0 +1,104 @@
+import os
+from functools import partial
+from io import BytesIO
+
+from PIL import Image, features
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from .invalidation import invalidate_on_commit
+from .models import Product
+from .page_cache import PRODUCTS_TAG, category_tag, invalidate_page_tags, product_tag
+
+
+# Ширины уменьшенных копий; больше оригинала копии не делаются
+DEFAULT_IMAGE_WIDTHS = (320, 640, 1024)
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+DERIVATIVES_DIR = 'derivatives'
+
+
+def get_image_widths():
+    return tuple(sorted(getattr(settings, 'STORE_IMAGE_WIDTHS', DEFAULT_IMAGE_WIDTHS)))
+
+
+def variant_name(source, width, extension):
+    """images/phone.png -> derivatives/images/phone/320w.webp"""
+    root, _ = os.path.splitext(source)
+    return f'{DERIVATIVES_DIR}/{root}/{width}w.{extension}'
+
+
+def _encode(image, image_format, **options):
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def _save(storage, name, content):
+    # Имя варианта детерминировано: старый файл заменяется, а не получает суффикс
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, content)
+
+
+def build_image_variants(source, widths=None, storage=None):
+    """Делает уменьшенные копии изображения source в исходном формате (JPEG/PNG) и в WebP.
+    К БД не обращается, поэтому годится для пула процессов."""
+    storage = storage or default_storage
+    widths = widths or get_image_widths()
+    with storage.open(source, 'rb') as image_file:
+        original = Image.open(image_file)
+        original.load()
+    has_alpha = original.mode in ('RGBA', 'LA') or 'transparency' in original.info
+    original = original.convert('RGBA' if has_alpha else 'RGB')
+    fallback = ('PNG', 'png', {'optimize': True}) if has_alpha else ('JPEG', 'jpg', {'quality': JPEG_QUALITY})
+    formats = [fallback]
+    if features.check('webp'):
+        formats.insert(0, ('WEBP', 'webp', {'quality': WEBP_QUALITY}))
+
+    # Маленький оригинал даёт одну копию в своём размере
+    target_widths = [width for width in widths if width < original.width] or [original.width]
+    variants = []
+    for width in target_widths:
+        height = max(1, round(original.height * width / original.width))
+        resized = original.resize((width, height), Image.LANCZOS)
+        for image_format, extension, options in formats:
+            name = _save(storage, variant_name(source, width, extension), _encode(resized, image_format, **options))
+            variants.append({'width': width, 'format': extension, 'name': name})
+    return {'source': source, 'variants': variants}
+
+
+def save_image_variants(product_id, image_variants, storage=None):
+    """Записывает варианты, если у товара всё ещё то же изображение. update() сигналов не шлёт,
+    поэтому страницы товара сбрасываются здесь; файлы прежних вариантов удаляются после фиксации,
+    когда закэшированных страниц со ссылками на них уже нет"""
+    storage = storage or default_storage
+    previous = Product.objects.filter(pk=product_id).values_list(
+        'image_variants', 'slug', 'category__slug'
+    ).first()
+    updated = Product.objects.filter(
+        pk=product_id, image=image_variants['source']
+    ).update(image_variants=image_variants)
+    if not updated:
+        return False
+    previous_variants, product_slug, category_slug = previous
+    invalidate_on_commit(invalidate_page_tags, PRODUCTS_TAG, category_tag(category_slug), product_tag(product_slug))
+    current = {variant['name'] for variant in image_variants['variants']}
+    stale = [
+        variant['name'] for variant in (previous_variants or {}).get('variants', ()) if variant['name'] not in current
+    ]
+    if stale:
+        transaction.on_commit(partial(_delete_files, storage, stale))
+    return True
+
+
+def _delete_files(storage, names):
+    for name in names:
+        storage.delete(name)
+
+
+def image_variants_are_current(product):
+    return bool(product.image) and (product.image_variants or {}).get('source') == product.image.name
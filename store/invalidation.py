@@ -0,0 +1,38 @@
+from functools import partial
+
+from django.db import transaction
+
+from .facets import invalidate_facet_index
+from .features import invalidate_product_specs
+from .models import Product
+from .page_cache import PRODUCTS_TAG, category_tag, invalidate_page_tags, product_tag
+from .search import update_search_documents
+
+
+def invalidate_on_commit(func, *args):
+    """Сброс кэша после фиксации транзакции. Сброшенный до неё кэш параллельный запрос успел бы
+    заполнить старыми данными, и он остался бы устаревшим. Вне транзакции вызывается сразу.
+    Аргументы вычисляются сейчас: после удаления строк их уже не прочитать"""
+    transaction.on_commit(partial(func, *args))
+
+
+def product_features_bulk_changed(product_ids):
+    """То же, что сигналы характеристик, для пачки товаров: bulk_create/bulk_update сигналов не шлют"""
+    product_ids = set(product_ids)
+    rows = list(Product.objects.filter(id__in=product_ids).values_list('slug', 'category_id', 'category__slug'))
+    tags = [PRODUCTS_TAG]
+    for category_id in {category_id for _, category_id, _ in rows}:
+        invalidate_on_commit(invalidate_facet_index, category_id)
+    for product_slug, _, category_slug in rows:
+        tags += [category_tag(category_slug), product_tag(product_slug)]
+    invalidate_on_commit(invalidate_product_specs, product_ids)
+    update_search_documents(product_ids)
+    invalidate_on_commit(invalidate_page_tags, *tags)
+
+
+def invalidate_product_pages(product_ids):
+    """Сбрасывает после фиксации страницы товаров, их категорий и главную"""
+    tags = [PRODUCTS_TAG]
+    for product_slug, category_slug in Product.objects.filter(id__in=product_ids).values_list('slug', 'category__slug'):
+        tags += [category_tag(category_slug), product_tag(product_slug)]
+    invalidate_on_commit(invalidate_page_tags, *tags)
@@ -0,0 +1,65 @@
+import random
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from store.autocomplete import TitlePrefixIndex
+
+
+BRANDS = "apple samsung xiaomi google oneplus sony nokia motorola huawei honor realme oppo vivo asus lenovo".split()
+LINES = "galaxy redmi pixel xperia zenfone note pro max mini ultra lite plus edge find reno".split()
+SMALL_CATEGORY_SIZE = 50
+CASES = (
+    ("s", None), ("sams", None), ("galaxy ul", None), ("pixel", 7),
+    ("pixel", 1), ("nokia", 20), ("note", 20),
+    # Без результатов: префикса нет вовсе, он есть только в чужих категориях, категории нет
+    ("zzz", None), ("zzz", 1), ("sams", 20), ("galaxy", 21),
+)
+
+
+class Command(BaseCommand):
+    help = """Benchmark title autocomplete on a synthetic catalog: prefix lookups and in-place updates
+    of the sorted key arrays. Categories are skewed (one holds most products, the smallest has 50
+    products of a single brand), and no-match lookups are timed too. Lookups should stay well under
+    a millisecond, inside a category as well.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=100000, help="Products in the synthetic catalog.")
+        parser.add_argument("--limit", type=int, default=10, help="Suggestions per lookup.")
+        parser.add_argument("--number", type=int, default=1000, help="Calls per timing.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        # Категория 1 - больше половины каталога, 2 - четверть, остальные делят хвост
+        categories = list(range(1, 20))
+        weights = [60, 25] + [15 / 17] * 17
+        rows = [
+            (
+                product_id,
+                f"{rng.choice(BRANDS)} {rng.choice(LINES)} {rng.choice(LINES)} {rng.randrange(1, 100)}",
+                f"product-{product_id}",
+                rng.choices(categories, weights)[0],
+            )
+            for product_id in range(1, options["products"] - SMALL_CATEGORY_SIZE + 1)
+        ]
+        rows += [
+            (product_id, f"nokia {rng.choice(LINES)} {rng.randrange(1, 100)}", f"product-{product_id}", 20)
+            for product_id in range(len(rows) + 1, len(rows) + SMALL_CATEGORY_SIZE + 1)
+        ]
+        index = TitlePrefixIndex.from_rows(rows)
+        self.stdout.write(f"Index over {len(rows)} products, {len(index.keys)} keys")
+
+        self.stdout.write(f"{'prefix':>16} {'category':>9} {'results':>8} {'complete() us':>14}")
+        for prefix, category_id in CASES:
+            results = index.complete(prefix, options["limit"], category_id=category_id)
+            seconds = timeit.timeit(
+                lambda: index.complete(prefix, options["limit"], category_id=category_id), number=options["number"]
+            ) / options["number"]
+            self.stdout.write(f"{prefix:>16} {str(category_id):>9} {len(results):>8} {seconds * 1e6:>14.1f}")
+
+        product_ids = iter(range(1, options["products"] + 1))
+        seconds = timeit.timeit(
+            lambda: index.add(next(product_ids), "renamed phone 1", "renamed", 1), number=options["number"]
+        ) / options["number"]
+        self.stdout.write(f"add() of a renamed product: {seconds * 1e6:.1f} us")
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+
+from store.models import Cart
+from store.utils import recalc_cart
+
+
+class Command(BaseCommand):
+    help = """Compare incrementally maintained cart totals with a full re-aggregation of cart lines.
+    Reports every cart that drifted; with --repair, recalculates them.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repair", action="store_true", help="Recalculate totals of the carts that drifted."
+        )
+        parser.add_argument(
+            "--all", action="store_true", dest="include_ordered", help="Check carts that are already in orders too."
+        )
+
+    def handle(self, *args, **options):
+        carts = Cart.objects.annotate(
+            actual_total_products=Count('products'),
+            actual_final_price=Sum('products__final_price'),
+        ).order_by('id')
+        if not options["include_ordered"]:
+            carts = carts.filter(in_order=False)
+
+        drifted = 0
+        for cart in carts.iterator():
+            actual_final_price = cart.actual_final_price or 0
+            if cart.total_products == cart.actual_total_products and cart.final_price == actual_final_price:
+                continue
+            drifted += 1
+            self.stdout.write(
+                f"Cart {cart.id}: total_products {cart.total_products} != {cart.actual_total_products} "
+                f"or final_price {cart.final_price} != {actual_final_price}"
+            )
+            if options["repair"]:
+                recalc_cart(cart)
+
+        action = "repaired" if options["repair"] else "found"
+        self.stdout.write(f"Drifted carts {action}: {drifted}")
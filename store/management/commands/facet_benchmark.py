@@ -0,0 +1,37 @@
+import random
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from store.facets import FacetIndex
+
+
+class Command(BaseCommand):
+    help = """Benchmark facet counts on a synthetic category index with growing feature-value cardinality.
+    The catalog size stays fixed, so the time per counts() call should stay roughly flat.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=20000, help="Products in the synthetic category.")
+        parser.add_argument("--features", type=int, default=8, help="Features per product.")
+        parser.add_argument(
+            "--cardinalities", type=int, nargs="+", default=[10, 100, 1000, 10000],
+            help="Distinct values per feature to benchmark."
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        product_ids = range(1, options["products"] + 1)
+        self.stdout.write(f"{'values/feature':>15} {'counts() ms':>12}")
+        for cardinality in options["cardinalities"]:
+            facets = {}
+            for feature_index in range(options["features"]):
+                values_index = facets.setdefault(f"feature_{feature_index}", {})
+                for product_id in product_ids:
+                    values_index.setdefault(str(rng.randrange(cardinality)), set()).add(product_id)
+            index = FacetIndex(category_id=0, facets=facets)
+            filters = {"feature_0": ["0", "1"], "feature_1": ["0"]}
+            seconds = min(timeit.repeat(lambda: index.counts(filters), number=1, repeat=options["repeat"]))
+            # Счётчики считаются по закэшированному индексу, обращений к БД нет
+            self.stdout.write(f"{cardinality:>15} {seconds * 1000:>12.2f}")
@@ -0,0 +1,48 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+from store.images import build_image_variants, save_image_variants
+from store.models import Product
+
+
+def build(product_id, source):
+    # Выполняется в дочернем процессе: только Pillow и хранилище. Унаследованное соединение
+    # с БД дочерние процессы не трогают, всё пишет в БД родительский процесс.
+    # Любая ошибка (и не OSError, например DecompressionBombError) - ошибка товара, а не всей команды
+    try:
+        return product_id, build_image_variants(source), None
+    except Exception as error:
+        return product_id, None, str(error) or type(error).__name__
+
+
+class Command(BaseCommand):
+    help = """Generate thumbnails and WebP variants for product images that have none or outdated ones.
+    Images are resized in a process pool; results are written to the database by this process.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+        parser.add_argument("--all", action="store_true", help="Regenerate variants of every product image.")
+
+    def handle(self, *args, **options):
+        jobs = [
+            (product_id, image, variants)
+            for product_id, image, variants in Product.objects.exclude(image='').order_by('id').values_list(
+                'id', 'image', 'image_variants'
+            ).iterator()
+            if options["all"] or (variants or {}).get('source') != image
+        ]
+        self.stdout.write(f"Product images to process: {len(jobs)}")
+
+        generated = failed = 0
+        with ProcessPoolExecutor(max_workers=options["workers"]) as executor:
+            futures = [executor.submit(build, product_id, image) for product_id, image, _ in jobs]
+            for future in as_completed(futures):
+                product_id, image_variants, error = future.result()
+                if error:
+                    failed += 1
+                    self.stderr.write(f"Product {product_id}: {error}")
+                elif save_image_variants(product_id, image_variants):
+                    generated += 1
+        self.stdout.write(f"Variants generated: {generated}, failed: {failed}")
@@ -0,0 +1,38 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from store.image_queue import queue_depth, run_pending_jobs
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = """Process the image variant queue: build thumbnails and WebP variants for uploaded product images.
+    Failed jobs are retried with a growing delay. Several workers can run at once on PostgreSQL.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10, help="Jobs claimed per poll.")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--once", action="store_true", help="Process the jobs that are due and exit.")
+        parser.add_argument("--status", action="store_true", help="Print the queue depth and exit.")
+
+    def handle(self, *args, **options):
+        if options["status"]:
+            for status, jobs in queue_depth().items():
+                self.stdout.write(f"{status:>10} {jobs}")
+            return
+
+        while True:
+            done, failed = run_pending_jobs(options["batch_size"])
+            if done or failed:
+                logger.info("image variants: %d done, %d failed", done, failed)
+            elif options["once"]:
+                return
+            else:
+                time.sleep(options["sleep"])
+                # Долгоживущий процесс: соединение переоткрывается по CONN_MAX_AGE, как между запросами
+                close_old_connections()
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from store.models import Product
+from store.search import update_search_documents
+
+
+class Command(BaseCommand):
+    help = """Rebuild product search documents from products and their feature values.
+    Needed after bulk writes that bypass model signals (queryset.update, bulk_create, raw SQL).
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        product_ids = list(Product.objects.order_by('id').values_list('id', flat=True))
+        batch_size = options["batch_size"]
+        for start in range(0, len(product_ids), batch_size):
+            update_search_documents(product_ids[start:start + batch_size])
+        self.stdout.write(f"Search documents rebuilt: {len(product_ids)}")
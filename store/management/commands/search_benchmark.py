@@ -0,0 +1,55 @@
+import itertools
+import random
+import time
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from store.search import InvertedIndex
+
+
+WORDS = (
+    "phone smartphone tablet notebook laptop pro max mini ultra lite plus galaxy redmi pixel "
+    "black white blue green red gold silver graphite amoled oled ips lcd camera battery fast "
+    "charging wireless dual sim nfc 5g wifi bluetooth stereo speakers metal glass plastic"
+).split()
+
+
+class Command(BaseCommand):
+    help = """Benchmark the in-process inverted search index on a synthetic catalog:
+    index build time and ranked query latency for full words and an unfinished last word.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=100000, help="Products in the synthetic catalog.")
+        parser.add_argument("--vocabulary", type=int, default=20000, help="Rare words in the synthetic catalog.")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--limit", type=int, default=48, help="Results per query.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        # Частые слова каталога плюс длинный хвост редких (модели, артикулы) с убывающей частотой
+        vocabulary = WORDS + [f"model{number}" for number in range(options["vocabulary"])]
+        cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+
+        def text(words):
+            return " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=words))
+
+        documents = [
+            (product_id, text(4), text(8), text(30))
+            for product_id in range(1, options["products"] + 1)
+        ]
+        started = time.perf_counter()
+        index = InvertedIndex.from_documents(documents)
+        self.stdout.write(
+            f"Index over {len(documents)} products, {len(index.tokens)} tokens: "
+            f"built in {time.perf_counter() - started:.2f} s"
+        )
+
+        self.stdout.write(f"{'query':>24} {'results':>8} {'search() ms':>12}")
+        for query in ("phone", "galaxy", "black pro", "amoled camera wireless", "galaxy ultra gr", "model123", "model12"):
+            results = index.search(query, options["limit"])
+            seconds = min(timeit.repeat(
+                lambda: index.search(query, options["limit"]), number=1, repeat=options["repeat"]
+            ))
+            self.stdout.write(f"{query:>24} {len(results):>8} {seconds * 1000:>12.2f}")
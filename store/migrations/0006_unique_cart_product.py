@@ -0,0 +1,37 @@
+# Generated by Django 3.2.9 on 2026-10-18 09:02
+
+from django.db import migrations, models
+
+
+def merge_duplicate_cart_products(apps, schema_editor):
+    # Дубли (cart, product) от гонок в add-to-cart сливаются в одну строку до создания ограничения.
+    # Итоги корзин после этого выравнивает manage.py check_cart_totals --repair
+    CartProduct = apps.get_model('store', 'CartProduct')
+    duplicates = CartProduct.objects.values('cart_id', 'product_id').annotate(
+        rows=models.Count('id')
+    ).filter(rows__gt=1)
+    for duplicate in duplicates:
+        cart_products = list(CartProduct.objects.filter(
+            cart_id=duplicate['cart_id'], product_id=duplicate['product_id']
+        ).order_by('id'))
+        kept = cart_products[0]
+        for cart_product in cart_products[1:]:
+            kept.qty += cart_product.qty
+            kept.final_price += cart_product.final_price
+            cart_product.delete()
+        kept.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0005_cartproduct_anonymous_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_cart_products, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartproduct',
+            constraint=models.UniqueConstraint(fields=('cart', 'product'), name='unique_cart_product'),
+        ),
+    ]
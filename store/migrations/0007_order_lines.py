@@ -0,0 +1,59 @@
+# Generated by Django 3.2.9 on 2026-10-18 08:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def snapshot_existing_orders(apps, schema_editor):
+    # Для старых заказов снимок берётся из корзины заказа (цены - какие есть в корзине сейчас)
+    Order = apps.get_model('store', 'Order')
+    OrderLine = apps.get_model('store', 'OrderLine')
+    CartProduct = apps.get_model('store', 'CartProduct')
+    for order in Order.objects.filter(cart__isnull=False).iterator():
+        OrderLine.objects.bulk_create([
+            OrderLine(
+                order=order,
+                product=cart_product.product,
+                title=cart_product.product.title,
+                slug=cart_product.product.slug,
+                image=cart_product.product.image,
+                price=cart_product.product.price,
+                qty=cart_product.qty,
+                final_price=cart_product.final_price,
+            )
+            for cart_product in CartProduct.objects.filter(cart_id=order.cart_id).select_related('product')
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0006_unique_cart_product'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Дата создания заказа'),
+        ),
+        migrations.CreateModel(
+            name='OrderLine',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255, verbose_name='Название')),
+                ('slug', models.SlugField(max_length=130)),
+                ('image', models.ImageField(blank=True, upload_to='images/', verbose_name='Изображение')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=9, verbose_name='Цена')),
+                ('qty', models.PositiveIntegerField(default=1)),
+                ('final_price', models.DecimalField(decimal_places=2, max_digits=9, verbose_name='Общая цена')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='store.order', verbose_name='Заказ')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='store.product', verbose_name='Товар')),
+            ],
+            options={
+                'verbose_name': 'Строка заказа',
+                'verbose_name_plural': 'Строки заказов',
+            },
+        ),
+        migrations.RunPython(snapshot_existing_orders, migrations.RunPython.noop),
+    ]
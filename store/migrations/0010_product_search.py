@@ -0,0 +1,86 @@
+# Generated by Django 3.2.9 on 2026-10-18 08:48
+
+from django.db import DatabaseError, migrations, models, transaction
+import django.db.models.deletion
+
+
+# Выражение индекса повторяет store.search.SEARCH_VECTOR_SQL
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('simple', title), 'A') || "
+    "setweight(to_tsvector('simple', features), 'B') || "
+    "setweight(to_tsvector('simple', description), 'C')"
+)
+
+
+def create_postgres_search_indexes(apps, schema_editor):
+    # В SQLite поиск идёт по обратному индексу в памяти, индексы в БД не нужны
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f"CREATE INDEX productsearch_vector_idx ON store_productsearchdocument USING gin (({SEARCH_VECTOR_SQL}))"
+    )
+    # pg_trgm есть не везде (нужен contrib и права); без него поиск идёт только по tsvector
+    try:
+        with transaction.atomic():
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DatabaseError:
+        return
+    schema_editor.execute(
+        "CREATE INDEX productsearch_title_trgm_idx ON store_productsearchdocument USING gin (title gin_trgm_ops)"
+    )
+
+
+def drop_postgres_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS productsearch_vector_idx")
+    schema_editor.execute("DROP INDEX IF EXISTS productsearch_title_trgm_idx")
+
+
+def build_search_documents(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    ProductFeatures = apps.get_model('specs', 'ProductFeatures')
+    ProductSearchDocument = apps.get_model('store', 'ProductSearchDocument')
+    feature_values = {}
+    for product_id, value in ProductFeatures.objects.order_by('id').values_list('product_id', 'value').iterator():
+        feature_values.setdefault(product_id, []).append(value)
+    ProductSearchDocument.objects.bulk_create(
+        (
+            ProductSearchDocument(
+                product_id=product.id,
+                category_id=product.category_id,
+                title=product.title,
+                features=' '.join(feature_values.get(product.id, ())),
+                description=product.description or '',
+            )
+            for product in Product.objects.only('id', 'category_id', 'title', 'description').iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0009_hot_query_indexes'),
+        ('specs', '0003_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchDocument',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='store.product')),
+                ('title', models.CharField(max_length=255, verbose_name='Название')),
+                ('features', models.TextField(blank=True, default='', verbose_name='Значения характеристик')),
+                ('description', models.TextField(blank=True, default='', verbose_name='Описание')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='store.category', verbose_name='Категория')),
+            ],
+            options={
+                'verbose_name': 'Поисковый документ товара',
+                'verbose_name_plural': 'Поисковые документы товаров',
+            },
+        ),
+        migrations.RunPython(create_postgres_search_indexes, drop_postgres_search_indexes),
+        migrations.RunPython(build_search_documents, migrations.RunPython.noop),
+    ]
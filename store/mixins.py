@@ -1,23 +1,57 @@
+from django.http import HttpResponse
 from django.views.generic import View
 
-from .models import Cart, Customer
+from .cart_backends import get_cart_backend
+from .page_cache import (
+    CART_BADGE_PLACEHOLDER,
+    get_cached_page,
+    page_cache_key,
+    page_is_cacheable,
+    page_tag_versions,
+    set_cached_page,
+)
 
 
 class CartMixin(View):
 
     def dispatch(self, request, *args, **kwargs):
-        if request.user.is_authenticated:
-            customer = Customer.objects.filter(user=request.user).first()
-            if not customer:
-                customer = Customer.objects.create(
-                    user=request.user
-                )
-            cart = Cart.objects.filter(owner=customer, in_order=False).first()
-            if not cart:
-                cart = Cart.objects.create(owner=customer)
-        else:
-            cart = Cart.objects.filter(for_anonymous_user=True).first()
-            if not cart:
-                cart = Cart.objects.create(for_anonymous_user=True)
-        self.cart = cart
+        self.cart_backend = get_cart_backend(request)
+        self.cart = self.cart_backend.cart
         return super().dispatch(request, *args, **kwargs)
+
+
+class PageCacheMixin(View):
+    """Кэш страницы целиком для анонимов, ставится после CartMixin. Счётчик корзины в шаблоне заменён меткой
+    cart_badge_placeholder и подставляется в готовую страницу на каждый запрос."""
+
+    cart_badge_placeholder = None
+
+    def get_page_tags(self):
+        """Теги страницы: изменение данных под тегом сбрасывает все страницы с ним"""
+        raise NotImplementedError
+
+    def dispatch(self, request, *args, **kwargs):
+        if not page_is_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+        key = page_cache_key(request)
+        page = get_cached_page(key)
+        if page is None:
+            # Версии тегов берутся до рендера: изменение во время рендера не закрепит устаревшую страницу
+            tag_versions = page_tag_versions(self.get_page_tags())
+            self.cart_badge_placeholder = CART_BADGE_PLACEHOLDER
+            response = super().dispatch(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+            if response.status_code != 200:
+                return response
+            set_cached_page(key, tag_versions, response)
+            page = {'content': response.content.decode(response.charset), 'content_type': response['Content-Type']}
+        return HttpResponse(
+            page['content'].replace(CART_BADGE_PLACEHOLDER, str(self.cart.total_products)),
+            content_type=page['content_type'],
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['cart_badge_placeholder'] = self.cart_badge_placeholder
+        return context
@@ -4,6 +4,8 @@ from django.contrib.contenttypes.models import ContentType
 from django.urls import reverse
 from django.utils import timezone
 
+from .features import SpecTable, get_product_specs
+
 User = get_user_model()
 
 class Category(models.Model):
@@ -22,6 +24,13 @@ class Category(models.Model):
         return reverse('category_detail', kwargs={'slug': self.slug})
 
 
+class ProductQuerySet(models.QuerySet):
+
+    def spec_table(self, key_specs=None):
+        """Характеристики всех товаров выборки одним-двумя запросами"""
+        return SpecTable.attach(list(self), key_specs=key_specs)
+
+
 class Product(models.Model):
     """Продукт"""
     category = models.ForeignKey(Category, verbose_name="Категория", on_delete=models.CASCADE)
@@ -29,18 +38,26 @@ class Product(models.Model):
     price = models.DecimalField("Цена", max_digits=9, decimal_places=2)
     description = models.TextField("Описание", null=True)
     image = models.ImageField("Изображение", upload_to="images/")
+    # Уменьшенные копии изображения (см. store.images): {"source": имя оригинала, "variants": [...]}
+    image_variants = models.JSONField("Варианты изображения", default=dict, blank=True, editable=False)
     slug = models.SlugField(max_length=130, unique=True)
     features = models.ManyToManyField("specs.ProductFeatures", blank=True, related_name='features_for_product')
 
+    objects = ProductQuerySet.as_manager()
+
     def __str__(self):
         return self.title
 
     class Meta:
         verbose_name = "Продукт"
         verbose_name_plural = "Продукты"
+        indexes = [
+            # Товары категории постранично по id (keyset)
+            models.Index(fields=['category', 'id'], name='product_category_id_idx'),
+        ]
 
     def get_features(self):
-        return {f.feature.feature_name: ' '.join([f.value, f.feature.unit or ""]) for f in self.features.all()}
+        return get_product_specs(self.id)
 
     def get_absolute_url(self):
         return reverse('product_detail', kwargs={'slug': self.slug})
@@ -48,7 +65,7 @@ class Product(models.Model):
 
 class CartProduct(models.Model):
     """Продукт в корзине"""
-    user = models.ForeignKey('Customer', verbose_name="Покупатель", on_delete=models.CASCADE)
+    user = models.ForeignKey('Customer', verbose_name="Покупатель", null=True, blank=True, on_delete=models.CASCADE)
     cart = models.ForeignKey('Cart', verbose_name="Корзина", on_delete=models.CASCADE, related_name='related_products')
     product = models.ForeignKey(Product, verbose_name='Товар', on_delete=models.CASCADE)
     qty = models.PositiveIntegerField(default=1)
@@ -60,6 +77,9 @@ class CartProduct(models.Model):
     class Meta:
         verbose_name = "Продукт в корзине"
         verbose_name_plural = "Продукты в корзине"
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'product'], name='unique_cart_product'),
+        ]
 
     def save(self, *args, **kwargs):
         self.final_price = self.qty * self.product.price
@@ -81,6 +101,10 @@ class Cart(models.Model):
     class Meta:
         verbose_name = "Корзина"
         verbose_name_plural = "Корзины"
+        indexes = [
+            # Открытая корзина покупателя, оформленные в индекс не попадают
+            models.Index(fields=['owner'], name='cart_open_owner_idx', condition=models.Q(in_order=False)),
+        ]
 
 
 class Customer(models.Model):
@@ -140,8 +164,10 @@ class Order(models.Model):
         default=BUYING_TYPE_SELF
     )
     comment = models.TextField(verbose_name='Комментарий к заказу', null=True, blank=True)
-    created_at = models.DateTimeField(auto_now=True, verbose_name='Дата создания заказа')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания заказа')
     order_date = models.DateField(verbose_name='Дата получения заказа', default=timezone.now)
+    # Ключ из формы оформления: повторная отправка той же формы не создаёт второй заказ
+    idempotency_key = models.UUIDField(verbose_name='Ключ идемпотентности', null=True, blank=True, editable=False)
 
     def __str__(self):
         return str(self.id)
@@ -149,3 +175,91 @@ class Order(models.Model):
     class Meta:
         verbose_name = "Заказ"
         verbose_name_plural = "Заказы"
+        constraints = [
+            models.UniqueConstraint(fields=['customer', 'idempotency_key'], name='unique_order_idempotency_key'),
+        ]
+        indexes = [
+            # История заказов в профиле
+            models.Index(fields=['customer', '-created_at', '-id'], name='order_customer_created_idx'),
+        ]
+
+
+class OrderLine(models.Model):
+    """Строка заказа: снимок товара, цены и кол-ва на момент оформления (не меняется)"""
+    order = models.ForeignKey(Order, verbose_name='Заказ', related_name='lines', on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, verbose_name='Товар', null=True, blank=True, on_delete=models.SET_NULL)
+    title = models.CharField("Название", max_length=255)
+    slug = models.SlugField(max_length=130)
+    image = models.ImageField("Изображение", upload_to="images/", blank=True)
+    price = models.DecimalField("Цена", max_digits=9, decimal_places=2)
+    qty = models.PositiveIntegerField(default=1)
+    final_price = models.DecimalField("Общая цена", max_digits=9, decimal_places=2)
+
+    def __str__(self):
+        return "Продукт: {} (заказ {})".format(self.title, self.order_id)
+
+    class Meta:
+        verbose_name = "Строка заказа"
+        verbose_name_plural = "Строки заказов"
+
+    @classmethod
+    def from_cart_product(cls, order, cart_product):
+        product = cart_product.product
+        return cls(
+            order=order,
+            product=product,
+            title=product.title,
+            slug=product.slug,
+            image=product.image.name,
+            price=(cart_product.final_price / cart_product.qty).quantize(product.price) if cart_product.qty else product.price,
+            qty=cart_product.qty,
+            final_price=cart_product.final_price,
+        )
+
+
+class ProductSearchDocument(models.Model):
+    """Поисковый документ товара: текст полей для поискового индекса (см. store.search)"""
+    product = models.OneToOneField(
+        Product, primary_key=True, related_name='search_document', on_delete=models.CASCADE
+    )
+    category = models.ForeignKey(Category, verbose_name="Категория", on_delete=models.CASCADE)
+    title = models.CharField("Название", max_length=255)
+    features = models.TextField("Значения характеристик", blank=True, default='')
+    description = models.TextField("Описание", blank=True, default='')
+
+    class Meta:
+        verbose_name = "Поисковый документ товара"
+        verbose_name_plural = "Поисковые документы товаров"
+
+
+class ImageVariantJob(models.Model):
+    """Задание очереди: сделать уменьшенные копии изображения товара (см. store.image_queue)"""
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Ожидает'),
+        (STATUS_RUNNING, 'Выполняется'),
+        (STATUS_FAILED, 'Ошибка'),
+    )
+
+    product = models.ForeignKey(Product, verbose_name='Товар', on_delete=models.CASCADE)
+    source = models.CharField("Изображение", max_length=100)
+    status = models.CharField("Статус", max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField("Попыток", default=0)
+    last_error = models.TextField("Последняя ошибка", blank=True, default='')
+    run_after = models.DateTimeField("Не раньше", default=timezone.now)
+    locked_at = models.DateTimeField("Взято в работу", null=True, blank=True)
+    created_at = models.DateTimeField("Создано", auto_now_add=True)
+
+    def __str__(self):
+        return "Копии изображения товара {} ({})".format(self.product_id, self.get_status_display())
+
+    class Meta:
+        verbose_name = "Задание на копии изображения"
+        verbose_name_plural = "Очередь копий изображений"
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='imagejob_status_run_after_idx'),
+        ]
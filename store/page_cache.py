@@ -0,0 +1,81 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+
+PAGE_CACHE_KEY = 'store:page:{language}:{digest}'
+PAGE_TAG_KEY = 'store:page-tag:{tag}'
+PAGE_CACHE_TIMEOUT = 60 * 10
+
+# Метка на месте счётчика корзины: страница в кэше общая, счётчик подставляется на каждый запрос
+CART_BADGE_PLACEHOLDER = mark_safe('<!--cart-badge-->')
+
+# Теги страниц. navigation есть у всех страниц: список категорий с кол-вом товаров в боковой панели
+NAVIGATION_TAG = 'navigation'
+PRODUCTS_TAG = 'products'
+
+
+def category_tag(slug):
+    return f'category:{slug}'
+
+
+def product_tag(slug):
+    return f'product:{slug}'
+
+
+def get_page_cache_timeout():
+    return getattr(settings, 'STORE_PAGE_CACHE_TIMEOUT', PAGE_CACHE_TIMEOUT)
+
+
+def page_is_cacheable(request):
+    """В общий кэш попадают только GET-запросы анонимов без непоказанных сообщений"""
+    if request.method != 'GET' or not get_page_cache_timeout():
+        return False
+    if request.user.is_authenticated:
+        return False
+    return not len(messages.get_messages(request))
+
+
+def page_cache_key(request):
+    query = '&'.join(f'{name}={value}' for name, values in sorted(request.GET.lists()) for value in sorted(values))
+    digest = hashlib.md5(f'{request.path}?{query}'.encode()).hexdigest()
+    return PAGE_CACHE_KEY.format(language=get_language() or settings.LANGUAGE_CODE, digest=digest)
+
+
+def page_tag_versions(tags):
+    # Начальная версия от времени: после вытеснения тега из кэша старые страницы не всплывут
+    return {tag: cache.get_or_set(PAGE_TAG_KEY.format(tag=tag), int(time.time()), None) for tag in tags}
+
+
+def get_cached_page(key):
+    """Страница из кэша, если ни один её тег не сбрасывался с момента рендера"""
+    page = cache.get(key)
+    if page is None:
+        return None
+    current = cache.get_many([PAGE_TAG_KEY.format(tag=tag) for tag in page['tags']])
+    for tag, version in page['tags'].items():
+        if current.get(PAGE_TAG_KEY.format(tag=tag)) != version:
+            return None
+    return page
+
+
+def set_cached_page(key, tag_versions, response):
+    cache.set(key, {
+        'tags': tag_versions,
+        'content': response.content.decode(response.charset),
+        'content_type': response['Content-Type'],
+    }, get_page_cache_timeout())
+
+
+def invalidate_page_tags(*tags):
+    for tag in set(tags):
+        key = PAGE_TAG_KEY.format(tag=tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, int(time.time()), None)
@@ -0,0 +1,107 @@
+class KeysetPage:
+    """Страница выборки по ключу с курсорами на соседние страницы"""
+
+    def __init__(self, object_list, has_next, has_previous, query_dict):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.query_dict = query_dict
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def _url(self, **cursor):
+        params = self.query_dict.copy()
+        params.pop('after', None)
+        params.pop('before', None)
+        params.update(cursor)
+        return '?' + params.urlencode()
+
+    @property
+    def next_url(self):
+        if self.has_next and self.object_list:
+            return self._url(after=self.object_list[-1].pk)
+
+    @property
+    def previous_url(self):
+        if self.has_previous and self.object_list:
+            return self._url(before=self.object_list[0].pk)
+
+
+class KeysetPaginator:
+    """Постраничный вывод по первичному ключу (seek) вместо OFFSET: ?after=<id> / ?before=<id>.
+    Глубокие страницы стоят столько же, сколько первая."""
+
+    page_size = 12
+    page_size_query_param = 'page_size'
+    max_page_size = 48
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    def get_page_size(self, query_dict):
+        try:
+            page_size = int(query_dict.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def paginate(self, query_dict):
+        page_size = self.get_page_size(query_dict)
+        after = self._cursor(query_dict.get('after'))
+        before = self._cursor(query_dict.get('before'))
+        if before is not None:
+            rows = list(self.queryset.filter(pk__lt=before).order_by('-pk')[:page_size + 1])
+            has_previous = len(rows) > page_size
+            return KeysetPage(rows[:page_size][::-1], True, has_previous, query_dict)
+        queryset = self.queryset.order_by('pk')
+        if after is not None:
+            queryset = queryset.filter(pk__gt=after)
+        rows = list(queryset[:page_size + 1])
+        return KeysetPage(rows[:page_size], len(rows) > page_size, after is not None, query_dict)
+
+    @staticmethod
+    def _cursor(value):
+        try:
+            return int(value) if value else None
+        except ValueError:
+            return None
+
+
+class RankedPage(KeysetPage):
+    """Страница результатов в порядке релевантности: соседние страницы по номеру (?page=<n>)"""
+
+    def __init__(self, object_list, number, has_next, query_dict):
+        super().__init__(object_list, has_next, number > 1, query_dict)
+        self.number = number
+
+    @property
+    def next_url(self):
+        if self.has_next:
+            return self._url(page=self.number + 1)
+
+    @property
+    def previous_url(self):
+        if self.has_previous:
+            return self._url(page=self.number - 1)
+
+
+class RankedPaginator(KeysetPaginator):
+    """Постраничный вывод уже отранжированных id (поиск): порядок задаёт список, а не первичный ключ.
+    Запрос страницы - только её товары"""
+
+    def __init__(self, queryset, ids):
+        super().__init__(queryset)
+        self.ids = ids
+
+    def paginate(self, query_dict):
+        page_size = self.get_page_size(query_dict)
+        number = self._cursor(query_dict.get('page')) or 1
+        number = max(1, min(number, (len(self.ids) - 1) // page_size + 1))
+        page_ids = self.ids[(number - 1) * page_size:number * page_size]
+        found = self.queryset.in_bulk(page_ids)
+        rows = [found[pk] for pk in page_ids if pk in found]
+        return RankedPage(rows, number, len(self.ids) > number * page_size, query_dict)
@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.core.cache import cache
+
+from .models import Product
+
+
+PRODUCT_REF_CACHE_KEY = 'store:product-ref:{slug}'
+PRODUCT_REF_FIELDS = ('id', 'slug', 'price', 'title', 'category_id')
+
+# Минимум полей товара для корзины - без тяжёлого description
+ProductRef = namedtuple('ProductRef', PRODUCT_REF_FIELDS)
+
+
+class LocalLRU:
+    """LRU в памяти процесса. Записи живут не дольше ttl секунд: сигнал сбрасывает их
+    только в своём воркере, остальные воркеры увидят изменение не позже чем через ttl."""
+
+    def __init__(self, maxsize=2048, ttl=10):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_product_refs = LocalLRU()
+
+
+def get_product_refs(slugs):
+    """{slug: ProductRef}: из LRU процесса, затем из общего кэша, недостающие - одним запросом"""
+    refs = {}
+    missing = []
+    for slug in set(slug for slug in slugs if slug):
+        ref = local_product_refs.get(slug)
+        if ref is None:
+            missing.append(slug)
+        else:
+            refs[slug] = ref
+    if missing:
+        cached = cache.get_many([PRODUCT_REF_CACHE_KEY.format(slug=slug) for slug in missing])
+        for ref in cached.values():
+            refs[ref.slug] = ref
+            local_product_refs.set(ref.slug, ref)
+        missing = [slug for slug in missing if slug not in refs]
+    if missing:
+        loaded = {
+            row[1]: ProductRef(*row)
+            for row in Product.objects.filter(slug__in=missing).values_list(*PRODUCT_REF_FIELDS)
+        }
+        cache.set_many({PRODUCT_REF_CACHE_KEY.format(slug=slug): ref for slug, ref in loaded.items()}, None)
+        for slug, ref in loaded.items():
+            local_product_refs.set(slug, ref)
+        refs.update(loaded)
+    return refs
+
+
+def get_product_ref(slug):
+    ref = get_product_refs([slug]).get(slug)
+    if ref is None:
+        raise Product.DoesNotExist(f"Product with slug '{slug}' does not exist")
+    return ref
+
+
+def invalidate_product_ref(slug):
+    local_product_refs.delete(slug)
+    cache.delete(PRODUCT_REF_CACHE_KEY.format(slug=slug))
@@ -0,0 +1,237 @@
+import heapq
+import math
+import re
+import time
+from bisect import bisect_left
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+from specs.models import ProductFeatures
+from .models import Product, ProductSearchDocument
+from .product_refs import LocalLRU
+
+
+SEARCH_INDEX_VERSION_KEY = 'store:search-index:version:{category_id}'
+
+# Вес совпадения по полю документа: название важнее характеристик, характеристики - описания
+SEARCH_FIELDS = ('title', 'features', 'description')
+SEARCH_FIELD_WEIGHTS = (3.0, 2.0, 1.0)
+
+# Должно совпадать с выражением индекса productsearch_vector_idx (миграция 0010_product_search)
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('simple', title), 'A') || "
+    "setweight(to_tsvector('simple', features), 'B') || "
+    "setweight(to_tsvector('simple', description), 'C')"
+)
+
+POSTGRES_SEARCH_SQL = """
+    SELECT product_id
+    FROM {table}, {tsquery} AS query
+    WHERE category_id = %(category_id)s AND ({vector} @@ query{trigram_match})
+    ORDER BY ts_rank({vector}, query){trigram_rank} DESC, product_id
+    LIMIT %(limit)s
+"""
+# С pg_trgm находятся и опечатки/незаконченные слова в названии
+WEBSEARCH_TSQUERY_SQL = "websearch_to_tsquery('simple', %(query)s)"
+# Без pg_trgm незаконченное последнее слово ищется как префикс: все слова запроса, последнее - с :*
+PREFIX_TSQUERY_SQL = "to_tsquery('simple', %(prefix_query)s)"
+TRIGRAM_MATCH_SQL = " OR %(query)s <%% title"
+TRIGRAM_RANK_SQL = " + word_similarity(%(query)s, title)"
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower().replace('ё', 'е'))
+
+
+def search_document_fields(product, feature_values):
+    return {
+        'category_id': product.category_id,
+        'title': product.title,
+        'features': ' '.join(feature_values),
+        'description': product.description or '',
+    }
+
+
+def update_search_documents(product_ids):
+    """Пересобирает поисковые документы товаров (три запроса на пачку товаров)"""
+    product_ids = set(product_ids)
+    if not product_ids:
+        return
+    stale_categories = set(ProductSearchDocument.objects.filter(
+        product_id__in=product_ids
+    ).values_list('category_id', flat=True))
+    feature_values = {}
+    for product_id, value in ProductFeatures.objects.filter(
+        product_id__in=product_ids
+    ).order_by('id').values_list('product_id', 'value'):
+        feature_values.setdefault(product_id, []).append(value)
+    products = Product.objects.filter(id__in=product_ids).only('id', 'category_id', 'title', 'description')
+    documents = [
+        ProductSearchDocument(product_id=product.id, **search_document_fields(product, feature_values.get(product.id, ())))
+        for product in products
+    ]
+    ProductSearchDocument.objects.filter(product_id__in=product_ids).delete()
+    ProductSearchDocument.objects.bulk_create(documents)
+    # Индекс сбрасывается после фиксации документов, иначе его перестроят по старым
+    for category_id in stale_categories | {document.category_id for document in documents}:
+        transaction.on_commit(partial(invalidate_search_index, category_id))
+
+
+def _search_index_version(category_id):
+    return cache.get_or_set(SEARCH_INDEX_VERSION_KEY.format(category_id=category_id), int(time.time()), None)
+
+
+def invalidate_search_index(category_id):
+    key = SEARCH_INDEX_VERSION_KEY.format(category_id=category_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time()), None)
+
+
+class InvertedIndex:
+    """Обратный индекс категории: токен -> {id товара: вес совпадения по полям}"""
+
+    # Сколько слов может подставиться под незаконченное последнее слово запроса
+    max_prefix_expansions = 50
+
+    def __init__(self, postings):
+        self.postings = postings
+        self.tokens = sorted(postings)
+        self.document_count = len(set().union(*postings.values())) if postings else 0
+
+    @classmethod
+    def from_documents(cls, documents):
+        """documents - кортежи (id товара, название, характеристики, описание)"""
+        postings = {}
+        for product_id, *fields in documents:
+            for weight, text in zip(SEARCH_FIELD_WEIGHTS, fields):
+                for token in tokenize(text):
+                    token_postings = postings.setdefault(token, {})
+                    token_postings[product_id] = token_postings.get(product_id, 0) + weight
+        return cls(postings)
+
+    @classmethod
+    def build(cls, category_id):
+        documents = ProductSearchDocument.objects.filter(
+            category_id=category_id
+        ).values_list('product_id', *SEARCH_FIELDS)
+        return cls.from_documents(documents.iterator())
+
+    def _matches(self, token, prefix):
+        if not prefix:
+            return self.postings.get(token, {})
+        matches = {}
+        start = bisect_left(self.tokens, token)
+        for candidate in self.tokens[start:start + self.max_prefix_expansions]:
+            if not candidate.startswith(token):
+                break
+            for product_id, weight in self.postings[candidate].items():
+                matches[product_id] = max(matches.get(product_id, 0), weight)
+        return matches
+
+    def search(self, query, limit):
+        """id товаров, где есть все слова запроса (последнее - как префикс), по убыванию tf-idf"""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        # Пересечение начинается с самого редкого слова, дальше словари только сужаются
+        token_matches = sorted(
+            (self._matches(token, prefix=position == len(tokens) - 1) for position, token in enumerate(tokens)),
+            key=len,
+        )
+        scores = None
+        for matches in token_matches:
+            if not matches:
+                return []
+            idf = math.log(1 + self.document_count / len(matches))
+            if scores is None:
+                scores = {product_id: weight * idf for product_id, weight in matches.items()}
+            else:
+                scores = {
+                    product_id: score + matches[product_id] * idf
+                    for product_id, score in scores.items() if product_id in matches
+                }
+            if not scores:
+                return []
+        best = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [product_id for product_id, _ in best]
+
+
+local_search_indexes = LocalLRU(maxsize=64, ttl=60 * 60)
+
+
+class InvertedIndexSearchBackend:
+    """Поиск по обратному индексу в памяти процесса. Индекс категории перестраивается,
+    когда версия в общем кэше сменилась (её поднимает update_search_documents)."""
+
+    def get_index(self, category_id):
+        version = _search_index_version(category_id)
+        cached = local_search_indexes.get(category_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        index = InvertedIndex.build(category_id)
+        local_search_indexes.set(category_id, (version, index))
+        return index
+
+    def search(self, query, category_id, limit):
+        return self.get_index(category_id).search(query, limit)
+
+
+class PostgresSearchBackend:
+    """Полнотекстовый поиск PostgreSQL (GIN по tsvector), при наличии pg_trgm -
+    плюс триграммы по названию для опечаток и незаконченных слов, без него - префикс последнего слова"""
+
+    _has_trigram = None
+
+    @classmethod
+    def has_trigram(cls):
+        if cls._has_trigram is None:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                cls._has_trigram = cursor.fetchone() is not None
+        return cls._has_trigram
+
+    @staticmethod
+    def prefix_query(query):
+        """'galaxy s2' -> 'galaxy & s2:*'; в словах только буквы и цифры, операторов tsquery в них нет"""
+        tokens = TOKEN_RE.findall(query.lower())
+        return ' & '.join(tokens[:-1] + [tokens[-1] + ':*'])
+
+    def search(self, query, category_id, limit):
+        if not tokenize(query):
+            return []
+        trigram = self.has_trigram()
+        sql = POSTGRES_SEARCH_SQL.format(
+            table=connection.ops.quote_name(ProductSearchDocument._meta.db_table),
+            tsquery=WEBSEARCH_TSQUERY_SQL if trigram else PREFIX_TSQUERY_SQL,
+            vector=SEARCH_VECTOR_SQL,
+            trigram_match=TRIGRAM_MATCH_SQL if trigram else '',
+            trigram_rank=TRIGRAM_RANK_SQL if trigram else '',
+        )
+        params = {'query': query, 'category_id': category_id, 'limit': limit}
+        if not trigram:
+            params['prefix_query'] = self.prefix_query(query)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+
+def get_search_backend():
+    backend = getattr(settings, 'STORE_SEARCH_BACKEND', None)
+    if backend:
+        return import_string(backend)()
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return InvertedIndexSearchBackend()
+
+
+def search_products(query, category_id, limit=48):
+    """id товаров категории по релевантности запросу"""
+    return get_search_backend().search(query, category_id, limit)
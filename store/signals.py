@@ -0,0 +1,140 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from specs.models import CategoryFeature, ProductFeatures
+from .autocomplete import product_title_changed
+from .context_processors import invalidate_category_navigation
+from .facets import invalidate_facet_index
+from .features import invalidate_product_specs
+from .image_queue import enqueue_image_variants
+from .images import image_variants_are_current
+from .invalidation import invalidate_on_commit, invalidate_product_pages
+from .models import Category, Product, ProductSearchDocument
+from .page_cache import NAVIGATION_TAG, PRODUCTS_TAG, category_tag, invalidate_page_tags, product_tag
+from .product_refs import invalidate_product_ref
+from .search import invalidate_search_index, update_search_documents
+from .utils import merge_anonymous_cart
+
+
+@receiver([post_save, post_delete], sender=ProductFeatures)
+def product_features_changed(sender, instance, **kwargs):
+    """Сбрасывает фасетный индекс категории и кэш характеристик товара"""
+    invalidate_on_commit(invalidate_facet_index, instance.feature.category_id)
+    invalidate_on_commit(invalidate_product_specs, [instance.product_id])
+    update_search_documents([instance.product_id])
+
+
+@receiver(m2m_changed, sender=Product.features.through)
+def product_features_attached(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        # instance - характеристика, pk_set - товары
+        product_ids = pk_set or list(instance.features_for_product.values_list('id', flat=True))
+    else:
+        product_ids = [instance.id]
+    invalidate_on_commit(invalidate_product_specs, product_ids)
+    # Характеристики на страницах читаются через эту связь
+    invalidate_product_pages(product_ids)
+
+
+@receiver([post_save, post_delete], sender=CategoryFeature)
+def category_feature_changed(sender, instance, **kwargs):
+    invalidate_on_commit(invalidate_facet_index, instance.category_id)
+    invalidate_on_commit(
+        invalidate_product_specs,
+        list(Product.objects.filter(category_id=instance.category_id).values_list('id', flat=True)),
+    )
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Product)
+def catalog_changed(sender, instance, **kwargs):
+    """Сбрасывает навигацию по категориям (названия и кол-во товаров)"""
+    invalidate_on_commit(invalidate_category_navigation)
+
+
+@receiver(user_logged_in)
+def merge_cart_on_login(sender, request, user, **kwargs):
+    if request is not None and hasattr(request, 'session'):
+        merge_anonymous_cart(request, user)
+
+
+@receiver(pre_save, sender=Product)
+def product_slug_changing(sender, instance, **kwargs):
+    """При смене slug сбрасывает ссылку и страницу по старому slug, при смене категории - навигацию"""
+    if instance.pk:
+        old = Product.objects.filter(pk=instance.pk).values_list('slug', 'category_id', 'category__slug').first()
+        if old is None:
+            return
+        old_slug, old_category_id, old_category_slug = old
+        if old_slug != instance.slug:
+            invalidate_on_commit(invalidate_product_ref, old_slug)
+            invalidate_on_commit(invalidate_page_tags, product_tag(old_slug))
+        if old_category_id != instance.category_id:
+            invalidate_on_commit(invalidate_page_tags, NAVIGATION_TAG)
+        else:
+            # slug категории для сброса страниц в post_save - без отдельного запроса
+            instance._category_slug = old_category_slug
+
+
+def product_category_slug(instance):
+    if Product.category.is_cached(instance):
+        return instance.category.slug
+    category_slug = getattr(instance, '_category_slug', None)
+    if category_slug is None:
+        category_slug = Category.objects.filter(pk=instance.category_id).values_list('slug', flat=True).first()
+    return category_slug
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, created, **kwargs):
+    """Ссылка, поисковый документ, автодополнение, копии изображения и кэш страниц товара"""
+    invalidate_on_commit(invalidate_product_ref, instance.slug)
+    update_search_documents([instance.id])
+    # Процессы дочитывают изменённые товары из БД - до фиксации они увидели бы старое название
+    invalidate_on_commit(product_title_changed, instance.id)
+    # Уменьшенные копии нового изображения делает воркер очереди (manage.py image_variant_worker)
+    if instance.image and not image_variants_are_current(instance):
+        enqueue_image_variants(instance)
+    # Новый товар меняет кол-во товаров в навигации, а она есть на всех страницах
+    tags = [PRODUCTS_TAG, category_tag(product_category_slug(instance)), product_tag(instance.slug)]
+    if created:
+        tags.append(NAVIGATION_TAG)
+    invalidate_on_commit(invalidate_page_tags, *tags)
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    invalidate_on_commit(invalidate_product_ref, instance.slug)
+    invalidate_on_commit(product_title_changed, instance.id)
+    # Документ удаляется каскадом, но удаление характеристик товара в том же каскаде
+    # успевает создать его заново - убираем после удаления самого товара
+    ProductSearchDocument.objects.filter(product_id=instance.id).delete()
+    invalidate_on_commit(invalidate_search_index, instance.category_id)
+    invalidate_on_commit(invalidate_page_tags, NAVIGATION_TAG, product_tag(instance.slug))
+
+
+@receiver([post_save, post_delete], sender=ProductFeatures)
+def product_features_page_changed(sender, instance, **kwargs):
+    slugs = Product.objects.filter(pk=instance.product_id).values_list('slug', 'category__slug').first()
+    if slugs is not None:
+        product_slug, category_slug = slugs
+        invalidate_on_commit(invalidate_page_tags, PRODUCTS_TAG, category_tag(category_slug), product_tag(product_slug))
+
+
+@receiver([post_save, post_delete], sender=CategoryFeature)
+def category_feature_page_changed(sender, instance, **kwargs):
+    product_slugs = Product.objects.filter(category_id=instance.category_id).values_list('slug', flat=True)
+    invalidate_on_commit(
+        invalidate_page_tags,
+        PRODUCTS_TAG,
+        category_tag(instance.category.slug),
+        *(product_tag(slug) for slug in product_slugs),
+    )
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_page_changed(sender, instance, **kwargs):
+    invalidate_on_commit(invalidate_page_tags, NAVIGATION_TAG)
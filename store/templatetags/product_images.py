@@ -0,0 +1,31 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+from ..images import image_variants_are_current
+
+
+register = template.Library()
+
+
+def _srcset(variants):
+    return ', '.join(f"{default_storage.url(variant['name'])} {variant['width']}w" for variant in variants)
+
+
+@register.simple_tag
+def product_picture(product, sizes='100vw', css_class='', alt=''):
+    """<picture> с WebP и уменьшенными копиями изображения товара; без копий - оригинал"""
+    if not product.image:
+        return ''
+    if not image_variants_are_current(product):
+        return format_html('<img class="{}" src="{}" alt="{}">', css_class, product.image.url, alt)
+    variants = product.image_variants['variants']
+    webp = [variant for variant in variants if variant['format'] == 'webp']
+    fallback = [variant for variant in variants if variant['format'] != 'webp']
+    webp_source = format_html(
+        '<source type="image/webp" srcset="{}" sizes="{}">', _srcset(webp), sizes
+    ) if webp else ''
+    return format_html(
+        '<picture>{}<img class="{}" src="{}" srcset="{}" sizes="{}" alt="{}" loading="lazy"></picture>',
+        webp_source, css_class, default_storage.url(fallback[-1]['name']), _srcset(fallback), sizes, alt,
+    )
@@ -0,0 +1,35 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from specs.models import CategoryFeature
+from ..facets import FacetIndex
+
+
+register = template.Library()
+
+
+@register.filter
+def product_spec(category, facet_counts=None):
+    """Форма фильтра по характеристикам категории (значения берутся из фасетного индекса)"""
+    facet_index = FacetIndex.for_category(category.id)
+    feature_names = dict(
+        CategoryFeature.objects.filter(category=category).values_list('feature_filter_name', 'feature_name')
+    )
+    search_filter_body = ""
+    for filter_name, values_index in facet_index.facets.items():
+        if not values_index:
+            continue
+        counts = (facet_counts or {}).get(filter_name, {})
+        checkboxes = format_html_join(
+            '',
+            "<input type='checkbox' name='{}' value='{}'> {}{}<br>",
+            (
+                (filter_name, value, value, f' ({counts[value]})' if value in counts else '')
+                for value in sorted(values_index)
+            )
+        )
+        search_filter_body += format_html(
+            '<p>{}</p>{}<hr>', feature_names.get(filter_name, filter_name), checkboxes
+        )
+    return mark_safe(f'<div class="col-md-12">{search_filter_body}</div>')
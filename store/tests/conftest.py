@@ -0,0 +1,85 @@
+from decimal import Decimal
+
+import pytest
+
+from django.core.cache import cache
+
+from specs.models import CategoryFeature, ProductFeatures
+from store.models import Category, Product
+from store.autocomplete import autocomplete_index
+from store.product_refs import local_product_refs
+from store.search import local_search_indexes
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # locmem-кэш живёт между тестами, индексы не должны протекать из одного теста в другой
+    cache.clear()
+    local_product_refs.clear()
+    local_search_indexes.clear()
+    autocomplete_index.clear()
+    yield
+    cache.clear()
+    local_product_refs.clear()
+    local_search_indexes.clear()
+    autocomplete_index.clear()
+
+
+@pytest.fixture
+def store_setup(db):
+    # Одна категория с двумя характеристиками и тремя товарами.
+
+    smartphones = Category.objects.create(name="Смартфоны", slug="smartphones")
+    ram = CategoryFeature.objects.create(
+        category=smartphones, feature_name="Оперативная память", feature_filter_name="ram", unit="GB"
+    )
+    color = CategoryFeature.objects.create(
+        category=smartphones, feature_name="Цвет", feature_filter_name="color"
+    )
+    specs = {
+        "phone-1": {ram: "4", color: "black"},
+        "phone-2": {ram: "8", color: "black"},
+        "phone-3": {ram: "8", color: "white"},
+    }
+    products = {}
+    for index, (slug, features) in enumerate(specs.items(), start=1):
+        product = Product.objects.create(
+            category=smartphones,
+            title=f"Phone {index}",
+            price=Decimal("100.00") * index,
+            description="",
+            image="images/phone.png",
+            slug=slug,
+        )
+        for feature, value in features.items():
+            product.features.add(
+                ProductFeatures.objects.create(product=product, feature=feature, value=value)
+            )
+        products[slug] = product
+    return {"category": smartphones, "features": {"ram": ram, "color": color}, "products": products}
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    # Загруженные изображения и их копии - во временном каталоге
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.STORE_IMAGE_WIDTHS = (320, 640)
+
+
+@pytest.fixture
+def customer_user(django_user_model):
+    return django_user_model.objects.create_user(username="buyer", password="password", email="buyer@example.com")
+
+
+@pytest.fixture
+def order_data():
+    """Данные формы оформления заказа"""
+    return {
+        "first_name": "Ivan",
+        "last_name": "Ivanov",
+        "phone": "+70000000000",
+        "address": "Moscow",
+        "buying_type": "self",
+        "order_date": "2030-01-01",
+        "comment": "",
+    }
@@ -0,0 +1,78 @@
+from django.urls import reverse
+
+from store.autocomplete import TitlePrefixIndex, autocomplete_index, autocomplete_products
+from store.models import Category, Product
+
+
+def test_prefix_of_any_title_word():
+    index = TitlePrefixIndex.from_rows([
+        (1, "Samsung Galaxy S21", "s21", 1),
+        (2, "Samsung Galaxy A52", "a52", 1),
+        (3, "Google Pixel 6", "pixel-6", 2),
+    ])
+    assert [item["id"] for item in index.complete("gal", 10)] == [2, 1]
+    assert [item["id"] for item in index.complete("galaxy s", 10)] == [1]
+    assert [item["id"] for item in index.complete("sam", 10, category_id=2)] == []
+    assert index.complete("pix", 10) == [{"id": 3, "title": "Google Pixel 6", "slug": "pixel-6"}]
+    assert index.complete("  ", 10) == []
+
+
+def test_incremental_updates():
+    index = TitlePrefixIndex.from_rows([(1, "Galaxy S21", "s21", 1)])
+    index.add(1, "Pixel 6", "pixel-6", 1)
+    index.add(2, "Galaxy A52", "a52", 1)
+    assert [item["id"] for item in index.complete("galaxy", 10)] == [2]
+    index.remove(2)
+    assert index.complete("galaxy", 10) == []
+    assert len(index.keys) == 2
+
+
+def test_category_keys_follow_updates():
+    index = TitlePrefixIndex.from_rows([
+        (1, "Galaxy S21", "s21", 1),
+        (2, "Galaxy Tab", "tab", 2),
+    ])
+    assert [item["id"] for item in index.complete("gal", 10, category_id=2)] == [2]
+    index.add(1, "Galaxy S21", "s21", 2)
+    assert index.complete("gal", 10, category_id=1) == []
+    assert [item["id"] for item in index.complete("gal", 10, category_id=2)] == [1, 2]
+    assert 1 not in index.category_keys
+    index.remove(2)
+    assert [item["id"] for item in index.complete("gal", 10, category_id=2)] == [1]
+    assert index.complete("gal", 10, category_id=3) == []
+
+
+def test_index_follows_product_changes_without_rebuild(
+    store_setup, django_assert_max_num_queries, django_capture_on_commit_callbacks
+):
+    assert len(autocomplete_products("phone", 10)) == 3
+    index = autocomplete_index.index
+
+    with django_capture_on_commit_callbacks(execute=True):
+        product = store_setup["products"]["phone-2"]
+        product.title = "Galaxy Note"
+        product.save()
+        Product.objects.create(
+            category=store_setup["category"], title="Galaxy Fold", price=1, image="images/phone.png", slug="fold"
+        )
+        store_setup["products"]["phone-3"].delete()
+
+    # изменения догоняются одним запросом по изменённым товарам
+    with django_assert_max_num_queries(1):
+        assert [item["slug"] for item in autocomplete_products("gal", 10)] == ["fold", "phone-2"]
+    assert autocomplete_index.index is index
+    assert [item["slug"] for item in autocomplete_products("phone", 10)] == ["phone-1"]
+
+
+def test_autocomplete_endpoint(store_setup, client):
+    other = Category.objects.create(name="Планшеты", slug="tablets")
+    Product.objects.create(category=other, title="Phone Tab", price=1, image="images/phone.png", slug="tab")
+    url = reverse("autocomplete-product")
+
+    response = client.get(url, {"query": "pho", "category_id": store_setup["category"].id, "limit": 2})
+    assert response.json() == {"result": [
+        {"id": store_setup["products"]["phone-1"].id, "title": "Phone 1", "slug": "phone-1"},
+        {"id": store_setup["products"]["phone-2"].id, "title": "Phone 2", "slug": "phone-2"},
+    ]}
+    assert len(client.get(url, {"query": "pho", "limit": 1000}).json()["result"]) == 4
+    assert client.get(url, {"query": "pho", "limit": "x"}).status_code == 400
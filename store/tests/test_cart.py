@@ -0,0 +1,91 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, RequestFactory
+from django.urls import reverse
+
+from store.models import Cart, Customer
+from store.utils import get_cart
+
+
+def add_to_cart(client, slug):
+    return client.get(reverse("add_to_cart", kwargs={"slug": slug}))
+
+
+def test_anonymous_carts_are_per_session(store_setup):
+    first, second = Client(), Client()
+    add_to_cart(first, "phone-1")
+    add_to_cart(second, "phone-2")
+    add_to_cart(second, "phone-3")
+
+    assert Cart.objects.filter(for_anonymous_user=True).count() == 2
+    assert first.get(reverse("cart")).context["cart"].total_products == 1
+    assert second.get(reverse("cart")).context["cart"].total_products == 2
+
+
+def test_anonymous_cart_not_created_by_browsing(store_setup, client):
+    client.get(reverse("base"))
+    client.get(reverse("cart"))
+    assert not Cart.objects.exists()
+
+
+def test_cart_merged_on_login(store_setup, customer_user, client):
+    customer = Customer.objects.create(user=customer_user)
+    cart = Cart.objects.create(owner=customer)
+    client.force_login(customer_user)
+    add_to_cart(client, "phone-1")
+    client.logout()
+
+    add_to_cart(client, "phone-1")
+    add_to_cart(client, "phone-2")
+    client.login(username="buyer", password="password")
+
+    cart.refresh_from_db()
+    assert {item.product.slug: item.qty for item in cart.products.all()} == {"phone-1": 2, "phone-2": 1}
+    assert cart.total_products == 2
+    assert not Cart.objects.filter(for_anonymous_user=True).exists()
+
+
+def test_customer_cart_resolved_in_one_query(store_setup, customer_user, django_assert_num_queries):
+    request = RequestFactory().get("/")
+    request.user = customer_user
+    cart = get_cart(request)
+    with django_assert_num_queries(1):
+        resolved = get_cart(request)
+        assert resolved.owner.user_id == customer_user.id
+    assert resolved == cart
+
+
+def test_cart_totals_updated_incrementally(store_setup, customer_user, client):
+    client.force_login(customer_user)
+    add_to_cart(client, "phone-1")
+    add_to_cart(client, "phone-2")
+    client.post(reverse("change_qty", kwargs={"slug": "phone-2"}), {"qty": 3})
+    client.get(reverse("delete_from_cart", kwargs={"slug": "phone-1"}))
+
+    cart = Cart.objects.get(owner__user=customer_user)
+    assert cart.total_products == 1
+    assert cart.final_price == 600
+
+
+def test_check_cart_totals_repairs_drift(store_setup, customer_user, client):
+    client.force_login(customer_user)
+    add_to_cart(client, "phone-1")
+    cart = Cart.objects.get(owner__user=customer_user)
+    Cart.objects.filter(pk=cart.pk).update(total_products=5, final_price=1)
+
+    out = StringIO()
+    call_command("check_cart_totals", stdout=out)
+    assert "Drifted carts found: 1" in out.getvalue()
+
+    call_command("check_cart_totals", "--repair", stdout=StringIO())
+    cart.refresh_from_db()
+    assert (cart.total_products, cart.final_price) == (1, 100)
+
+
+def test_anonymous_checkout(store_setup, client):
+    assert client.get(reverse("checkout")).status_code == 200
+    add_to_cart(client, "phone-1")
+    response = client.get(reverse("checkout"))
+    assert response.status_code == 200
+    assert "Phone 1" in response.content.decode()
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from django.urls import reverse
+
+
+@pytest.fixture(params=["store.cart_backends.DBCartBackend", "store.cart_backends.SessionCartBackend"])
+def cart_backend(request, settings):
+    settings.STORE_CART_BACKEND = request.param
+
+
+def post_batch(client, changes):
+    return client.post(reverse("cart_batch_ajax"), json.dumps({"changes": changes}), content_type="application/json")
+
+
+def test_ajax_cart_changes(store_setup, cart_backend, client):
+    response = client.post(reverse("add_to_cart_ajax", kwargs={"slug": "phone-1"}))
+    assert response.json() == {
+        "line": {"product": "phone-1", "qty": 1, "final_price": "100.00"},
+        "cart": {"total_products": 1, "final_price": "100.00"},
+    }
+
+    response = client.post(reverse("change_qty_ajax", kwargs={"slug": "phone-1"}), {"qty": 3})
+    assert response.json()["line"]["qty"] == 3
+    assert response.json()["cart"]["final_price"] == "300.00"
+
+    response = client.post(reverse("delete_from_cart_ajax", kwargs={"slug": "phone-1"}))
+    assert response.json()["line"] == {"product": "phone-1", "qty": 0, "final_price": "0.00"}
+    assert response.json()["cart"]["total_products"] == 0
+
+
+def test_ajax_unknown_product(store_setup, client):
+    response = client.post(reverse("add_to_cart_ajax", kwargs={"slug": "missing"}))
+    assert response.status_code == 404
+
+
+def test_ajax_product_not_in_cart(store_setup, cart_backend, client):
+    response = client.post(reverse("delete_from_cart_ajax", kwargs={"slug": "phone-1"}))
+    assert response.status_code == 404
+    response = client.post(reverse("change_qty_ajax", kwargs={"slug": "phone-1"}), {"qty": 2})
+    assert response.status_code == 404
+
+
+def test_batch_cart_changes(store_setup, cart_backend, client):
+    response = post_batch(client, [
+        {"action": "add", "slug": "phone-1"},
+        {"action": "add", "slug": "phone-2"},
+        {"action": "add", "slug": "phone-2"},
+        {"action": "set_qty", "slug": "phone-1", "qty": 4},
+    ])
+    data = response.json()
+    assert data["lines"] == [
+        {"product": "phone-1", "qty": 4, "final_price": "400.00"},
+        {"product": "phone-2", "qty": 2, "final_price": "400.00"},
+    ]
+    assert data["cart"] == {"total_products": 2, "final_price": "800.00"}
+
+
+def test_batch_is_atomic(store_setup, cart_backend, client):
+    client.post(reverse("add_to_cart_ajax", kwargs={"slug": "phone-1"}))
+    response = post_batch(client, [
+        {"action": "set_qty", "slug": "phone-1", "qty": 5},
+        {"action": "add", "slug": "missing"},
+    ])
+    assert response.status_code == 400
+    assert client.get(reverse("cart")).context["cart"].final_price == 100
+
+
+@pytest.mark.parametrize("change", [
+    "phone-1",
+    {"action": "add", "slug": ["phone-1"]},
+    {"action": "add", "slug": {"slug": "phone-1"}},
+    {"action": ["add"], "slug": "phone-1"},
+])
+def test_batch_rejects_malformed_changes(store_setup, client, change):
+    response = post_batch(client, [{"action": "add", "slug": "phone-2"}, change])
+    assert response.status_code == 400
+    assert client.get(reverse("cart")).context["cart"].total_products == 0
@@ -0,0 +1,56 @@
+import pytest
+
+from django.urls import reverse
+
+from store.models import Cart, CartProduct, Order
+
+
+@pytest.fixture
+def session_backend(settings):
+    settings.STORE_CART_BACKEND = "store.cart_backends.SessionCartBackend"
+
+
+def test_session_cart_mutations_do_not_touch_db(store_setup, session_backend, client):
+    client.get(reverse("add_to_cart", kwargs={"slug": "phone-1"}))
+    client.get(reverse("add_to_cart", kwargs={"slug": "phone-2"}))
+    client.post(reverse("change_qty", kwargs={"slug": "phone-2"}), {"qty": 3})
+    client.get(reverse("delete_from_cart", kwargs={"slug": "phone-1"}))
+
+    assert not Cart.objects.exists()
+    assert not CartProduct.objects.exists()
+    cart = client.get(reverse("cart")).context["cart"]
+    assert cart.total_products == 1
+    assert cart.final_price == 600
+    assert [(item.product.slug, item.qty) for item in cart.products.all()] == [("phone-2", 3)]
+
+
+def test_session_cart_keeps_snapshotted_price(store_setup, session_backend, client):
+    client.get(reverse("add_to_cart", kwargs={"slug": "phone-1"}))
+    product = store_setup["products"]["phone-1"]
+    product.price = 1
+    product.save()
+    assert client.get(reverse("cart")).context["cart"].final_price == 100
+
+
+def test_session_cart_materialized_on_checkout(store_setup, session_backend, customer_user, client, order_data):
+    client.force_login(customer_user)
+    client.get(reverse("add_to_cart", kwargs={"slug": "phone-1"}))
+    client.post(reverse("change_qty", kwargs={"slug": "phone-1"}), {"qty": 2})
+    assert not CartProduct.objects.exists()
+
+    client.post(reverse("make-order"), order_data)
+
+    order = Order.objects.get()
+    assert order.cart.in_order
+    assert order.cart.total_products == 1
+    assert order.cart.final_price == 200
+    assert client.get(reverse("cart")).context["cart"].total_products == 0
+
+
+def test_db_backend_checkout(store_setup, customer_user, client, order_data):
+    client.force_login(customer_user)
+    client.get(reverse("add_to_cart", kwargs={"slug": "phone-3"}))
+    client.post(reverse("make-order"), order_data)
+    order = Order.objects.get()
+    assert order.cart.in_order
+    assert order.cart.final_price == 300
@@ -0,0 +1,77 @@
+"""Одновременные добавления в одну корзину: без потерь, без дублей строк, итоги сходятся с пересчётом"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from django.db import connection
+from django.test import RequestFactory
+
+from store.cart_backends import DBCartBackend
+from store.models import Cart, CartProduct, Customer
+
+
+THREADS = 8
+ADDS_PER_THREAD = 10
+
+
+def run_concurrently(func, jobs):
+    def job(args):
+        try:
+            return func(*args)
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        return list(executor.map(job, jobs))
+
+
+@pytest.fixture
+def customer_cart(store_setup, customer_user):
+    customer = Customer.objects.create(user=customer_user)
+    return Cart.objects.create(owner=customer)
+
+
+def add_many(user, product, times):
+    request = RequestFactory().get("/")
+    request.user = user
+    request.session = {}
+    backend = DBCartBackend(request)
+    for _ in range(times):
+        backend.add(product)
+
+
+@pytest.mark.skipif(connection.vendor == "sqlite", reason="SQLite serializes writers with table locks")
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_adds_of_one_product(customer_cart, customer_user, store_setup):
+    product = store_setup["products"]["phone-1"]
+    run_concurrently(add_many, [(customer_user, product, ADDS_PER_THREAD)] * THREADS)
+
+    cart_product = CartProduct.objects.get(cart=customer_cart)
+    assert cart_product.qty == THREADS * ADDS_PER_THREAD
+    assert cart_product.final_price == product.price * THREADS * ADDS_PER_THREAD
+    customer_cart.refresh_from_db()
+    assert customer_cart.total_products == 1
+    assert customer_cart.final_price == cart_product.final_price
+
+
+@pytest.mark.skipif(connection.vendor == "sqlite", reason="SQLite serializes writers with table locks")
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_adds_of_different_products(customer_cart, customer_user, store_setup):
+    products = list(store_setup["products"].values())
+    run_concurrently(add_many, [(customer_user, products[i % len(products)], ADDS_PER_THREAD) for i in range(THREADS)])
+
+    customer_cart.refresh_from_db()
+    lines = CartProduct.objects.filter(cart=customer_cart)
+    assert lines.count() == len(products)
+    assert customer_cart.products.count() == len(products)
+    assert customer_cart.total_products == len(products)
+    assert customer_cart.final_price == sum(line.final_price for line in lines)
+
+
+def test_repeated_add_increments_single_line(customer_cart, customer_user, store_setup):
+    product = store_setup["products"]["phone-2"]
+    add_many(customer_user, product, 3)
+    cart_product = CartProduct.objects.get(cart=customer_cart)
+    assert (cart_product.qty, cart_product.final_price) == (3, 600)
+    customer_cart.refresh_from_db()
+    assert (customer_cart.total_products, customer_cart.final_price) == (1, 600)
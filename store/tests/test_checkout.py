@@ -0,0 +1,147 @@
+"""Оформление заказа: один заказ на форму, повторы и двойные клики ничего не создают"""
+import time
+import uuid
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from store.models import Cart, Customer, Order, OrderLine
+from store.utils import get_customer_cart
+
+
+THREADS = 8
+P99_LIMIT_SECONDS = 2
+
+
+def fill_cart(client, *slugs):
+    for slug in slugs:
+        client.get(reverse("add_to_cart", kwargs={"slug": slug}))
+
+
+def test_checkout_form_carries_fresh_idempotency_key(store_setup, customer_user, client):
+    client.force_login(customer_user)
+    first = client.get(reverse("checkout")).context["form"]["idempotency_key"].value()
+    second = client.get(reverse("checkout")).context["form"]["idempotency_key"].value()
+    assert first and second and first != second
+
+
+def test_checkout_writes(store_setup, customer_user, client, django_assert_max_num_queries, order_data):
+    client.force_login(customer_user)
+    fill_cart(client, "phone-1", "phone-2")
+    # сессия, пользователь, корзина, проверка ключа, блокировка корзины, INSERT заказа,
+    # UPDATE корзины, связь покупателя, строки заказа, savepoint-ы и сообщение
+    with django_assert_max_num_queries(14):
+        client.post(reverse("make-order"), {**order_data, "idempotency_key": str(uuid.uuid4())})
+
+    order = Order.objects.select_related("cart").get()
+    assert order.cart.in_order
+    assert order.lines.count() == 2
+    assert list(Customer.objects.get(user=customer_user).order.all()) == [order]
+
+
+def test_retry_with_same_key_creates_one_order(store_setup, customer_user, client, order_data):
+    client.force_login(customer_user)
+    fill_cart(client, "phone-1")
+    data = {**order_data, "idempotency_key": str(uuid.uuid4())}
+    client.post(reverse("make-order"), data)
+    fill_cart(client, "phone-2")
+    client.post(reverse("make-order"), data)
+
+    order = Order.objects.get()
+    assert [line.slug for line in order.lines.all()] == ["phone-1"]
+    # корзина с новым товаром осталась открытой
+    assert Cart.objects.get(in_order=False).total_products == 1
+
+
+def test_double_submit_without_key_creates_one_order(store_setup, customer_user, client, order_data):
+    client.force_login(customer_user)
+    fill_cart(client, "phone-1")
+    client.post(reverse("make-order"), order_data)
+    client.post(reverse("make-order"), order_data)
+    assert Order.objects.count() == 1
+
+
+def checkout(user, data):
+    client = Client()
+    client.force_login(user)
+    started = time.perf_counter()
+    try:
+        client.post(reverse("make-order"), data)
+    finally:
+        connection.close()
+    return time.perf_counter() - started
+
+
+def p99(timings):
+    timings = sorted(timings)
+    return timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+
+
+@pytest.mark.skipif(connection.vendor == "sqlite", reason="SQLite serializes writers with table locks")
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_retries_create_one_order(store_setup, customer_user, order_data):
+    client = Client()
+    client.force_login(customer_user)
+    fill_cart(client, "phone-1", "phone-2")
+    data = {**order_data, "idempotency_key": str(uuid.uuid4())}
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        list(executor.map(checkout, [customer_user] * THREADS, [data] * THREADS))
+
+    order = Order.objects.get()
+    assert order.lines.count() == 2
+    assert Cart.objects.filter(in_order=True).count() == 1
+
+
+@pytest.mark.skipif(connection.vendor == "sqlite", reason="SQLite serializes writers with table locks")
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_session_checkout_without_key(store_setup, customer_user, settings, order_data):
+    # Строки сессии переносятся в открытую корзину покупателя только под её блокировкой
+    settings.STORE_CART_BACKEND = "store.cart_backends.SessionCartBackend"
+    get_customer_cart(customer_user)
+    client = Client()
+    client.force_login(customer_user)
+    fill_cart(client, "phone-1", "phone-2")
+    session_id = client.cookies[settings.SESSION_COOKIE_NAME].value
+
+    def submit(_):
+        thread_client = Client()
+        thread_client.cookies[settings.SESSION_COOKIE_NAME] = session_id
+        try:
+            return thread_client.post(reverse("make-order"), order_data).status_code
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        statuses = list(executor.map(submit, range(THREADS)))
+
+    assert statuses == [302] * THREADS
+    order = Order.objects.get()
+    assert order.lines.count() == 2
+
+
+@pytest.mark.skipif(connection.vendor == "sqlite", reason="SQLite serializes writers with table locks")
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_checkout_p99(store_setup, django_user_model, order_data):
+    users = []
+    for index in range(THREADS * 4):
+        user = django_user_model.objects.create_user(username=f"buyer-{index}", password="password")
+        client = Client()
+        client.force_login(user)
+        fill_cart(client, "phone-1", "phone-3")
+        users.append(user)
+    jobs = [{**order_data, "idempotency_key": str(uuid.uuid4())} for _ in users]
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        timings = list(executor.map(checkout, users, jobs))
+
+    assert Order.objects.count() == len(users)
+    assert OrderLine.objects.count() == 2 * len(users)
+    assert p99(timings) < P99_LIMIT_SECONDS, (
+        f"checkout p99 over {len(timings)} orders, {THREADS} threads: {p99(timings) * 1000:.1f} ms"
+    )
@@ -0,0 +1,72 @@
+from django.urls import reverse
+
+from specs.models import ProductFeatures
+from store.facets import FacetIndex
+
+
+def test_build_index(store_setup):
+    products = store_setup["products"]
+    index = FacetIndex.build(store_setup["category"].id)
+    assert index.facets["ram"]["8"] == {products["phone-2"].id, products["phone-3"].id}
+    assert index.facets["color"]["white"] == {products["phone-3"].id}
+
+
+def test_match_and_across_or_within(store_setup):
+    products = store_setup["products"]
+    index = FacetIndex.for_category(store_setup["category"].id)
+    assert index.match({"ram": ["4", "8"], "color": ["black"]}) == {
+        products["phone-1"].id,
+        products["phone-2"].id,
+    }
+    assert index.match({"ram": ["4"], "color": ["white"]}) == set()
+    assert index.match({"ram": ["16"]}) == set()
+
+
+def test_index_is_cached(store_setup, django_assert_num_queries):
+    category_id = store_setup["category"].id
+    FacetIndex.for_category(category_id)
+    with django_assert_num_queries(0):
+        FacetIndex.for_category(category_id)
+
+
+def test_index_invalidated_on_product_features_change(store_setup, django_capture_on_commit_callbacks):
+    products = store_setup["products"]
+    category_id = store_setup["category"].id
+    assert FacetIndex.for_category(category_id).match({"color": ["white"]}) == {products["phone-3"].id}
+
+    feature = ProductFeatures.objects.get(product=products["phone-1"], feature__feature_filter_name="color")
+    feature.value = "white"
+    with django_capture_on_commit_callbacks(execute=True):
+        feature.save()
+    assert FacetIndex.for_category(category_id).match({"color": ["white"]}) == {
+        products["phone-1"].id,
+        products["phone-3"].id,
+    }
+
+    with django_capture_on_commit_callbacks(execute=True):
+        feature.delete()
+    assert FacetIndex.for_category(category_id).match({"color": ["white"]}) == {products["phone-3"].id}
+
+
+def test_category_view_filters(store_setup, client):
+    products = store_setup["products"]
+    url = reverse("category_detail", kwargs={"slug": store_setup["category"].slug})
+    response = client.get(url, {"ram": "8", "color": "black"})
+    assert response.status_code == 200
+    assert list(response.context["category_products"]) == [products["phone-2"]]
+    assert b"name='ram' value='8'" in response.content
+
+
+def test_facet_counts(store_setup):
+    index = FacetIndex.for_category(store_setup["category"].id)
+    counts = index.counts({"ram": ["8"]})
+    # Фильтр по ram не сужает собственные значения, но сужает цвета
+    assert counts["ram"] == {"4": 1, "8": 2}
+    assert counts["color"] == {"black": 1, "white": 1}
+
+
+def test_facet_counts_api(store_setup, client):
+    url = reverse("category_facets", kwargs={"id": store_setup["category"].id})
+    response = client.get(url, {"color": "black"})
+    assert response.status_code == 200
+    assert response.json()["facets"]["ram"] == {"4": 1, "8": 1}
@@ -0,0 +1,74 @@
+from django.urls import reverse
+
+from specs.models import ProductFeatures
+from store.models import Product
+
+
+def test_get_features(store_setup):
+    product = store_setup["products"]["phone-2"]
+    assert product.get_features() == {"Оперативная память": "8 GB", "Цвет": "black "}
+
+
+def test_get_features_is_cached(store_setup, django_assert_num_queries):
+    product = store_setup["products"]["phone-2"]
+    product.get_features()
+    with django_assert_num_queries(0):
+        product.get_features()
+
+
+def test_specs_invalidated_on_feature_change(store_setup, django_capture_on_commit_callbacks):
+    product = store_setup["products"]["phone-2"]
+    ram = store_setup["features"]["ram"]
+    product.get_features()
+
+    feature = ProductFeatures.objects.get(product=product, feature=ram)
+    feature.value = "12"
+    with django_capture_on_commit_callbacks(execute=True):
+        feature.save()
+    assert product.get_features()["Оперативная память"] == "12 GB"
+
+    ram.unit = "ГБ"
+    with django_capture_on_commit_callbacks(execute=True):
+        ram.save()
+    assert product.get_features()["Оперативная память"] == "12 ГБ"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        product.features.remove(feature)
+    assert "Оперативная память" not in product.get_features()
+
+
+def test_product_detail_query_count(store_setup, client, settings, django_assert_max_num_queries):
+    # Без кэша страниц: проверяется рендер с закэшированными характеристиками
+    settings.STORE_PAGE_CACHE_TIMEOUT = 0
+    product = store_setup["products"]["phone-1"]
+    url = reverse("product_detail", kwargs={"slug": product.slug})
+    client.get(url)
+    with django_assert_max_num_queries(8):
+        response = client.get(url)
+    assert response.context["features"]["Оперативная память"] == "4 GB"
+
+
+def test_spec_table(store_setup, django_assert_num_queries):
+    products = store_setup["products"]
+    product_ids = [products["phone-1"].id, products["phone-3"].id]
+    with django_assert_num_queries(2):
+        table = Product.objects.filter(id__in=product_ids).order_by("id").spec_table()
+    assert table.columns["Оперативная память"] == ["4 GB", "8 GB"]
+    assert table.for_product(products["phone-3"].id)["Цвет"] == "white "
+    assert all(differs for _, _, differs in table.rows())
+
+
+def test_spec_table_uses_cache(store_setup, django_assert_num_queries):
+    product = store_setup["products"]["phone-1"]
+    product.get_features()
+    with django_assert_num_queries(1):
+        # Один запрос на сами товары, характеристики берутся из кэша
+        Product.objects.filter(id=product.id).spec_table(key_specs=1)
+
+
+def test_compare_view(store_setup, client):
+    response = client.get(reverse("compare"), {"slug": ["phone-1", "phone-2"]})
+    assert response.status_code == 200
+    rows = {f_name: (values, differs) for f_name, values, differs in response.context["spec_rows"]}
+    assert rows["Цвет"] == (["black ", "black "], False)
+    assert rows["Оперативная память"][1] is True
@@ -0,0 +1,114 @@
+from datetime import timedelta
+
+import pytest
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from PIL import Image
+
+from store.image_queue import MAX_ATTEMPTS, claim_jobs, queue_depth, requeue_stale_jobs, run_pending_jobs
+from store.models import ImageVariantJob, Product
+from store.tests.test_images import upload
+
+
+pytestmark = pytest.mark.usefixtures("media_root")
+
+
+def make_product(store_setup, image="images/missing.png"):
+    return Product.objects.create(
+        category=store_setup["category"], title="Photo", price=1, image=image, slug="photo"
+    )
+
+
+def test_upload_is_queued_not_processed(store_setup):
+    ImageVariantJob.objects.all().delete()
+    product = make_product(store_setup, upload())
+    product.refresh_from_db()
+    assert product.image_variants == {}
+    job = ImageVariantJob.objects.get()
+    assert (job.product_id, job.source, job.status) == (product.id, product.image.name, "pending")
+
+    product.title = "Renamed"
+    product.save()
+    assert ImageVariantJob.objects.count() == 1
+
+    assert run_pending_jobs() == (1, 0)
+    product.refresh_from_db()
+    assert product.image_variants["source"] == product.image.name
+    assert not ImageVariantJob.objects.exists()
+
+
+def test_failed_job_is_retried_with_backoff(store_setup):
+    ImageVariantJob.objects.all().delete()
+    make_product(store_setup)
+
+    assert run_pending_jobs() == (0, 1)
+    job = ImageVariantJob.objects.get()
+    assert (job.status, job.attempts) == ("pending", 1)
+    assert job.last_error
+    assert job.run_after > timezone.now()
+    # отложенное задание не берётся до срока
+    assert run_pending_jobs() == (0, 0)
+    assert queue_depth() == {"pending": 1, "running": 0, "failed": 0, "delayed": 1}
+
+    for _ in range(MAX_ATTEMPTS - 1):
+        ImageVariantJob.objects.update(run_after=timezone.now())
+        run_pending_jobs()
+    job.refresh_from_db()
+    assert (job.status, job.attempts) == ("failed", MAX_ATTEMPTS)
+    assert queue_depth()["failed"] == 1
+
+
+def test_superseded_job_is_dropped(store_setup):
+    ImageVariantJob.objects.all().delete()
+    product = make_product(store_setup)
+    Product.objects.filter(pk=product.pk).update(image="images/other.png")
+    assert run_pending_jobs() == (1, 0)
+    assert not ImageVariantJob.objects.exists()
+
+
+def test_claimed_jobs_are_not_claimed_again(store_setup):
+    assert len(claim_jobs(10)) == 3
+    assert claim_jobs(10) == []
+
+    ImageVariantJob.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+    assert requeue_stale_jobs() == 3
+    assert len(claim_jobs(10)) == 3
+
+
+def test_unexpected_error_fails_job_without_stopping_worker(store_setup, monkeypatch):
+    ImageVariantJob.objects.all().delete()
+    bomb = make_product(store_setup, upload())
+    ImageVariantJob.objects.create(product=store_setup["products"]["phone-1"], source="images/phone.png")
+
+    def build_image_variants(source):
+        if source == bomb.image.name:
+            raise Image.DecompressionBombError("Image size exceeds limit")
+        return {}
+
+    monkeypatch.setattr("store.image_queue.build_image_variants", build_image_variants)
+    monkeypatch.setattr("store.image_queue.save_image_variants", lambda product_id, variants: True)
+    assert run_pending_jobs() == (1, 1)
+    job = ImageVariantJob.objects.get()
+    assert (job.product_id, job.status, job.last_error) == (bomb.id, "failed", "Image size exceeds limit")
+
+
+def test_stale_job_out_of_attempts_is_failed(store_setup):
+    ImageVariantJob.objects.update(
+        status="running", locked_at=timezone.now() - timedelta(hours=1), attempts=MAX_ATTEMPTS - 1
+    )
+    ImageVariantJob.objects.filter(id=ImageVariantJob.objects.order_by("id").first().id).update(attempts=MAX_ATTEMPTS)
+    assert requeue_stale_jobs() == 2
+    assert queue_depth() == {"pending": 2, "running": 0, "failed": 1, "delayed": 0}
+
+
+def test_worker_command(store_setup, capsys):
+    ImageVariantJob.objects.all().delete()
+    product = make_product(store_setup, upload())
+
+    call_command("image_variant_worker", "--status")
+    assert "pending 1" in " ".join(capsys.readouterr().out.split())
+    call_command("image_variant_worker", "--once")
+    product.refresh_from_db()
+    assert product.image_variants["source"] == product.image.name
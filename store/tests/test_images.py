@@ -0,0 +1,129 @@
+from io import BytesIO
+
+import pytest
+
+from PIL import Image
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+
+from store.image_queue import run_pending_jobs
+from store.management.commands import generate_image_variants
+from store.models import Product
+
+
+pytestmark = pytest.mark.usefixtures("media_root")
+
+
+def upload(name="phone.jpg", size=(1200, 800), mode="RGB", image_format="JPEG"):
+    buffer = BytesIO()
+    Image.new(mode, size).save(buffer, image_format)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+def make_product(store_setup, image, slug="photo"):
+    product = Product.objects.create(
+        category=store_setup["category"], title="Photo", price=1, image=image, slug=slug
+    )
+    run_pending_jobs()
+    product.refresh_from_db()
+    return product
+
+
+def variant_sizes(product):
+    result = {}
+    for variant in product.image_variants["variants"]:
+        with default_storage.open(variant["name"]) as variant_file:
+            result[(variant["width"], variant["format"])] = Image.open(variant_file).size
+    return result
+
+
+def test_variants_generated_for_upload(store_setup):
+    product = make_product(store_setup, upload())
+    assert product.image_variants["source"] == product.image.name
+    assert variant_sizes(product) == {
+        (320, "webp"): (320, 213), (320, "jpg"): (320, 213),
+        (640, "webp"): (640, 427), (640, "jpg"): (640, 427),
+    }
+
+
+def test_small_and_transparent_images(store_setup):
+    product = make_product(store_setup, upload("logo.png", (200, 100), "RGBA", "PNG"))
+    assert variant_sizes(product) == {(200, "webp"): (200, 100), (200, "png"): (200, 100)}
+
+
+def test_new_image_replaces_variants(store_setup, client, django_capture_on_commit_callbacks):
+    product = make_product(store_setup, upload())
+    old_names = [variant["name"] for variant in product.image_variants["variants"]]
+
+    product.image = upload("other.jpg")
+    product.save()
+    client.get(product.get_absolute_url())
+    with django_capture_on_commit_callbacks(execute=True):
+        run_pending_jobs()
+        # Файлы удаляются только после фиксации новых вариантов
+        assert all(default_storage.exists(name) for name in old_names)
+    product.refresh_from_db()
+    assert product.image_variants["source"] == product.image.name
+    assert not any(default_storage.exists(name) for name in old_names)
+    # update() сигналов не шлёт - закэшированная страница сбрасывается явно
+    root = product.image.name.rsplit(".", 1)[0]
+    assert f"/media/derivatives/{root}/320w.webp" in client.get(product.get_absolute_url()).content.decode()
+
+
+def test_missing_image_keeps_original(store_setup):
+    product = store_setup["products"]["phone-1"]
+    product.refresh_from_db()
+    assert product.image_variants == {}
+    html = Template("{% load product_images %}{% product_picture product %}").render(Context({"product": product}))
+    assert html == '<img class="" src="/media/images/phone.png" alt="">'
+
+
+def test_picture_tag(store_setup):
+    product = make_product(store_setup, upload())
+    html = Template(
+        '{% load product_images %}{% product_picture product sizes="50vw" css_class="card-img-top" %}'
+    ).render(Context({"product": product}))
+    root = product.image.name.rsplit(".", 1)[0]
+    assert f'<source type="image/webp" srcset="/media/derivatives/{root}/320w.webp 320w, ' in html
+    assert f'src="/media/derivatives/{root}/640w.jpg"' in html
+    assert 'sizes="50vw"' in html and 'class="card-img-top"' in html
+
+
+def test_backlog_command(store_setup):
+    product = make_product(store_setup, upload())
+    Product.objects.filter(pk=product.pk).update(image_variants={})
+    other = make_product(store_setup, upload("other.jpg"), slug="other")
+
+    call_command("generate_image_variants", workers=2)
+
+    product.refresh_from_db()
+    assert product.image_variants["source"] == product.image.name
+    assert len(product.image_variants["variants"]) == 4
+    other_variants = other.image_variants
+    other.refresh_from_db()
+    assert other.image_variants == other_variants
+
+
+def test_backlog_command_reports_failed_products(store_setup, monkeypatch, capsys):
+    bomb = make_product(store_setup, upload("bomb.jpg"), slug="bomb")
+    product = make_product(store_setup, upload())
+    Product.objects.filter(pk__in=[bomb.pk, product.pk]).update(image_variants={})
+    build_image_variants = generate_image_variants.build_image_variants
+
+    def build_or_explode(source):
+        if source == bomb.image.name:
+            raise Image.DecompressionBombError("Image size exceeds limit")
+        return build_image_variants(source)
+
+    # Дочерние процессы создаются fork и видят подменённую функцию
+    monkeypatch.setattr(generate_image_variants, "build_image_variants", build_or_explode)
+    call_command("generate_image_variants", workers=2)
+
+    output = capsys.readouterr()
+    assert f"Product {bomb.id}: Image size exceeds limit" in output.err
+    assert "Variants generated: 1," in output.out
+    product.refresh_from_db()
+    assert product.image_variants["source"] == product.image.name
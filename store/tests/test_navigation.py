@@ -0,0 +1,41 @@
+from django.urls import reverse
+
+from store.context_processors import get_category_navigation
+from store.models import Category
+
+
+def test_category_navigation(store_setup):
+    assert get_category_navigation() == [
+        {"name": "Смартфоны", "url": "/category/smartphones/", "count": 3}
+    ]
+
+
+def test_category_navigation_is_cached(store_setup, django_assert_num_queries):
+    get_category_navigation()
+    with django_assert_num_queries(0):
+        get_category_navigation()
+
+
+def test_category_navigation_invalidated(store_setup, django_capture_on_commit_callbacks):
+    get_category_navigation()
+    with django_capture_on_commit_callbacks(execute=True):
+        Category.objects.create(name="Ноутбуки", slug="notebooks")
+    assert [item["name"] for item in get_category_navigation()] == ["Смартфоны", "Ноутбуки"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        store_setup["products"]["phone-1"].delete()
+    assert get_category_navigation()[0]["count"] == 2
+
+
+def test_category_navigation_invalidated_after_commit(store_setup, django_capture_on_commit_callbacks):
+    get_category_navigation()
+    with django_capture_on_commit_callbacks(execute=True):
+        Category.objects.create(name="Ноутбуки", slug="notebooks")
+        # До фиксации остаётся старая навигация: сброс раньше дал бы закэшировать её заново
+        assert len(get_category_navigation()) == 1
+    assert len(get_category_navigation()) == 2
+
+
+def test_sidebar_rendered(store_setup, client):
+    response = client.get(reverse("cart"))
+    assert b'href="/category/smartphones/"' in response.content
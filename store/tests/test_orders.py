@@ -0,0 +1,54 @@
+import pytest
+
+from django.urls import reverse
+
+from store.models import Order, OrderLine
+
+
+@pytest.fixture
+def make_order(client, order_data):
+    def make(*slugs):
+        for slug in slugs:
+            client.get(reverse("add_to_cart", kwargs={"slug": slug}))
+        client.post(reverse("make-order"), order_data)
+    return make
+
+
+def test_order_lines_snapshot(store_setup, customer_user, client, make_order):
+    client.force_login(customer_user)
+    make_order("phone-1", "phone-2", "phone-2")
+
+    order = Order.objects.get()
+    lines = {line.slug: line for line in order.lines.all()}
+    assert (lines["phone-2"].qty, lines["phone-2"].price, lines["phone-2"].final_price) == (2, 200, 400)
+
+    product = store_setup["products"]["phone-2"]
+    product.price = 999
+    product.title = "Renamed"
+    product.save()
+    line = OrderLine.objects.get(order=order, slug="phone-2")
+    assert (line.title, line.price) == ("Phone 2", 200)
+
+
+def test_profile_history_query_count(store_setup, customer_user, client, django_assert_max_num_queries, make_order):
+    client.force_login(customer_user)
+    make_order("phone-1")
+    client.get(reverse("profile"))
+
+    for _ in range(3):
+        make_order("phone-1", "phone-2", "phone-3")
+    # Кол-во запросов не зависит от числа заказов на странице
+    with django_assert_max_num_queries(8):
+        response = client.get(reverse("profile"))
+    assert response.context["orders"].paginator.count == 4
+    assert b"Phone 3 x 1" in response.content
+
+
+def test_profile_pagination(store_setup, customer_user, client, make_order):
+    client.force_login(customer_user)
+    for _ in range(12):
+        make_order("phone-1")
+
+    response = client.get(reverse("profile"), {"page": 2})
+    assert response.context["orders"].number == 2
+    assert len(response.context["orders"]) == 2
@@ -0,0 +1,131 @@
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import translation
+
+from specs.models import CategoryFeature, ProductFeatures
+from store.models import Category, Product
+from store.page_cache import page_cache_key
+
+
+CART_BADGE_RE = re.compile(r'badge-pill badge-danger">\s*(\d+)\s*<')
+
+
+def cart_badge(response):
+    return int(CART_BADGE_RE.search(response.content.decode()).group(1))
+
+
+def product_queries(client, url):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert response.status_code == 200
+    return [query["sql"] for query in queries if "store_product" in query["sql"]]
+
+
+def test_cached_pages_skip_catalog_queries(store_setup, client):
+    for url in ("/", "/category/smartphones/", "/products/phone-1/"):
+        assert product_queries(client, url)
+        assert product_queries(client, url) == []
+
+
+def test_query_string_is_part_of_key(store_setup, client):
+    client.get("/category/smartphones/?ram=8")
+    assert product_queries(client, "/category/smartphones/?ram=4")
+    assert product_queries(client, "/category/smartphones/?ram=8") == []
+
+
+def test_language_is_part_of_key(rf):
+    request = rf.get("/category/smartphones/", {"b": "2", "a": "1"})
+    with translation.override("ru"):
+        ru_key = page_cache_key(request)
+    with translation.override("en"):
+        en_key = page_cache_key(request)
+    assert ru_key != en_key
+    with translation.override("ru"):
+        assert page_cache_key(rf.get("/category/smartphones/?a=1&b=2")) == ru_key
+
+
+def test_cart_badge_is_per_visitor(store_setup, client):
+    client.get("/")
+    buyer = client.__class__()
+    buyer.get(reverse("add_to_cart", kwargs={"slug": "phone-1"}))
+    buyer.get(reverse("add_to_cart", kwargs={"slug": "phone-2"}))
+    # Первая страница показывает сообщение о добавлении и не берётся из кэша
+    assert "Товар успешно добавлен" in buyer.get("/").content.decode()
+    assert product_queries(buyer, "/") == []
+    assert cart_badge(buyer.get("/")) == 2
+    assert cart_badge(client.get("/")) == 0
+
+
+def test_authenticated_pages_not_cached(store_setup, client, customer_user):
+    client.get("/")
+    client.force_login(customer_user)
+    assert product_queries(client, "/")
+    assert product_queries(client, "/")
+
+
+def test_product_change_invalidates_pages(store_setup, client, django_capture_on_commit_callbacks):
+    product = store_setup["products"]["phone-1"]
+    for url in ("/", "/category/smartphones/", "/products/phone-1/"):
+        client.get(url)
+    product.title = "Phone One"
+    with django_capture_on_commit_callbacks(execute=True):
+        product.save()
+    for url in ("/", "/category/smartphones/", "/products/phone-1/"):
+        assert "Phone One" in client.get(url).content.decode()
+
+
+def test_other_product_page_stays_cached(store_setup, client, django_capture_on_commit_callbacks):
+    client.get("/products/phone-2/")
+    product = store_setup["products"]["phone-1"]
+    product.title = "Phone One"
+    with django_capture_on_commit_callbacks(execute=True):
+        product.save()
+    assert product_queries(client, "/products/phone-2/") == []
+
+
+def test_feature_change_invalidates_product_page(store_setup, client, django_capture_on_commit_callbacks):
+    client.get("/products/phone-1/")
+    feature = ProductFeatures.objects.get(product=store_setup["products"]["phone-1"], value="4")
+    feature.value = "6"
+    with django_capture_on_commit_callbacks(execute=True):
+        feature.save()
+    assert "6 GB" in client.get("/products/phone-1/").content.decode()
+
+
+def test_category_feature_change_invalidates_product_page(store_setup, client, django_capture_on_commit_callbacks):
+    client.get("/products/phone-1/")
+    ram = store_setup["features"]["ram"]
+    ram.feature_name = "Память"
+    with django_capture_on_commit_callbacks(execute=True):
+        ram.save()
+    assert "<th scope=\"row\">Память</th>" in client.get("/products/phone-1/").content.decode()
+
+
+def test_new_category_invalidates_navigation(store_setup, client, django_capture_on_commit_callbacks):
+    client.get("/products/phone-1/")
+    with django_capture_on_commit_callbacks(execute=True):
+        Category.objects.create(name="Ноутбуки", slug="notebooks")
+    assert 'href="/category/notebooks/"' in client.get("/products/phone-1/").content.decode()
+
+
+def test_attached_feature_invalidates_product_page(store_setup, client, django_capture_on_commit_callbacks):
+    product = store_setup["products"]["phone-1"]
+    diagonal = CategoryFeature.objects.create(
+        category=store_setup["category"], feature_name="Диагональ", feature_filter_name="diagonal", unit="inch"
+    )
+    feature = ProductFeatures.objects.create(product=product, feature=diagonal, value="6.1")
+    client.get("/products/phone-1/")
+    with django_capture_on_commit_callbacks(execute=True):
+        product.features.add(feature)
+    assert "6.1 inch" in client.get("/products/phone-1/").content.decode()
+
+
+def test_product_save_does_not_load_category(store_setup):
+    product = Product.objects.get(slug="phone-1")
+    product.title = "Phone One"
+    with CaptureQueriesContext(connection) as queries:
+        product.save()
+    assert not [query["sql"] for query in queries if query["sql"].startswith('SELECT "store_category"')]
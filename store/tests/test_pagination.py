@@ -0,0 +1,42 @@
+from django.http import QueryDict
+from django.urls import reverse
+
+from store.models import Product
+from store.pagination import KeysetPaginator
+
+
+def test_keyset_pages(store_setup):
+    ids = list(Product.objects.order_by("id").values_list("id", flat=True))
+    paginator = KeysetPaginator(Product.objects.all())
+
+    first = paginator.paginate(QueryDict("page_size=2"))
+    assert [p.id for p in first] == ids[:2]
+    assert first.previous_url is None
+    assert first.next_url == f"?page_size=2&after={ids[1]}"
+
+    second = paginator.paginate(QueryDict(first.next_url[1:]))
+    assert [p.id for p in second] == ids[2:]
+    assert second.next_url is None
+
+    back = paginator.paginate(QueryDict(second.previous_url[1:]))
+    assert [p.id for p in back] == ids[:2]
+    assert back.previous_url is None
+
+
+def test_page_size_is_capped(store_setup):
+    paginator = KeysetPaginator(Product.objects.all())
+    assert paginator.get_page_size(QueryDict("page_size=1000")) == KeysetPaginator.max_page_size
+    assert paginator.get_page_size(QueryDict("page_size=abc")) == KeysetPaginator.page_size
+
+
+def test_home_page_paginated(store_setup, client):
+    response = client.get(reverse("base"), {"page_size": 2})
+    assert len(response.context["products"]) == 2
+    assert response.context["products"].next_url
+
+
+def test_products_api_cursor(store_setup, client):
+    response = client.get(reverse("products_list"), {"page_size": 2})
+    data = response.json()
+    assert [item["slug"] for item in data["results"]] == ["phone-1", "phone-2"]
+    assert [item["slug"] for item in client.get(data["next"]).json()["results"]] == ["phone-3"]
@@ -0,0 +1,44 @@
+import pytest
+
+from django.urls import reverse
+
+from store.models import Product
+from store.product_refs import get_product_ref, get_product_refs, local_product_refs
+
+
+def test_product_ref(store_setup):
+    product = store_setup["products"]["phone-2"]
+    ref = get_product_ref("phone-2")
+    assert (ref.id, ref.price, ref.title, ref.category_id) == (
+        product.id, product.price, product.title, product.category_id
+    )
+    with pytest.raises(Product.DoesNotExist):
+        get_product_ref("missing")
+
+
+def test_product_refs_cached(store_setup, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        assert set(get_product_refs(["phone-1", "phone-2"])) == {"phone-1", "phone-2"}
+    local_product_refs.clear()
+    with django_assert_num_queries(0):
+        # Из общего кэша, без запроса к БД
+        assert get_product_refs(["phone-1", "phone-2"])["phone-1"].slug == "phone-1"
+
+
+def test_product_ref_invalidated(store_setup, django_capture_on_commit_callbacks):
+    product = store_setup["products"]["phone-1"]
+    get_product_ref("phone-1")
+    product.price = 150
+    product.slug = "phone-1-new"
+    with django_capture_on_commit_callbacks(execute=True):
+        product.save()
+    with pytest.raises(Product.DoesNotExist):
+        get_product_ref("phone-1")
+    assert get_product_ref("phone-1-new").price == 150
+
+
+def test_cart_change_without_product_row(store_setup, client, django_assert_max_num_queries):
+    client.post(reverse("add_to_cart_ajax", kwargs={"slug": "phone-1"}))
+    with django_assert_max_num_queries(8) as captured:
+        client.post(reverse("change_qty_ajax", kwargs={"slug": "phone-1"}), {"qty": 2})
+    assert not any('"store_product"."description"' in query["sql"] for query in captured.captured_queries)
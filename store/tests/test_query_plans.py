@@ -0,0 +1,68 @@
+"""Горячие запросы магазина идут по своим индексам (в PostgreSQL seq scan на время проверки отключён)"""
+from contextlib import contextmanager
+
+import pytest
+
+from django.db import connection
+
+from specs.models import ProductFeatures
+from store.models import Cart, CartProduct, Customer, Order, Product
+
+
+@contextmanager
+def index_scans_preferred():
+    if connection.vendor != "postgresql":
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SET enable_seqscan = off")
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("RESET enable_seqscan")
+
+
+def assert_uses_index(queryset, *index_names):
+    with index_scans_preferred():
+        plan = queryset.explain()
+    assert any(name in plan for name in index_names), plan
+
+
+@pytest.fixture
+def orders(store_setup, customer_user):
+    customer = Customer.objects.create(user=customer_user)
+    for _ in range(3):
+        cart = Cart.objects.create(owner=customer, in_order=True)
+        Order.objects.create(customer=customer, cart=cart, first_name="Ivan", last_name="Ivanov", phone="1")
+    cart = Cart.objects.create(owner=customer)
+    for product in store_setup["products"].values():
+        CartProduct.objects.create(user=customer, cart=cart, product=product)
+    return customer
+
+
+def test_open_cart_lookup(orders):
+    assert_uses_index(Cart.objects.filter(owner=orders, in_order=False), "cart_open_owner_idx")
+
+
+def test_order_history(orders):
+    queryset = Order.objects.filter(customer=orders).order_by("-created_at", "-id")
+    assert_uses_index(queryset, "order_customer_created_idx")
+
+
+def test_cart_line_lookup(orders, store_setup):
+    cart = Cart.objects.get(owner=orders, in_order=False)
+    queryset = CartProduct.objects.filter(cart=cart, product=store_setup["products"]["phone-1"])
+    # SQLite строит уникальное ограничение в CREATE TABLE как autoindex
+    assert_uses_index(queryset, "unique_cart_product", "sqlite_autoindex_store_cartproduct")
+
+
+def test_category_products_keyset_page(store_setup):
+    category = store_setup["category"]
+    queryset = Product.objects.filter(category=category, pk__gt=1).order_by("pk")
+    assert_uses_index(queryset, "product_category_id_idx")
+
+
+def test_feature_value_lookup(store_setup):
+    feature = store_setup["features"]["ram"]
+    assert_uses_index(ProductFeatures.objects.filter(feature=feature, value="8"), "productfeatures_value_idx")
@@ -0,0 +1,113 @@
+import pytest
+
+from django.urls import reverse
+
+from specs.models import ProductFeatures
+from store.models import Category, Product, ProductSearchDocument
+from store.search import InvertedIndex, search_products
+
+
+@pytest.fixture(params=["database", "inverted"])
+def search_backend(request, settings):
+    # database - PostgreSQL FTS/триграммы или обратный индекс, в зависимости от СУБД тестов
+    if request.param == "inverted":
+        settings.STORE_SEARCH_BACKEND = "store.search.InvertedIndexSearchBackend"
+    return request.param
+
+
+def slugs(product_ids):
+    return [Product.objects.get(id=pk).slug for pk in product_ids]
+
+
+def test_documents_follow_products_and_features(store_setup):
+    product = store_setup["products"]["phone-3"]
+    document = ProductSearchDocument.objects.get(product=product)
+    assert (document.title, document.features) == ("Phone 3", "8 white")
+
+    ProductFeatures.objects.filter(product=product, value="white").delete()
+    product.title = "Renamed"
+    product.save()
+    document.refresh_from_db()
+    assert (document.title, document.features) == ("Renamed", "8")
+
+
+def test_title_feature_and_description_are_searched(store_setup, search_backend):
+    category_id = store_setup["category"].id
+    phone_1 = store_setup["products"]["phone-1"]
+    phone_1.description = "Compact galaxy of features"
+    phone_1.save()
+
+    assert slugs(search_products("white", category_id)) == ["phone-3"]
+    assert slugs(search_products("galaxy", category_id)) == ["phone-1"]
+    assert set(slugs(search_products("phone", category_id))) == {"phone-1", "phone-2", "phone-3"}
+    assert search_products("nokia", category_id) == []
+
+
+def test_unfinished_last_word_is_a_prefix(store_setup, search_backend):
+    # В PostgreSQL без pg_trgm - префиксный tsquery, с ним - триграммы по названию
+    category_id = store_setup["category"].id
+    assert set(slugs(search_products("pho", category_id))) == {"phone-1", "phone-2", "phone-3"}
+    assert slugs(search_products("white pho", category_id)) == ["phone-3"]
+    assert search_products("whi pho", category_id) == []
+
+
+def test_title_match_ranks_above_description(store_setup, search_backend):
+    products = store_setup["products"]
+    products["phone-1"].description = "galaxy"
+    products["phone-1"].save()
+    products["phone-2"].title = "Galaxy"
+    products["phone-2"].save()
+
+    assert slugs(search_products("galaxy", store_setup["category"].id)) == ["phone-2", "phone-1"]
+
+
+def test_search_is_scoped_to_category(store_setup, search_backend, django_capture_on_commit_callbacks):
+    other = Category.objects.create(name="Планшеты", slug="tablets")
+    product = store_setup["products"]["phone-1"]
+    assert search_products("phone", other.id) == []
+
+    product.category = other
+    with django_capture_on_commit_callbacks(execute=True):
+        product.save()
+    assert slugs(search_products("phone", other.id)) == ["phone-1"]
+    assert "phone-1" not in slugs(search_products("phone", store_setup["category"].id))
+
+
+def test_inverted_index_prefix_and_all_words():
+    index = InvertedIndex.from_documents([
+        (1, "Galaxy S21", "8 black", ""),
+        (2, "Galaxy A52", "4 white", "budget galaxy"),
+        (3, "Pixel 6", "8 white", ""),
+    ])
+    assert index.search("gal", 10) == [2, 1]
+    assert index.search("galaxy whi", 10) == [2]
+    assert index.search("pixel black", 10) == []
+    assert index.search("", 10) == []
+
+
+def test_category_page_search(store_setup, client):
+    category = store_setup["category"]
+    response = client.get(reverse("category_detail", kwargs={"slug": category.slug}), {"search": "white"})
+    assert [product.slug for product in response.context["category_products"]] == ["phone-3"]
+
+
+def test_category_page_search_is_paginated(store_setup, client):
+    url = reverse("category_detail", kwargs={"slug": store_setup["category"].slug})
+    ranked = slugs(search_products("phone", store_setup["category"].id))
+    pages = []
+    response = client.get(url, {"search": "phone", "page_size": 2})
+    while True:
+        page = response.context["category_products"]
+        pages.append([product.slug for product in page])
+        if not page.next_url:
+            break
+        response = client.get(url + page.next_url)
+    assert pages == [ranked[:2], ranked[2:]]
+    assert page.previous_url.endswith("page=1")
+
+
+def test_specs_search_product_ajax(store_setup, client):
+    response = client.get(
+        reverse("search-product"), {"query": "phone", "category_id": store_setup["category"].id}
+    )
+    assert {product["slug"] for product in response.json()["result"]} == {"phone-1", "phone-2", "phone-3"}
@@ -0,0 +1,81 @@
+import csv
+import io
+import json
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from specs.exporter import FLAT_COLUMNS, export_catalog
+from specs.importer import SpecImporter
+from store.models import Category, Product
+
+
+def export(file_format, **kwargs):
+    return "".join(export_catalog(file_format, **kwargs))
+
+
+def test_csv_export(store_setup):
+    Product.objects.create(
+        category=store_setup["category"], title="No specs", price=1, image="images/phone.png", slug="bare"
+    )
+    rows = list(csv.DictReader(io.StringIO(export("csv"))))
+    assert len(rows) == 7
+    assert rows[0] == {
+        "product_id": str(store_setup["products"]["phone-1"].id), "product": "phone-1", "title": "Phone 1",
+        "category": "smartphones", "price": "100.00", "feature_name": "Оперативная память", "value": "4", "unit": "GB",
+    }
+    assert rows[-1]["product"] == "bare" and rows[-1]["feature_name"] == ""
+
+
+def test_csv_export_can_be_imported_back(store_setup):
+    results = SpecImporter("product_features").upsert(io.StringIO(export("csv")), as_string_obj=True)
+    assert results["errors"] == []
+    assert "Unchanged 6 rows" in results["summaries"]
+
+
+def test_jsonl_export(store_setup):
+    products = [json.loads(line) for line in export("jsonl", chunk_size=2).splitlines()]
+    assert [product["slug"] for product in products] == ["phone-1", "phone-2", "phone-3"]
+    assert products[2]["features"] == [
+        {"name": "Оперативная память", "value": "8", "unit": "GB"},
+        {"name": "Цвет", "value": "white", "unit": ""},
+    ]
+
+
+def test_columnar_export(store_setup):
+    header, *groups = [json.loads(line) for line in export("columnar", chunk_size=2).splitlines()]
+    assert header["columns"] == FLAT_COLUMNS
+    assert [group["rows"] for group in groups] == [4, 2]
+    assert groups[1]["columns"]["product"] == ["phone-3", "phone-3"]
+    assert groups[1]["columns"]["value"] == ["8", "white"]
+
+
+def test_export_reads_in_chunks(store_setup):
+    other = Category.objects.create(name="Планшеты", slug="tablets")
+    Product.objects.create(category=other, title="Tab", price=1, image="images/phone.png", slug="tab")
+    with CaptureQueriesContext(connection) as queries:
+        output = export("jsonl", chunk_size=2, category_id=store_setup["category"].id)
+    assert len(output.splitlines()) == 3
+    # Две пачки по два запроса и пустая последняя
+    assert len(queries) == 5
+
+
+def test_export_command(store_setup, tmp_path):
+    out = io.StringIO()
+    call_command("export_specs", "--format", "jsonl", "--category", "smartphones", stdout=out)
+    assert len(out.getvalue().splitlines()) == 3
+    path = tmp_path / "catalog.csv"
+    call_command("export_specs", "--output", str(path))
+    assert path.read_text(encoding="utf-8").splitlines()[0] == ",".join(FLAT_COLUMNS)
+
+
+def test_export_download(store_setup, client, admin_client):
+    url = reverse("export-specs")
+    assert client.get(url).status_code == 302
+    response = admin_client.get(url, {"format": "columnar"})
+    assert response.streaming
+    assert response["Content-Disposition"] == 'attachment; filename="catalog.columnar.jsonl"'
+    assert len(b"".join(response.streaming_content).splitlines()) == 2
+    assert admin_client.get(url, {"format": "xml"}).status_code == 400
@@ -0,0 +1,194 @@
+import io
+import json
+
+from django.contrib.auth.models import Permission
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from specs.importer import SpecImporter
+from specs.models import CategoryFeature, FeatureValidator, ProductFeatures
+from specs.options import get_category_options
+from store.models import Product
+
+
+def csv_file(*lines):
+    return io.StringIO("\n".join(lines) + "\n")
+
+
+def import_csv(kind, *lines, **kwargs):
+    return SpecImporter(kind, **kwargs).upsert(csv_file(*lines), as_string_obj=True)
+
+
+def test_import_features_and_validators(store_setup, django_capture_on_commit_callbacks):
+    category_id = store_setup["category"].id
+    get_category_options(category_id)
+    results = import_csv(
+        "features",
+        "category,feature_name,feature_filter_name,unit",
+        "smartphones,Диагональ,diagonal,inch",
+        "smartphones,Оперативная память,ram,ГБ",
+        "notebooks,Диагональ,diagonal,inch",
+    )
+    assert results["errors"] == [{3: ["Could not find category notebooks"]}]
+    assert results["summaries"][:3] == ["Processed 3 rows", "Created 1 rows", "Updated 1 rows"]
+    assert CategoryFeature.objects.get(feature_name="Диагональ").unit == "inch"
+    assert CategoryFeature.objects.get(feature_name="Оперативная память").unit == "ГБ"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        results = import_csv(
+            "validators",
+            "category,feature_name,value",
+            "smartphones,Диагональ,6.1",
+            "smartphones,Диагональ,6.7",
+            "smartphones,Диагональ,6.7",
+            "smartphones,Вес,180",
+        )
+    assert results["errors"] == [{4: ["Feature Вес does not exist in the category"]}]
+    assert sorted(FeatureValidator.objects.values_list("valid_feature_value", flat=True)) == ["6.1", "6.7"]
+    # Импорт идёт мимо сигналов - списки редактора характеристик сбрасываются явно
+    options = get_category_options(category_id)
+    diagonal = CategoryFeature.objects.get(feature_name="Диагональ")
+    assert [value["value"] for value in options["values"][diagonal.id]] == ["6.1", "6.7"]
+
+
+def test_import_product_features(store_setup, client, django_capture_on_commit_callbacks):
+    ram = store_setup["features"]["ram"]
+    FeatureValidator.objects.bulk_create(
+        FeatureValidator(category=store_setup["category"], feature_key=ram, valid_feature_value=value)
+        for value in ("4", "8", "12")
+    )
+    import_csv("features", "category,feature_name,feature_filter_name,unit", "smartphones,Диагональ,diagonal,inch")
+    client.get("/products/phone-1/")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        results = import_csv(
+            "product_features",
+            "product,feature_name,value",
+            "phone-1,Оперативная память,12",
+            "phone-1,Диагональ,6.1",
+            "phone-2,Оперативная память,16",
+            "phone-9,Диагональ,6.1",
+            "phone-3,Диагональ,",
+            "phone-1,Диагональ,6.2",
+        )
+    assert results["errors"] == [
+        {3: ["Invalid value 16 for feature Оперативная память"]},
+        {4: ["Could not find product phone-9"]},
+        {5: ["Missing required value"]},
+        {6: ["Duplicate feature Диагональ for product phone-1"]},
+    ]
+    assert results["summaries"] == [
+        "Processed 6 rows", "Created 1 rows", "Updated 1 rows", "Unchanged 0 rows", "Skipped 4 rows",
+    ]
+    product = store_setup["products"]["phone-1"]
+    assert product.get_features() == {"Оперативная память": "12 GB", "Цвет": "black ", "Диагональ": "6.1 inch"}
+    # Импорт идёт мимо сигналов - кэш страницы товара сбрасывается явно
+    assert "6.1 inch" in client.get("/products/phone-1/").content.decode()
+
+
+def test_import_json_lines(store_setup):
+    lines = [
+        json.dumps({"product": "phone-1", "feature_name": "Цвет", "value": "red"}),
+        "{not json",
+        "",
+        json.dumps({"product": "phone-2", "feature_name": "Цвет", "value": "black"}),
+    ]
+    results = SpecImporter("product_features").upsert(
+        io.BytesIO("\n".join(lines).encode()), file_format="jsonl"
+    )
+    assert results["errors"] == [{2: ["Could not parse row as an object"]}]
+    assert results["summaries"][:4] == ["Processed 3 rows", "Created 0 rows", "Updated 1 rows", "Unchanged 1 rows"]
+    assert ProductFeatures.objects.get(product=store_setup["products"]["phone-1"], value="red")
+
+
+def test_values_longer_than_model_fields(store_setup):
+    results = import_csv(
+        "features",
+        "category,feature_name,feature_filter_name,unit",
+        f"smartphones,{'Д' * 51},diagonal,inch",
+        f"smartphones,Диагональ,{'d' * 51},{'u' * 51}",
+        "smartphones,Диагональ,diagonal,inch",
+    )
+    assert results["errors"] == [
+        {1: ["Value of feature_name is longer than 50 characters"]},
+        {2: [
+            "Value of feature_filter_name is longer than 50 characters",
+            "Value of unit is longer than 50 characters",
+        ]},
+    ]
+    assert results["summaries"][:2] == ["Processed 3 rows", "Created 1 rows"]
+
+    results = import_csv("validators", "category,feature_name,value", f"smartphones,Цвет,{'x' * 101}")
+    assert results["errors"] == [{1: ["Value of value is longer than 100 characters"]}]
+    results = import_csv("product_features", "product,feature_name,value", f"phone-1,Цвет,{'x' * 256}")
+    assert results["errors"] == [{1: ["Value of value is longer than 255 characters"]}]
+    assert not ProductFeatures.objects.filter(value__startswith="xxx").exists()
+
+
+def test_unexpected_columns(store_setup):
+    results = import_csv("product_features", "title,feature,value", "phone-1,Цвет,red")
+    assert results["errors"][0].startswith("Inbound data does not have expected columns")
+    assert results["summaries"] == []
+
+
+def test_query_count_does_not_grow_with_rows(store_setup):
+    category = store_setup["category"]
+    Product.objects.bulk_create(
+        Product(category=category, title=f"Bulk {number}", price=1, image="images/phone.png", slug=f"bulk-{number}")
+        for number in range(20)
+    )
+
+    def count_queries(products):
+        lines = ["product,feature_name,value"]
+        lines += [f"bulk-{number},Цвет,black" for number in products]
+        lines += [f"bulk-{number},Оперативная память,8" for number in products]
+        with CaptureQueriesContext(connection) as queries:
+            results = import_csv("product_features", *lines)
+        assert results["errors"] == []
+        return len(queries)
+
+    assert count_queries(range(0, 2)) == count_queries(range(2, 20))
+
+
+def test_chunks(store_setup):
+    lines = ["product,feature_name,value"] + [f"phone-{number},Цвет,white" for number in (1, 2, 3)]
+    results = import_csv("product_features", *lines, chunk_size=2)
+    assert results["summaries"][:4] == ["Processed 3 rows", "Created 0 rows", "Updated 2 rows", "Unchanged 1 rows"]
+
+
+def test_import_command(store_setup, tmp_path):
+    path = tmp_path / "validators.csv"
+    path.write_text("category,feature_name,value\nsmartphones,Цвет,black\nsmartphones,Цвет,white\n", encoding="utf-8")
+    out = io.StringIO()
+    call_command("import_specs", "validators", "--file", str(path), stdout=out)
+    assert "Created 2 rows" in out.getvalue()
+    assert FeatureValidator.objects.count() == 2
+
+
+def test_admin_upload(store_setup, admin_client):
+    url = reverse("admin:specs_productfeatures_import")
+    assert url in admin_client.get(reverse("admin:specs_productfeatures_changelist")).content.decode()
+    assert admin_client.get(url).status_code == 200
+    upload = SimpleUploadedFile(
+        "specs.csv", "product,feature_name,value\nphone-1,Цвет,red\n".encode(), content_type="text/csv"
+    )
+    response = admin_client.post(url, {"kind": "product_features", "file": upload})
+    assert "Updated 1 rows" in response.content.decode()
+    assert ProductFeatures.objects.filter(value="red").count() == 1
+
+
+def test_admin_upload_requires_add_and_change_permission(store_setup, client, django_user_model):
+    staff = django_user_model.objects.create_user(username="staff", password="password", is_staff=True)
+    staff.user_permissions.add(Permission.objects.get(codename="change_productfeatures"))
+    client.force_login(staff)
+    url = reverse("admin:specs_productfeatures_import")
+    assert url not in client.get(reverse("admin:specs_productfeatures_changelist")).content.decode()
+    upload = SimpleUploadedFile("specs.csv", "product,feature_name,value\nphone-1,Цвет,red\n".encode())
+    assert client.post(url, {"kind": "product_features", "file": upload}).status_code == 403
+    assert not ProductFeatures.objects.filter(value="red").exists()
+
+    staff.user_permissions.add(Permission.objects.get(codename="add_productfeatures"))
+    assert client.get(url).status_code == 200
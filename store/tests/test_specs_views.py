@@ -0,0 +1,161 @@
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from specs.feature_values import update_product_feature_values
+from specs.models import CategoryFeature, FeatureValidator, ProductFeatures
+
+
+def add_validators(category, feature, *values):
+    FeatureValidator.objects.bulk_create(
+        FeatureValidator(category=category, feature_key=feature, valid_feature_value=value) for value in values
+    )
+
+
+def test_features_for_update(store_setup, client):
+    category = store_setup["category"]
+    add_validators(category, store_setup["features"]["ram"], "4", "8", "12")
+    add_validators(category, store_setup["features"]["color"], "black", "white")
+    product = store_setup["products"]["phone-1"]
+
+    response = client.get(reverse("show-product-features-for-update"), {"product_id": product.id})
+    result = response.json()["result"]
+    ram_id = store_setup["features"]["ram"].id
+    assert f'<option value="{ram_id}">8</option><option value="{ram_id}">12</option>' in result
+    assert f'<option value="{ram_id}">4</option>' not in result
+    assert 'value="Оперативная память" disabled' in result
+
+
+def test_features_for_update_query_count_is_constant(store_setup, client):
+    category = store_setup["category"]
+    product = store_setup["products"]["phone-1"]
+    url = reverse("show-product-features-for-update")
+
+    def count_queries():
+        with CaptureQueriesContext(connection) as queries:
+            assert client.get(url, {"product_id": product.id}).status_code == 200
+        return len(queries)
+
+    baseline = count_queries()
+    for index in range(10):
+        feature = CategoryFeature.objects.create(
+            category=category, feature_name=f"Характеристика {index}", feature_filter_name=f"feature-{index}"
+        )
+        add_validators(category, feature, "1", "2", "3")
+        product.features.add(ProductFeatures.objects.create(product=product, feature=feature, value="1"))
+    assert count_queries() == baseline
+
+
+def post_feature_values(client, product, values):
+    return client.post(reverse("update-product-features-ajax"), {
+        "product": product.title,
+        "features_names": list(values),
+        "features_current_values": ["" for _ in values],
+        "new_feature_values": list(values.values()),
+    })
+
+
+def test_update_feature_values(store_setup, client, django_capture_on_commit_callbacks):
+    category = store_setup["category"]
+    add_validators(category, store_setup["features"]["ram"], "4", "8", "12")
+    add_validators(category, store_setup["features"]["color"], "black", "white")
+    product = store_setup["products"]["phone-1"]
+    client.get(product.get_absolute_url())
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = post_feature_values(client, product, {"Оперативная память": "12", "Цвет": "---"})
+    assert response.json() == {"result": "ok", "diff": {"Оперативная память": {"old": "4", "new": "12"}}}
+    assert ProductFeatures.objects.get(product=product, feature=store_setup["features"]["ram"]).value == "12"
+    # bulk_update не шлёт сигналы - кэши сбрасываются явно
+    assert "12 GB" in client.get(product.get_absolute_url()).content.decode()
+
+
+def test_invalid_value_rejects_whole_update(store_setup, client):
+    category = store_setup["category"]
+    add_validators(category, store_setup["features"]["ram"], "4", "8")
+    add_validators(category, store_setup["features"]["color"], "black", "white")
+    product = store_setup["products"]["phone-1"]
+
+    response = post_feature_values(client, product, {"Оперативная память": "8", "Цвет": "pink"})
+    assert response.status_code == 400
+    assert list(response.json()["errors"]) == ["Цвет"]
+    assert ProductFeatures.objects.get(product=product, feature=store_setup["features"]["ram"]).value == "4"
+
+
+def test_update_many_feature_values_in_few_queries(store_setup, client):
+    category = store_setup["category"]
+    product = store_setup["products"]["phone-1"]
+    features = {}
+    for index in range(30):
+        feature = CategoryFeature.objects.create(
+            category=category, feature_name=f"Характеристика {index}", feature_filter_name=f"feature-{index}"
+        )
+        add_validators(category, feature, "1", "2")
+        product.features.add(ProductFeatures.objects.create(product=product, feature=feature, value="1"))
+        features[feature.feature_name] = "2"
+
+    with CaptureQueriesContext(connection) as queries:
+        response = post_feature_values(client, product, features)
+    assert len(response.json()["diff"]) == 30
+    assert len(queries) < 20
+    assert set(ProductFeatures.objects.filter(feature__in=CategoryFeature.objects.filter(
+        feature_name__in=features
+    )).values_list("value", flat=True)) == {"2"}
+
+
+def test_feature_choices(store_setup, client, django_assert_num_queries, django_capture_on_commit_callbacks):
+    category = store_setup["category"]
+    url = reverse("feature-choice-validators")
+    client.get(url, {"category_id": category.id})
+    with django_assert_num_queries(0):
+        response = client.get(url, {"category_id": category.id})
+    assert response.json() == {"result": [
+        {"value": "Оперативная память", "name": "Оперативная память"},
+        {"value": "Цвет", "name": "Цвет"},
+    ], "value": category.id}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        CategoryFeature.objects.create(category=category, feature_name="Диагональ", feature_filter_name="diagonal")
+    assert len(client.get(url, {"category_id": category.id}).json()["result"]) == 3
+
+
+def test_features_to_attach(store_setup, client, django_assert_num_queries):
+    category = store_setup["category"]
+    product = store_setup["products"]["phone-1"]
+    CategoryFeature.objects.create(category=category, feature_name="Диагональ", feature_filter_name="diagonal")
+    url = reverse("attach-feature")
+    client.get(url, {"product_id": product.id})
+    # Товар и его характеристики; списки категории - из кэша
+    with django_assert_num_queries(2):
+        response = client.get(url, {"product_id": product.id})
+    assert response.json() == {"features": [{"value": category.id, "name": "Диагональ"}]}
+
+
+def test_feature_value_choices(store_setup, client, django_assert_num_queries, django_capture_on_commit_callbacks):
+    category = store_setup["category"]
+    ram = store_setup["features"]["ram"]
+    add_validators(category, ram, "4", "8")
+    url = reverse("product-feature")
+    params = {"category_id": category.id, "product_feature_name": "Оперативная память"}
+    client.get(url, params)
+    with django_assert_num_queries(0):
+        response = client.get(url, params)
+    assert [option["name"] for option in response.json()["features"]] == ["4", "8"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        FeatureValidator.objects.create(category=category, feature_key=ram, valid_feature_value="12")
+    assert [option["name"] for option in client.get(url, params).json()["features"]] == ["4", "8", "12"]
+    with django_capture_on_commit_callbacks(execute=True):
+        FeatureValidator.objects.filter(valid_feature_value="4").delete()
+    assert [option["name"] for option in client.get(url, params).json()["features"]] == ["8", "12"]
+
+
+@pytest.mark.skipif(not connection.features.has_select_for_update, reason="no row locks")
+def test_update_feature_values_locks_rows(store_setup):
+    category = store_setup["category"]
+    add_validators(category, store_setup["features"]["ram"], "4", "8")
+    with CaptureQueriesContext(connection) as queries:
+        update_product_feature_values(store_setup["products"]["phone-1"], {"Оперативная память": "8"})
+    assert any("FOR UPDATE" in query["sql"] for query in queries)
@@ -4,10 +4,13 @@ from .views import (
     BaseView,
     ProductDetailView,
     CategoryDetailView,
+    CompareProductsView,
     CartView,
     AddToCartView,
     DeleteFromCartView,
     ChangeQTYview,
+    CartChangeAjaxView,
+    CartBatchAjaxView,
     CheckoutView,
     MakeOrderView,
     ProfileView,
@@ -18,10 +21,15 @@ urlpatterns = [
     path('products/<str:slug>/', ProductDetailView.as_view(), name='product_detail'),
     # Model-View-Template
     path('category/<str:slug>/', CategoryDetailView.as_view(), name='category_detail'),
+    path('compare/', CompareProductsView.as_view(), name='compare'),
     path('cart/', CartView.as_view(), name='cart'),
     path('add-to-cart/<str:slug>/', AddToCartView.as_view(), name='add_to_cart'),
     path('remove-from-cart/<str:slug>/', DeleteFromCartView.as_view(), name='delete_from_cart'),
     path('change-qty/<str:slug>/', ChangeQTYview.as_view(), name='change_qty'),
+    path('cart/ajax/add/<str:slug>/', CartChangeAjaxView.as_view(action='add'), name='add_to_cart_ajax'),
+    path('cart/ajax/remove/<str:slug>/', CartChangeAjaxView.as_view(action='remove'), name='delete_from_cart_ajax'),
+    path('cart/ajax/change-qty/<str:slug>/', CartChangeAjaxView.as_view(action='set_qty'), name='change_qty_ajax'),
+    path('cart/ajax/batch/', CartBatchAjaxView.as_view(), name='cart_batch_ajax'),
     path('checkout/', CheckoutView.as_view(), name='checkout'),
     path('make-order/', MakeOrderView.as_view(), name='make-order'),
     path('profile/', ProfileView.as_view(), name='profile'),
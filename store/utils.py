@@ -1,4 +1,10 @@
 from django.db import models
+from django.db.models import F
+
+from .models import Cart, Customer
+
+
+CART_SESSION_KEY = 'cart_id'
 
 
 def recalc_cart(cart):
@@ -8,4 +14,62 @@ def recalc_cart(cart):
     else:
         cart.final_price = 0
     cart.total_products = cart_data['id__count']
-    cart.save()
\ No newline at end of file
+    cart.save()
+
+
+def apply_cart_delta(cart, products_delta, price_delta):
+    """Инкрементально обновляет итоги корзины атомарным UPDATE с F()-выражениями.
+    Полный пересчёт (recalc_cart) остаётся для проверки расхождений: manage.py check_cart_totals"""
+    Cart.objects.filter(pk=cart.pk).update(
+        total_products=F('total_products') + products_delta,
+        final_price=F('final_price') + price_delta,
+    )
+    cart.refresh_from_db(fields=['total_products', 'final_price'])
+
+
+def get_customer_cart(user):
+    cart = Cart.objects.select_related('owner').filter(owner__user=user, in_order=False).first()
+    if not cart:
+        customer = Customer.objects.filter(user=user).first()
+        if not customer:
+            customer = Customer.objects.create(user=user)
+        cart = Cart.objects.create(owner=customer)
+    return cart
+
+
+def get_cart(request):
+    """Корзина текущего запроса.
+    Покупатель с корзиной достаются одним запросом; у анонима корзина своя для каждой сессии
+    и до первого добавления товара не сохраняется."""
+    if request.user.is_authenticated:
+        return get_customer_cart(request.user)
+    cart_id = request.session.get(CART_SESSION_KEY)
+    cart = None
+    if cart_id:
+        cart = Cart.objects.filter(id=cart_id, owner__isnull=True, in_order=False).first()
+    if not cart:
+        cart = Cart(for_anonymous_user=True)
+    return cart
+
+
+def merge_anonymous_cart(request, user):
+    """Переносит товары анонимной корзины сессии в корзину покупателя после входа"""
+    cart_id = request.session.pop(CART_SESSION_KEY, None)
+    anonymous_cart = Cart.objects.filter(id=cart_id, owner__isnull=True, in_order=False).first() if cart_id else None
+    if not anonymous_cart:
+        return
+    cart = get_customer_cart(user)
+    existing = {item.product_id: item for item in cart.products.select_related('product')}
+    for item in anonymous_cart.products.select_related('product'):
+        if item.product_id in existing:
+            cart_product = existing[item.product_id]
+            cart_product.qty += item.qty
+            cart_product.save()
+            item.delete()
+        else:
+            item.user = cart.owner
+            item.cart = cart
+            item.save()
+            cart.products.add(item)
+    anonymous_cart.delete()
+    recalc_cart(cart)
@@ -1,16 +1,22 @@
-from django.db import transaction
+import json
+
+from django.db import IntegrityError, transaction
 from django.db.models import Q
 from django.shortcuts import render
 from django.contrib import messages
-from django.http import HttpResponseRedirect
+from django.core.paginator import Paginator
+from django.http import Http404, HttpResponseRedirect, JsonResponse
 from django.views.generic import DetailView, View
 
-from .models import Category, Customer, Cart, CartProduct, Product, Order
-from .mixins import CartMixin
+from .models import Category, Cart, CartProduct, Customer, Product, Order, OrderLine
+from .mixins import CartMixin, PageCacheMixin
 from .forms import OrderForm
-from .utils import recalc_cart
-
-from specs.models import ProductFeatures
+from .facets import FacetIndex
+from .features import SpecTable
+from .page_cache import NAVIGATION_TAG, PRODUCTS_TAG, category_tag, product_tag
+from .pagination import KeysetPaginator, RankedPaginator
+from .product_refs import get_product_ref, get_product_refs
+from .search import search_products
 
 
 class MyQ(Q):
@@ -19,35 +25,45 @@ class MyQ(Q):
 
 
 
-class BaseView(CartMixin, View):
+class BaseView(CartMixin, PageCacheMixin, View):
     """Базовая вьюшка"""
+
+    key_specs = 3
+
+    def get_page_tags(self):
+        return [NAVIGATION_TAG, PRODUCTS_TAG]
+
     def get(self, request, *args, **kwargs):
-        categories = Category.objects.all()
-        products = Product.objects.all()
+        products = KeysetPaginator(Product.objects.all()).paginate(request.GET)
+        SpecTable.attach(products.object_list, key_specs=self.key_specs)
         context = {
-            'categories': categories,
             'products': products,
             'cart': self.cart,
+            'cart_badge_placeholder': self.cart_badge_placeholder,
         }
         return render(request, 'base.html', context)
 
 
-class ProductDetailView(CartMixin, DetailView):
+class ProductDetailView(CartMixin, PageCacheMixin, DetailView):
     """Вьюшка характеристик товара"""
 
     model = Product
+    queryset = Product.objects.select_related('category')
     context_object_name = 'product'
     template_name = 'product_detail.html'
     slug_url_kwarg = 'slug'
 
+    def get_page_tags(self):
+        return [NAVIGATION_TAG, product_tag(self.kwargs['slug'])]
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = self.get_object().category.__class__.objects.all()
+        context['features'] = self.object.get_features()
         context['cart'] = self.cart
         return context
 
 
-class CategoryDetailView(CartMixin, DetailView):
+class CategoryDetailView(CartMixin, PageCacheMixin, DetailView):
     """Вьюшка категорий"""
 
     model = Category
@@ -55,51 +71,57 @@ class CategoryDetailView(CartMixin, DetailView):
     context_object_name = 'category'
     template_name = 'category_detail.html'
     slug_url_kwarg = 'slug'
+    key_specs = 3
+    max_search_results = 480
+
+    def get_page_tags(self):
+        return [NAVIGATION_TAG, category_tag(self.kwargs['slug'])]
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         query = self.request.GET.get('search')
-        category = self.get_object()
+        category = self.object
         context['cart'] = self.cart
-        context['categories'] = self.model.objects.all()
-        if not query and not self.request.GET:
-            context['category_products'] = category.product_set.all()
-            return context
+        facet_index = FacetIndex.for_category(category.id)
+        filters = facet_index.filters_from_query(self.request.GET)
+        context['facet_counts'] = facet_index.counts(filters)
+        products = category.product_set.all()
         if query:
-            products = category.product_set.filter(Q(title__icontains=query))
-            context['category_products'] = products
-            return context
-        url_kwargs = {}
-        for item in self.request.GET:
-            if len(self.request.GET.getlist(item)) > 1:
-                url_kwargs[item] = self.request.GET.getlist(item)
-            else:
-                url_kwargs[item] = self.request.GET.get(item)
-        q_condition_queries = Q()
-        for key, value in url_kwargs.items():
-            if isinstance(value, list):
-                q_condition_queries.add(Q(**{'value__in': value}), Q.OR)
-            else:
-                q_condition_queries.add(Q(**{'value': value}), Q.OR)
-        pf = ProductFeatures.objects.filter(
-            q_condition_queries
-        ).prefetch_related('product', 'feature').values('product_id')
-        products = Product.objects.filter(id__in=[pf_['product_id'] for pf_ in pf])
+            # Результаты поиска - по страницам в порядке релевантности
+            product_ids = search_products(query, category.id, limit=self.max_search_results)
+            products = RankedPaginator(products, product_ids).paginate(self.request.GET)
+        else:
+            if filters:
+                products = products.filter(id__in=facet_index.match(filters))
+            products = KeysetPaginator(products).paginate(self.request.GET)
+        SpecTable.attach(products.object_list, key_specs=self.key_specs)
         context['category_products'] = products
         return context
 
 
+class CompareProductsView(CartMixin, View):
+    """Сравнение характеристик товаров"""
+
+    max_products = 4
+
+    def get(self, request, *args, **kwargs):
+        slugs = request.GET.getlist('slug')[:self.max_products]
+        products = Product.objects.filter(slug__in=slugs).select_related('category')
+        spec_table = products.spec_table()
+        context = {
+            'products': products,
+            'spec_rows': spec_table.rows(),
+            'cart': self.cart,
+        }
+        return render(request, 'compare.html', context)
+
+
 class AddToCartView(CartMixin, View):
     """Добавление в корзину"""
     def get(self, request, *args, **kwargs):
         product_slug = kwargs.get('slug')
-        product = Product.objects.get(slug=product_slug)
-        cart_product, created = CartProduct.objects.get_or_create(
-            user=self.cart.owner, cart=self.cart, product=product
-        )
-        if created:
-            self.cart.products.add(cart_product)
-        recalc_cart(self.cart)
+        product = get_product_ref(product_slug)
+        self.cart_backend.add(product)
         messages.add_message(request, messages.INFO, "Товар успешно добавлен")
         return HttpResponseRedirect('/cart/')
 
@@ -107,13 +129,11 @@ class DeleteFromCartView(CartMixin, View):
     """Удаление товаров из корзины"""
     def get(self, request, *args, **kwargs):
         product_slug = kwargs.get('slug')
-        product = Product.objects.get(slug=product_slug)
-        cart_product = CartProduct.objects.get(
-            user=self.cart.owner, cart=self.cart, product=product
-        )
-        self.cart.products.remove(cart_product)
-        cart_product.delete()                            # удаляет товар корзины из базы(админки)
-        recalc_cart(self.cart)
+        product = get_product_ref(product_slug)
+        try:
+            self.cart_backend.remove(product)
+        except CartProduct.DoesNotExist:
+            raise Http404("Товара нет в корзине")
         messages.add_message(request, messages.INFO, "Товар успешно удален")
         return HttpResponseRedirect('/cart/')
 
@@ -121,25 +141,91 @@ class ChangeQTYview(CartMixin, View):
     """Кол-во товара в корзине"""
     def post(self, request, *args, **kwargs):
         product_slug = kwargs.get('slug')
-        product = Product.objects.get(slug=product_slug)
-        cart_product = CartProduct.objects.get(
-            user=self.cart.owner, cart=self.cart, product=product
-        )
+        product = get_product_ref(product_slug)
         qty = int(request.POST.get('qty'))
-        cart_product.qty = qty
-        cart_product.save()
-        recalc_cart(self.cart)
+        try:
+            self.cart_backend.set_qty(product, qty)
+        except CartProduct.DoesNotExist:
+            raise Http404("Товара нет в корзине")
         messages.add_message(request, messages.INFO, "Кол-во успешно изменено")
         return HttpResponseRedirect('/cart/')
 
 
+class CartChangeAjaxView(CartMixin, View):
+    """Изменение корзины без перезагрузки страницы: в ответе только изменённая строка и итоги"""
+
+    action = None
+    max_batch_size = 50
+
+    def apply_change(self, product, action, qty=None):
+        if action == 'add':
+            return self.cart_backend.add(product)
+        if action == 'remove':
+            return self.cart_backend.remove(product)
+        if action == 'set_qty':
+            return self.cart_backend.set_qty(product, int(qty))
+        raise ValueError(f"Неизвестное действие '{action}'")
+
+    @staticmethod
+    def line_json(product, line):
+        if line is None:
+            return {'product': product.slug, 'qty': 0, 'final_price': '0.00'}
+        return {'product': product.slug, 'qty': line.qty, 'final_price': line.final_price}
+
+    def cart_json(self):
+        cart = self.cart_backend.cart
+        return {'total_products': cart.total_products, 'final_price': cart.final_price}
+
+    def post(self, request, *args, **kwargs):
+        product = get_product_refs([kwargs.get('slug')]).get(kwargs.get('slug'))
+        if not product:
+            return JsonResponse({'error': 'Товар не найден'}, status=404)
+        try:
+            line = self.apply_change(product, self.action, request.POST.get('qty'))
+        except CartProduct.DoesNotExist:
+            return JsonResponse({'error': 'Товара нет в корзине'}, status=404)
+        except (TypeError, ValueError) as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        return JsonResponse({'line': self.line_json(product, line), 'cart': self.cart_json()})
+
+
+class CartBatchAjaxView(CartChangeAjaxView):
+    """Пакет изменений корзины одним запросом:
+    {"changes": [{"action": "add" | "remove" | "set_qty", "slug": "...", "qty": 1}, ...]}"""
+
+    def post(self, request, *args, **kwargs):
+        try:
+            changes = json.loads(request.body)['changes']
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse({'error': 'Ожидается JSON вида {"changes": [...]}'}, status=400)
+        if not isinstance(changes, list) or len(changes) > self.max_batch_size:
+            return JsonResponse({'error': f'Не больше {self.max_batch_size} изменений за запрос'}, status=400)
+        for change in changes:
+            if not (isinstance(change, dict) and isinstance(change.get('slug'), str)
+                    and isinstance(change.get('action'), str)):
+                return JsonResponse({'error': 'Изменение - объект со строковыми "action" и "slug"'}, status=400)
+        products = get_product_refs(change['slug'] for change in changes)
+        lines = {}
+        try:
+            with self.cart_backend.atomic():
+                for change in changes:
+                    product = products.get(change.get('slug'))
+                    if not product:
+                        raise ValueError(f"Товар '{change.get('slug')}' не найден")
+                    line = self.apply_change(product, change.get('action'), change.get('qty'))
+                    lines[product.slug] = self.line_json(product, line)
+        except CartProduct.DoesNotExist:
+            return JsonResponse({'error': 'Товара нет в корзине'}, status=404)
+        except (TypeError, ValueError, AttributeError) as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        return JsonResponse({'lines': list(lines.values()), 'cart': self.cart_json()})
+
+
 class CartView(CartMixin, View):
     """Вьюшка корзины"""
     def get(self, request, *args, **kwargs):
-        categories = Category.objects.all()
         context = {
             'cart': self.cart,
-            'categories': categories,
         }
         return render(request, 'cart.html', context)
 
@@ -147,11 +233,9 @@ class CartView(CartMixin, View):
 class CheckoutView(CartMixin, View):
     """Вьюшка корзины"""
     def get(self, request, *args, **kwargs):
-        categories = Category.objects.all()
         form = OrderForm(request.POST or None)
         context = {
             'cart': self.cart,
-            'categories': categories,
             'form': form,
         }
         return render(request, 'checkout.html', context)
@@ -159,44 +243,64 @@ class CheckoutView(CartMixin, View):
 
 class MakeOrderView(CartMixin, View):
     """Обработка заказа"""
-    @transaction.atomic
+
     def post(self, request, *args, **kwargs):
         form = OrderForm(request.POST or None)
-        customer = Customer.objects.get(user=request.user)
-        if form.is_valid():
-            new_order = form.save(commit=False)
-            new_order.customer = customer
-            new_order.first_name = form.cleaned_data['first_name']
-            new_order.last_name = form.cleaned_data['last_name']
-            new_order.phone = form.cleaned_data['phone']
-            new_order.address = form.cleaned_data['address']
-            new_order.buying_type = form.cleaned_data['buying_type']
-            new_order.order_date = form.cleaned_data['order_date']
-            new_order.comment = form.cleaned_data['comment']
-            new_order.save()
-            self.cart.in_order = True
-            self.cart.save()
-            new_order.cart = self.cart
-            new_order.save()
-            customer.order.add(new_order)
+        if not form.is_valid():
+            return HttpResponseRedirect('/checkout/')
+        idempotency_key = form.cleaned_data['idempotency_key']
+        try:
+            with transaction.atomic():
+                placed = self.place_order(form, idempotency_key)
+        except IntegrityError:
+            # Параллельный повтор с тем же ключом успел вставить заказ первым
+            if not idempotency_key or not Order.objects.filter(
+                customer__user=request.user, idempotency_key=idempotency_key
+            ).exists():
+                raise
+            placed = False
+        if placed:
+            self.cart_backend.clear()
             messages.add_message(request, messages.INFO, 'Спасибо за заказ! Менеджер с Вами свяжется')
-            return HttpResponseRedirect('/')
-        return HttpResponseRedirect('/checkout/')
+        return HttpResponseRedirect('/')
+
+    def place_order(self, form, idempotency_key):
+        """Один INSERT заказа с уже привязанной корзиной. Корзина блокируется до конца транзакции,
+        повторная отправка (тот же ключ или уже оформленная корзина) ничего не пишет"""
+        if idempotency_key and Order.objects.filter(
+            customer__user=self.request.user, idempotency_key=idempotency_key
+        ).exists():
+            return False
+        cart = self.cart_backend.materialize()
+        if cart.in_order or not cart.total_products:
+            return False
+        customer = cart.owner
+        new_order = form.save(commit=False)
+        new_order.customer = customer
+        new_order.cart = cart
+        new_order.idempotency_key = idempotency_key
+        new_order.save(force_insert=True)
+        Cart.objects.filter(pk=cart.pk).update(in_order=True)
+        Customer.order.through.objects.create(customer_id=customer.id, order_id=new_order.id)
+        OrderLine.objects.bulk_create([
+            OrderLine.from_cart_product(new_order, cart_product)
+            for cart_product in cart.products.select_related('product')
+        ])
+        return True
 
 
 class ProfileView(CartMixin, View):
     """Профиль покупателя"""
+
+    orders_per_page = 10
+
     def get(self, request, *args, **kwargs):
-        customer = Customer.objects.get(user=request.user)
-        order = Order.objects.filter(customer=customer).order_by('-created_at')
-        categories = Category.objects.all()
+        orders = Order.objects.filter(
+            customer__user=request.user
+        ).select_related('cart', 'customer').prefetch_related('lines').order_by('-created_at', '-id')
+        page = Paginator(orders, self.orders_per_page).get_page(request.GET.get('page'))
         return render(
             request,
             'profile.html',
-            {'orders': order, 'cart': self.cart, 'categories': categories},
+            {'orders': page, 'cart': self.cart},
         )
-
-
-
-
-